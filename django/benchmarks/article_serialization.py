@@ -0,0 +1,65 @@
+"""
+ArticleSerializer versus the read-only fast path (realworld.fast_serializers).
+
+Times building the /api/articles/ payload for 20, 100 and 1000 articles,
+including the queries each approach issues.
+"""
+from common import measure, print_table, setup_django
+
+setup_django()
+
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from realworld import fast_serializers  # noqa: E402
+from realworld.models import Article, Tag, User  # noqa: E402
+from realworld.serializers import ArticleSerializer  # noqa: E402
+
+SIZES = [20, 100, 1000]
+
+
+def seed(count):
+    authors = [
+        User.objects.create_user(username=f'author{i}', email=f'author{i}@example.com', password='x')
+        for i in range(20)
+    ]
+    reader = User.objects.create_user(username='reader', email='reader@example.com', password='x')
+    reader.following.add(*authors[::2])
+    tags = Tag.objects.bulk_create([Tag(name=f'tag{i}') for i in range(30)])
+    articles = Article.objects.bulk_create([
+        Article(author=authors[i % len(authors)], slug=f'article-{i}', title=f'Article {i}',
+                description='Description', body='Body ' * 50, favorites_count=i % 7)
+        for i in range(count)
+    ])
+    Through = Article.tags.through
+    Through.objects.bulk_create([
+        Through(article_id=article.id, tag_id=tags[(article.id + k) % len(tags)].id)
+        for article in articles for k in range(3)
+    ])
+    return reader
+
+
+def main():
+    reader = seed(max(SIZES))
+    request = Request(APIRequestFactory().get('/api/articles/'))
+    request.user = reader
+    base = Article.objects.select_related('author').prefetch_related('tags').with_favorites(reader)
+
+    def drf(size):
+        request._following_ids = None
+        return ArticleSerializer(base[:size], many=True, context={'request': request}).data
+
+    def fast(size):
+        request._following_ids = None
+        return fast_serializers.serialize_articles(fast_serializers.article_rows(base)[:size], request)
+
+    rows = []
+    for size in SIZES:
+        drf_time = measure(lambda: drf(size))
+        fast_time = measure(lambda: fast(size))
+        rows.append([size, f'{drf_time * 1000:.1f}', f'{fast_time * 1000:.1f}', f'{drf_time / fast_time:.1f}x'])
+    print_table(['articles', 'DRF ms', 'fast ms', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+WSGI versus ASGI throughput of the read endpoints under many concurrent clients.
+
+Starts the project under a WSGI server (gunicorn, threaded workers) and under
+an ASGI server (uvicorn, with ``REALWORLD_ASYNC_READS=True`` so the async views
+in ``realworld.async_views`` serve the reads), then drives each one with
+CLIENTS concurrent clients for DURATION seconds using a minimal asyncio HTTP
+client. Servers whose command is not installed are skipped::
+
+    pip install gunicorn uvicorn
+    python benchmarks/asgi_concurrency.py --clients 500 --duration 20
+
+Both servers run with ``DEBUG=True`` because ``ALLOWED_HOSTS`` is empty
+otherwise; export ``DB_*`` variables to benchmark against MySQL.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from common import BASE_DIR, percentile, print_table, setup_django
+
+setup_django()
+
+from realworld.models import Article, Comment, Tag, User  # noqa: E402
+
+HOST = '127.0.0.1'
+PATHS = [
+    '/api/articles/',
+    '/api/articles/?tag=tag1',
+    '/api/articles/article-1/',
+    '/api/articles/article-1/comments/',
+    '/api/tags/',
+    '/api/profiles/author0/',
+]
+
+
+def seed():
+    authors = [
+        User.objects.create_user(username=f'author{i}', email=f'author{i}@example.com', password='x')
+        for i in range(20)
+    ]
+    tags = Tag.objects.bulk_create([Tag(name=f'tag{i}') for i in range(20)])
+    articles = Article.objects.bulk_create([
+        Article(author=authors[i % len(authors)], slug=f'article-{i}', title=f'Article {i}',
+                description='Description', body='Body ' * 50)
+        for i in range(500)
+    ])
+    Through = Article.tags.through
+    Through.objects.bulk_create([
+        Through(article_id=article.id, tag_id=tags[(article.id + k) % len(tags)].id)
+        for article in articles for k in range(3)
+    ])
+    Comment.objects.bulk_create([
+        Comment(article=articles[1], author=authors[i % len(authors)], body=f'Comment {i}')
+        for i in range(50)
+    ])
+    Article.objects.filter(pk=articles[1].pk).update(comments_count=50)
+
+
+def servers(workers):
+    return [
+        ('wsgi', 8701, ['gunicorn', 'config.wsgi:application', '--workers', str(workers),
+                        '--threads', '8', '--bind', f'{HOST}:8701'], {}),
+        ('asgi', 8702, ['uvicorn', 'config.asgi:application', '--workers', str(workers),
+                        '--host', HOST, '--port', '8702', '--log-level', 'warning'],
+         {'REALWORLD_ASYNC_READS': 'True'}),
+    ]
+
+
+async def fetch(port, path):
+    """One ``GET`` over a fresh connection; returns the status code"""
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode('ascii')
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if await fetch(port, '/api/tags/') == 200:
+                return
+        except (OSError, IndexError, ValueError):
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+async def load(port, clients, duration):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client(index):
+        nonlocal errors
+        request = index
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, PATHS[request % len(PATHS)])
+            except (OSError, IndexError, ValueError):
+                status = None
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+            request += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def run_server(name, port, command, env, args):
+    if shutil.which(command[0]) is None:
+        print(f'{name}: {command[0]} is not installed, skipping', file=sys.stderr)
+        return None
+    process = subprocess.Popen(
+        command, cwd=BASE_DIR, env={**os.environ, 'DEBUG': 'True', **env},
+    )
+    try:
+        asyncio.run(wait_until_ready(port))
+        latencies, errors, elapsed = asyncio.run(load(port, args.clients, args.duration))
+    finally:
+        process.terminate()
+        process.wait()
+    latencies.sort()
+    if not latencies:
+        return [name, 0, errors, '-', '-', '-']
+    return [
+        name,
+        f'{len(latencies) / elapsed:.0f}',
+        errors,
+        f'{percentile(latencies, 50) * 1000:.1f}',
+        f'{percentile(latencies, 95) * 1000:.1f}',
+        f'{percentile(latencies, 99) * 1000:.1f}',
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    seed()
+    rows = [row for row in (run_server(*server, args) for server in servers(args.workers)) if row]
+    print(f'{args.clients} concurrent clients for {args.duration:g}s, {args.workers} worker processes')
+    print_table(['server', 'req / s', 'errors', 'p50 ms', 'p95 ms', 'p99 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
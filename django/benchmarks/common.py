@@ -0,0 +1,63 @@
+"""
+Shared bootstrap for the standalone benchmark scripts in this directory.
+
+Run a benchmark from the ``django/`` directory, e.g.::
+
+    python benchmarks/slug_allocation.py
+
+By default each run migrates a throwaway SQLite file. Export ``DB_ENGINE`` /
+``DB_NAME`` (and the other ``DB_*`` variables) to benchmark against MySQL.
+"""
+import atexit
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """Configure Django for a benchmark run and migrate the database"""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    os.environ.setdefault('DEBUG', 'False')
+    if 'DB_ENGINE' not in os.environ:
+        fd, path = tempfile.mkstemp(suffix='.sqlite3', prefix='realworld-bench-')
+        os.close(fd)
+        atexit.register(lambda: os.path.exists(path) and os.remove(path))
+        os.environ['DB_ENGINE'] = 'django.db.backends.sqlite3'
+        os.environ['DB_NAME'] = path
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def measure(func, repeat=5):
+    """Run ``func`` ``repeat`` times and return the median duration in seconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    for row in [headers] + rows:
+        print('  '.join(str(cell).rjust(width) for cell, width in zip(row, widths)))
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an ascending list; 0 when it is empty"""
+    if not sorted_values:
+        return 0
+    index = max(0, min(len(sorted_values) - 1, round(len(sorted_values) * percent / 100) - 1))
+    return sorted_values[index]
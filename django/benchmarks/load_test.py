@@ -0,0 +1,407 @@
+"""
+Concurrent load test of the RealWorld endpoints with per-endpoint latencies.
+
+CONCURRENCY virtual users each register an account, then issue requests for
+DURATION seconds, picking the endpoint of every request from a weighted MIX
+(register, login, list, feed, retrieve, favorite, comment, tags). Throughput,
+errors and p50/p95/p99 latencies are reported per endpoint; requests made
+during the first WARMUP seconds are not counted.
+
+By default the project is driven in-process through ``config.asgi`` (no
+network, a throwaway SQLite database seeded with ``manage.py seed_data``)::
+
+    python benchmarks/load_test.py run --concurrency 50 --duration 30 --save baseline.json
+
+or against a locally started server, seeded beforehand::
+
+    python manage.py seed_data --users 1000 --articles 20000
+    DEBUG=True python manage.py runserver --noreload
+    python benchmarks/load_test.py run --url http://127.0.0.1:8000 --save baseline.json
+
+Saved runs are JSON baselines; ``compare`` flags endpoints whose latency grew
+or throughput dropped by more than THRESHOLD between two of them, and exits
+with status 1 when it finds a regression::
+
+    python benchmarks/load_test.py compare baseline.json current.json
+    python benchmarks/load_test.py run --baseline baseline.json  # run, then compare
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from common import percentile, print_table, setup_django
+
+DEFAULT_MIX = 'list=30,retrieve=20,feed=15,tags=10,comment=8,favorite=8,login=5,register=4'
+PASSWORD = 'loadtest-password'
+
+
+class ASGIClient:
+    """Calls an ASGI application in-process"""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def request(self, method, path, body=None, headers=()):
+        path, _, query = path.partition('?')
+        body = body or b''
+        # Django only reads as many body bytes as Content-Length announces
+        headers = [(b'host', b'localhost'), (b'content-length', str(len(body)).encode('ascii')), *headers]
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode('ascii'),
+            'query_string': query.encode('ascii'),
+            'headers': headers,
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        response = {'status': None, 'body': []}
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # The client never disconnects; Django cancels this wait itself
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['body'].append(message.get('body', b''))
+
+        await self.application(scope, receive, send)
+        return response['status'], b''.join(response['body'])
+
+
+class HTTPClient:
+    """Minimal HTTP/1.1 client over asyncio streams, one connection per request"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+
+    async def request(self, method, path, body=None, headers=()):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            lines = [f'{method} {self.prefix}{path} HTTP/1.1', f'Host: {self.host}', 'Connection: close']
+            lines += [f'{name.decode()}: {value.decode()}' for name, value in headers]
+            if body is not None:
+                lines.append(f'Content-Length: {len(body)}')
+            writer.write('\r\n'.join(lines).encode('ascii') + b'\r\n\r\n' + (body or b''))
+            await writer.drain()
+            raw = await reader.read()
+        finally:
+            writer.close()
+        head, _, payload = raw.partition(b'\r\n\r\n')
+        status_line, *header_lines = head.split(b'\r\n')
+        if any(line.lower() == b'transfer-encoding: chunked' for line in header_lines):
+            payload = dechunk(payload)
+        return int(status_line.split()[1]), payload
+
+
+def dechunk(payload):
+    body = b''
+    while payload:
+        size, _, payload = payload.partition(b'\r\n')
+        size = int(size.split(b';')[0], 16)
+        if size == 0:
+            break
+        body, payload = body + payload[:size], payload[size + 2:]
+    return body
+
+
+class VirtualUser:
+    """One simulated client: its account, token and favorited articles"""
+
+    def __init__(self, index, run_id, client, rng):
+        self.index = index
+        self.username = f'load-{run_id}-{index}'
+        self.client = client
+        self.rng = rng
+        self.token = None
+        self.favorited = set()
+        self.registrations = 0
+
+    async def call(self, method, path, payload=None, auth=True):
+        headers = [(b'content-type', b'application/json')]
+        if auth and self.token:
+            headers.append((b'authorization', f'Token {self.token}'.encode('ascii')))
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        status, content = await self.client.request(method, path, body, headers)
+        return status, content
+
+    async def register(self, username=None):
+        status, content = await self.call('POST', '/api/users/', {'user': {
+            'username': username or self.username,
+            'email': f'{username or self.username}@example.com',
+            'password': PASSWORD,
+        }}, auth=False)
+        if status == 201 and username is None:
+            self.token = json.loads(content)['user']['token']
+        return status
+
+
+async def op_register(user, data):
+    user.registrations += 1
+    return await user.register(f'{user.username}-{user.registrations}')
+
+
+async def op_login(user, data):
+    status, _ = await user.call('POST', '/api/users/login/', {'user': {
+        'email': f'{user.username}@example.com', 'password': PASSWORD,
+    }}, auth=False)
+    return status
+
+
+async def op_list(user, data):
+    path = '/api/articles/'
+    if data['tags'] and user.rng.random() < 0.3:
+        path += f'?tag={user.rng.choice(data["tags"])}'
+    status, _ = await user.call('GET', path, auth=False)
+    return status
+
+
+async def op_feed(user, data):
+    status, _ = await user.call('GET', '/api/articles/feed/')
+    return status
+
+
+async def op_retrieve(user, data):
+    status, _ = await user.call('GET', f'/api/articles/{user.rng.choice(data["slugs"])}/')
+    return status
+
+
+async def op_favorite(user, data):
+    slug = user.rng.choice(data['slugs'])
+    method = 'DELETE' if slug in user.favorited else 'POST'
+    status, _ = await user.call(method, f'/api/articles/{slug}/favorite/')
+    user.favorited ^= {slug}
+    return status
+
+
+async def op_comment(user, data):
+    status, _ = await user.call('POST', f'/api/articles/{user.rng.choice(data["slugs"])}/comments/', {
+        'comment': {'body': f'Load test comment from {user.username}'},
+    })
+    return status
+
+
+async def op_tags(user, data):
+    status, _ = await user.call('GET', '/api/tags/', auth=False)
+    return status
+
+
+OPERATIONS = {
+    'register': op_register,
+    'login': op_login,
+    'list': op_list,
+    'feed': op_feed,
+    'retrieve': op_retrieve,
+    'favorite': op_favorite,
+    'comment': op_comment,
+    'tags': op_tags,
+}
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f'unknown endpoint {name!r}; choose from {", ".join(OPERATIONS)}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def prepare(users):
+    """Register every virtual user and collect article slugs and tag names"""
+    statuses = await asyncio.gather(*(user.register() for user in users))
+    if not any(user.token for user in users):
+        raise RuntimeError(f'could not register load test users (statuses {sorted(set(statuses))})')
+    users = [user for user in users if user.token]
+
+    slugs = []
+    for page in range(1, 6):
+        status, content = await users[0].call('GET', f'/api/articles/?page={page}', auth=False)
+        if status != 200:
+            break
+        slugs += [article['slug'] for article in json.loads(content)['results']]
+    if not slugs:
+        # Empty database: every virtual user publishes an article to read
+        for user in users:
+            _, content = await user.call('POST', '/api/articles/', {'article': {
+                'title': f'Load test article {user.index}', 'description': 'd', 'body': 'b',
+                'tagList': ['loadtest'],
+            }})
+            slugs.append(json.loads(content)['article']['slug'])
+    _, content = await users[0].call('GET', '/api/tags/?top=20', auth=False)
+    return users, {'slugs': slugs, 'tags': json.loads(content)['tags']}
+
+
+async def drive(client, args):
+    rng = random.Random(args.seed)
+    run_id = f'{int(time.time()):x}{rng.randrange(16 ** 4):04x}'
+    users = [VirtualUser(i, run_id, client, random.Random(f'{args.seed}:{i}')) for i in range(args.concurrency)]
+    users, data = await prepare(users)
+
+    names, weights = list(args.mix), list(args.mix.values())
+    latencies = {name: [] for name in names}
+    errors = dict.fromkeys(names, 0)
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    deadline = measure_from + args.duration
+
+    async def virtual_user(user):
+        while (now := time.perf_counter()) < deadline:
+            name = user.rng.choices(names, weights)[0]
+            try:
+                status = await OPERATIONS[name](user, data)
+            except (OSError, ValueError, KeyError, IndexError):
+                status = None
+            if now < measure_from:
+                continue
+            if status is not None and 200 <= status < 300:
+                latencies[name].append(time.perf_counter() - now)
+            else:
+                errors[name] += 1
+
+    await asyncio.gather(*(virtual_user(user) for user in users))
+    return summarize(latencies, errors, time.perf_counter() - measure_from)
+
+
+def summarize(latencies, errors, elapsed):
+    def stats(samples, failed):
+        samples = sorted(samples)
+        return {
+            'requests': len(samples),
+            'errors': failed,
+            'rps': round(len(samples) / elapsed, 2),
+            'p50_ms': round(percentile(samples, 50) * 1000, 2),
+            'p95_ms': round(percentile(samples, 95) * 1000, 2),
+            'p99_ms': round(percentile(samples, 99) * 1000, 2),
+        }
+
+    endpoints = {name: stats(latencies[name], errors[name]) for name in latencies}
+    total = stats([value for samples in latencies.values() for value in samples], sum(errors.values()))
+    return {'elapsed': round(elapsed, 2), 'endpoints': endpoints, 'total': total}
+
+
+def run_in_process(args):
+    setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+    from config.asgi import application
+
+    # DEBUG is off for benchmarks, which makes an empty ALLOWED_HOSTS reject everything
+    settings.ALLOWED_HOSTS = ['localhost']
+    call_command('seed_data', users=args.seed_users, articles=args.seed_articles, tags=200,
+                 seed=args.seed, stdout=open(os.devnull, 'w'))
+    return asyncio.run(drive(ASGIClient(application), args))
+
+
+def print_results(results):
+    rows = [
+        [name, stats['requests'], stats['errors'], f'{stats["rps"]:.1f}',
+         f'{stats["p50_ms"]:.1f}', f'{stats["p95_ms"]:.1f}', f'{stats["p99_ms"]:.1f}']
+        for name, stats in [*results['endpoints'].items(), ('total', results['total'])]
+    ]
+    print_table(['endpoint', 'requests', 'errors', 'req / s', 'p50 ms', 'p95 ms', 'p99 ms'], rows)
+
+
+def compare(baseline, current, threshold):
+    """Print the change of every metric; returns the regressed ``endpoint.metric`` names"""
+    rows, regressions = [], []
+    for name, new in [*current['endpoints'].items(), ('total', current['total'])]:
+        old = baseline['total'] if name == 'total' else baseline['endpoints'].get(name)
+        if not old or not old['requests'] or not new['requests']:
+            continue
+        for metric, higher_is_worse in [('rps', False), ('p50_ms', True), ('p95_ms', True), ('p99_ms', True)]:
+            change = (new[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            regressed = change > threshold if higher_is_worse else change < -threshold
+            if regressed:
+                regressions.append(f'{name}.{metric}')
+            rows.append([name, metric, f'{old[metric]:.1f}', f'{new[metric]:.1f}', f'{change:+.1%}',
+                         'REGRESSION' if regressed else ''])
+        if new['errors'] > old['errors']:
+            regressions.append(f'{name}.errors')
+            rows.append([name, 'errors', old['errors'], new['errors'], '', 'REGRESSION'])
+    print_table(['endpoint', 'metric', 'baseline', 'current', 'change', ''], rows)
+    return regressions
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the load test')
+    run.add_argument('--url', help='base URL of a running server; in-process ASGI when omitted')
+    run.add_argument('--concurrency', type=int, default=20)
+    run.add_argument('--duration', type=float, default=20)
+    run.add_argument('--warmup', type=float, default=3)
+    run.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                     help=f'endpoint=weight pairs (default {DEFAULT_MIX})')
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--seed-users', type=int, default=200, help='in-process only')
+    run.add_argument('--seed-articles', type=int, default=2000, help='in-process only')
+    run.add_argument('--save', help='write the results to this JSON baseline file')
+    run.add_argument('--baseline', help='compare the results with this baseline file')
+    run.add_argument('--threshold', type=float, default=0.1)
+
+    diff = commands.add_parser('compare', help='compare two saved runs')
+    diff.add_argument('baseline')
+    diff.add_argument('current')
+    diff.add_argument('--threshold', type=float, default=0.1,
+                      help='relative change that counts as a regression (default 0.1)')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        baseline, current = load(args.baseline), load(args.current)
+    else:
+        results = asyncio.run(drive(HTTPClient(args.url), args)) if args.url else run_in_process(args)
+        current = {
+            'meta': {
+                'target': args.url or 'in-process asgi',
+                'concurrency': args.concurrency,
+                'duration': args.duration,
+                'mix': args.mix,
+                'python': platform.python_version(),
+                'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            },
+            **results,
+        }
+        print(f'{args.concurrency} virtual users for {args.duration:g}s against {current["meta"]["target"]}')
+        print_results(current)
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(current, f, indent=2)
+        if not args.baseline:
+            return
+        print()
+        baseline = load(args.baseline)
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Login lookups: the previous email-then-username path versus EmailBackend.
+
+Seeds USERS accounts and times LOGINS logins with each path. Passwords use the
+MD5 hasher so the lookups are not hidden behind PBKDF2's deliberate cost.
+"""
+from common import measure, print_table, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import authenticate  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+
+from realworld.models import User  # noqa: E402
+
+USERS = 50000
+LOGINS = 500
+
+
+def seed():
+    password = make_password('password123')
+    User.objects.bulk_create(
+        [User(username=f'user{i}', email=f'user{i}@example.com', password=password)
+         for i in range(USERS)],
+        batch_size=5000,
+    )
+
+
+def username_login(email):
+    # What UserLoginSerializer did before EmailBackend
+    try:
+        user = User.objects.get(email=email)
+    except User.DoesNotExist:
+        return None
+    return authenticate(username=user.username, password='password123')
+
+
+def email_login(email):
+    return authenticate(email=email, password='password123')
+
+
+def main():
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    seed()
+    emails = [f'user{(i * 7919) % USERS}@example.com' for i in range(LOGINS)]
+
+    rows = []
+    for name, login in [('email then username', username_login), ('EmailBackend', email_login)]:
+        duration = measure(lambda: [login(email) for email in emails], repeat=3)
+        rows.append([name, f'{duration * 1000:.1f}', f'{LOGINS / duration:.0f}'])
+    print(f'{LOGINS} logins against {USERS} users')
+    print_table(['path', 'total ms', 'logins / s'], rows)
+
+
+if __name__ == '__main__':
+    main()
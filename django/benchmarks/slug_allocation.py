@@ -0,0 +1,60 @@
+"""
+Cost of Article.save slug allocation as duplicate titles accumulate.
+
+Compares the current single-query allocation with the previous approach that
+probed ``slug``, ``slug-1``, ``slug-2``... one query at a time.
+"""
+from common import measure, print_table, setup_django
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.utils.text import slugify  # noqa: E402
+
+from realworld.models import Article, User  # noqa: E402
+
+TITLE = 'Hello world'
+DUPLICATES = [10, 100, 1000, 5000]
+
+
+def probing_slug(title):
+    """The allocation loop Article.save used before"""
+    base_slug = slugify(title)
+    slug = base_slug
+    counter = 1
+    while Article.objects.filter(slug=slug).exists():
+        slug = f'{base_slug}-{counter}'
+        counter += 1
+    return slug
+
+
+def main():
+    author = User.objects.create_user(username='bench', email='bench@example.com', password='x')
+    base_slug = slugify(TITLE)
+    existing = 0
+    rows = []
+    for target in DUPLICATES:
+        Article.objects.bulk_create([
+            Article(author=author, title=TITLE, description='', body='',
+                    slug=base_slug if n == 0 else f'{base_slug}-{n}')
+            for n in range(existing, target)
+        ])
+        existing = target
+
+        with CaptureQueriesContext(connection) as new_queries:
+            Article.next_free_slug(base_slug)
+        new_time = measure(lambda: Article.next_free_slug(base_slug))
+        with CaptureQueriesContext(connection) as old_queries:
+            old_time = measure(lambda: probing_slug(TITLE), repeat=1)
+        rows.append([
+            target,
+            len(new_queries), f'{new_time * 1000:.2f}',
+            len(old_queries), f'{old_time * 1000:.2f}',
+        ])
+
+    print_table(['duplicates', 'queries', 'ms', 'old queries', 'old ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Listing every tag versus ``?top=N`` and ``?prefix=`` on a large tag table.
+
+Seeds TAGS tags linked to ARTICLES articles, then times the full tag listing
+(``TagListView`` without parameters), the popularity ranking read from
+``TagPopularity`` and prefix lookups in the in-memory index, bypassing the
+response cache.
+"""
+import random
+
+from common import measure, print_table, setup_django
+
+setup_django()
+
+from realworld import tags  # noqa: E402
+from realworld.models import Article, Tag, User  # noqa: E402
+
+TAGS = 100_000
+ARTICLES = 5_000
+LOOKUPS = 1000
+
+
+def seed():
+    author = User.objects.create_user(username='bench', email='bench@example.com', password='x')
+    Tag.objects.bulk_create([Tag(name=f'tag-{i:06d}') for i in range(TAGS)], batch_size=5000)
+    articles = Article.objects.bulk_create([
+        Article(author=author, slug=f'article-{i}', title=f'Article {i}', description='d', body='b')
+        for i in range(ARTICLES)
+    ], batch_size=1000)
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+    rng = random.Random(0)
+    Through = Article.tags.through
+    Through.objects.bulk_create([
+        Through(article_id=article.id, tag_id=tag_id)
+        for article in articles
+        for tag_id in set(rng.choices(tag_ids[:500], k=5))
+    ], batch_size=5000)
+    tags.rebuild_popularity()
+
+
+def main():
+    seed()
+    rng = random.Random(1)
+    prefixes = [f'tag-{rng.randrange(TAGS):06d}'[:rng.randrange(6, 10)] for _ in range(LOOKUPS)]
+    tags.prefix_index.search('warm-up', 1)  # build the index outside the timings
+
+    full = measure(lambda: list(Tag.objects.values_list('name', flat=True)))
+    top = measure(lambda: [list(tags.top_tags(10)) for _ in range(LOOKUPS)])
+    prefix = measure(lambda: [tags.prefix_index.search(p, 20) for p in prefixes])
+    print(f'{TAGS} tags, {ARTICLES} articles')
+    print_table(
+        ['request', 'ms / call'],
+        [
+            ['all tags', f'{full * 1000:.3f}'],
+            ['?top=10', f'{top / LOOKUPS * 1000:.3f}'],
+            ['?prefix=', f'{prefix / LOOKUPS * 1000:.3f}'],
+        ],
+    )
+
+
+if __name__ == '__main__':
+    main()
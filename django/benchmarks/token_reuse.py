@@ -0,0 +1,54 @@
+"""
+Echoing the caller's access token versus minting one per /api/user/ response.
+
+Times serializing the current user 1000 times with an authenticated request,
+once reusing the request token and once forcing a fresh token (as login and
+registration do).
+"""
+from common import measure, print_table, setup_django
+
+setup_django()
+
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+from rest_framework_simplejwt.authentication import JWTAuthentication  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from realworld.models import User  # noqa: E402
+from realworld.serializers import UserSerializer  # noqa: E402
+
+CALLS = 1000
+
+
+def authenticated_request(user):
+    token = str(RefreshToken.for_user(user).access_token)
+    request = Request(
+        APIRequestFactory().get('/api/user/', HTTP_AUTHORIZATION=f'Token {token}'),
+        authenticators=[JWTAuthentication()],
+    )
+    request.user  # authenticate once, outside the timed loop
+    return request
+
+
+def main():
+    user = User.objects.create_user(username='bench', email='bench@example.com', password='x')
+    request = authenticated_request(user)
+
+    def serialize(issue_token):
+        context = {'request': request, 'issue_token': issue_token}
+        return lambda: [UserSerializer(user, context=context).data for _ in range(CALLS)]
+
+    minted = measure(serialize(True))
+    reused = measure(serialize(False))
+    print(f'{CALLS} serializations of the current user')
+    print_table(
+        ['token', 'total ms', 'us / call'],
+        [
+            ['minted', f'{minted * 1000:.1f}', f'{minted / CALLS * 1e6:.1f}'],
+            ['reused', f'{reused * 1000:.1f}', f'{reused / CALLS * 1e6:.1f}'],
+        ],
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -97,10 +97,66 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '3306'),
-        'OPTIONS': {
-            'charset': 'utf8mb4',
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        },
+        'OPTIONS': {},
+    }
+}
+
+# MySQL-only connection options; other engines (e.g. SQLite for local test runs) reject them
+if DATABASES['default']['ENGINE'] == 'django.db.backends.mysql':
+    DATABASES['default']['OPTIONS'] = {
+        'charset': 'utf8mb4',
+        'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+    }
+
+# Pooled connections (see realworld/db/pooled/base.py), enabled by setting
+# DB_POOL_MAX_SIZE; the configured engine becomes the wrapped one
+if os.getenv('DB_POOL_MAX_SIZE'):
+    DATABASES['default']['POOL'] = {
+        'ENGINE': DATABASES['default']['ENGINE'],
+        'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+        'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE')),
+        'MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+        'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+    }
+    DATABASES['default']['ENGINE'] = 'realworld.db.pooled'
+
+# Per-request SQL counts, Server-Timing headers and query logs (see
+# QueryInstrumentationMiddleware); a query shape repeated this many times in
+# one request is logged as a warning
+REALWORLD_SQL_INSTRUMENTATION = os.getenv('REALWORLD_SQL_INSTRUMENTATION', 'True') == 'True'
+REALWORLD_SQL_DUPLICATE_THRESHOLD = 3
+
+if REALWORLD_SQL_INSTRUMENTATION:
+    MIDDLEWARE.insert(0, 'realworld.middleware.QueryInstrumentationMiddleware')
+
+# Read replicas for realworld reads (see realworld/routers.py): comma-separated
+# "host[=weight]" entries, or "database-file[=weight]" with SQLite. Each one
+# becomes a replicaN alias that mirrors default in tests.
+REALWORLD_DATABASE_REPLICAS = {}
+REPLICA_LOCATION_KEY = 'NAME' if 'sqlite3' in os.getenv('DB_ENGINE', '') else 'HOST'
+for index, entry in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    location, _, weight = entry.partition('=')
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        REPLICA_LOCATION_KEY: location,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REALWORLD_DATABASE_REPLICAS[f'replica{index}'] = int(weight or 1)
+
+if REALWORLD_DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['realworld.routers.ReplicaRouter']
+    MIDDLEWARE.insert(0, 'realworld.middleware.ReplicaPinningMiddleware')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Use django.core.cache.backends.filebased.FileBasedCache with a directory
+# LOCATION to share cached responses between worker processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'realworld'),
     }
 }
 
@@ -149,13 +205,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'realworld.User'
 
+# Login looks users up by email; ModelBackend keeps username logins (admin) working
+AUTHENTICATION_BACKENDS = [
+    'realworld.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 # CORS Settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
 
 # Django REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'realworld.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -187,6 +249,10 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
+# GET/PUT /api/user/ echo the caller's access token instead of minting a new
+# one while it remains valid for at least this long
+REALWORLD_TOKEN_REUSE_MIN_LIFETIME = timedelta(days=1)
+
 # DRF Spectacular Settings (OpenAPI/Swagger)
 SPECTACULAR_SETTINGS = {
     'TITLE': 'RealWorld API',
@@ -194,3 +260,63 @@ SPECTACULAR_SETTINGS = {
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': False,
 }
+
+# RealWorld feed inboxes (fan-out-on-write)
+# Maximum number of entries kept in each user's materialized feed, enforced by
+# `manage.py trim_feed_inboxes` (schedule it, e.g. hourly from cron)
+REALWORLD_FEED_INBOX_SIZE = int(os.getenv('REALWORLD_FEED_INBOX_SIZE', '1000'))
+# Authors with more followers than this are read at request time instead
+REALWORLD_FEED_FANOUT_LIMIT = int(os.getenv('REALWORLD_FEED_FANOUT_LIMIT', '10000'))
+
+# RealWorld response cache for anonymous reads (see realworld/caching.py)
+REALWORLD_RESPONSE_CACHE_ALIAS = 'default'
+REALWORLD_RESPONSE_CACHE_TIMEOUT = int(os.getenv('REALWORLD_RESPONSE_CACHE_TIMEOUT', '300'))
+
+# Article full-text search (see realworld/search.py): 'mysql', 'sqlite' or
+# 'python'; None picks the best backend for the configured database
+REALWORLD_SEARCH_BACKEND = os.getenv('REALWORLD_SEARCH_BACKEND') or None
+# Matches the 'python' backend keeps (after the request's filters)
+REALWORLD_SEARCH_MAX_RESULTS = 1000
+
+# Page size of the keyset-paginated comment list
+REALWORLD_COMMENTS_PAGE_SIZE = 100
+
+# Rows fetched and serialized per chunk by ?stream=true list responses
+REALWORLD_STREAM_CHUNK_SIZE = 500
+
+# Seconds an authenticated user is cached by CachedJWTAuthentication. Saves
+# only drop the entry of the worker that made them, so with a per-process
+# cache other workers may use a stale (or deactivated) user for this long
+REALWORLD_AUTH_USER_CACHE_TIMEOUT = 10
+
+# last_login updates on login are batched by a background thread every this
+# many seconds (set REALWORLD_DEFER_LAST_LOGIN to False to write inline)
+REALWORLD_DEFER_LAST_LOGIN = os.getenv('REALWORLD_DEFER_LAST_LOGIN', 'True') == 'True'
+REALWORLD_LAST_LOGIN_FLUSH_INTERVAL = 5
+
+# Password hashing pool (see realworld/hashing.py): worker processes (None
+# uses one per CPU) and the number of pending jobs before answering 503
+REALWORLD_PASSWORD_HASH_WORKERS = int(os.getenv('REALWORLD_PASSWORD_HASH_WORKERS', '0')) or None
+REALWORLD_PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('REALWORLD_PASSWORD_HASH_QUEUE_SIZE', '64'))
+
+# Route the hot read endpoints to the async views in realworld/async_views.py;
+# only worth enabling when serving through config/asgi.py
+REALWORLD_ASYNC_READS = os.getenv('REALWORLD_ASYNC_READS', 'False') == 'True'
+
+# Seconds between replica health checks, and how long a client that wrote
+# keeps reading from the primary (see realworld/routers.py)
+REALWORLD_REPLICA_HEALTH_INTERVAL = 5
+REALWORLD_REPLICA_PIN_SECONDS = 5
+
+# /api/tags/: largest ?top=N served, and matches returned for ?prefix= when no
+# ?top is given (see realworld/tags.py)
+REALWORLD_TAGS_TOP_MAX = 100
+REALWORLD_TAGS_AUTOCOMPLETE_LIMIT = 20
+# Seconds between checks of the tags table by the ?prefix= index, and the age
+# at which it is rebuilt to pick up renames made by other processes
+REALWORLD_TAGS_INDEX_CHECK_INTERVAL = 5
+REALWORLD_TAGS_INDEX_MAX_AGE = 300
+
+# Admin changelists count at most this many rows; larger unfiltered tables use
+# the database's row estimate (see EstimatedCountPaginator)
+REALWORLD_ADMIN_COUNT_LIMIT = 100_000
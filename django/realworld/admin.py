@@ -1,6 +1,87 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models.functions import Coalesce
 from .models import User, Article, Comment, Tag
+from .pagination import EstimatedCountPaginator
+from .search import match_articles
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables with millions of rows: no full-table
+    ``COUNT(*)`` (estimated or bounded counts instead) and no ``date_hierarchy``,
+    whose drill-down runs a date aggregate over the whole table.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        if AuthorListFilter in self.list_filter:
+            media += AuthorListFilter.media(self)
+        return media
+
+
+class AuthorListFilter(admin.SimpleListFilter):
+    """
+    Filter by ``?author=<user id>``. Rendering a link per user does not scale,
+    so the sidebar holds an autocomplete picker instead: it searches users
+    by username prefix through the admin's autocomplete view (see
+    ``UserAdmin.get_search_fields``) and loads only the selected author.
+    """
+    title = 'author'
+    parameter_name = 'author'
+    template = 'admin/realworld/author_filter.html'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        field = model._meta.get_field('author')
+        # The form field supplies the choice iterator the widget renders the
+        # selected author from
+        self.field = field.formfield(widget=AutocompleteSelect(field, model_admin.admin_site))
+
+    @staticmethod
+    def media(model_admin):
+        field = model_admin.model._meta.get_field('author')
+        return AutocompleteSelect(field, model_admin.admin_site).media + forms.Media(
+            js=['realworld/author_filter.js'],
+        )
+
+    def _author_id(self):
+        value = self.value()
+        return int(value) if value and value.isdigit() else None
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        # The picker navigates to this query string plus the chosen author
+        self.query_string = changelist.get_query_string(remove=[self.parameter_name, PAGE_VAR])
+        yield {
+            'selected': self._author_id() is None,
+            'query_string': self.query_string,
+            'display': 'All',
+        }
+
+    def picker(self):
+        """The autocomplete ``<select>``; rendered after ``choices()``"""
+        return self.field.widget.render(self.parameter_name, self._author_id(), attrs={
+            'id': 'id_author_filter',
+            'data-filter-query': self.query_string,
+        })
+
+    def queryset(self, request, queryset):
+        author_id = self._author_id()
+        if author_id is not None:
+            return queryset.filter(author_id=author_id)
+        return queryset
 
 
 @admin.register(User)
@@ -11,27 +92,62 @@ class UserAdmin(BaseUserAdmin):
     )
     list_display = ['username', 'email', 'first_name', 'last_name', 'is_staff']
     search_fields = ['username', 'email', 'first_name', 'last_name']
+    # The author pickers (AuthorListFilter and autocomplete_fields) search on
+    # every keystroke: only username prefixes, which use the username index
+    autocomplete_search_fields = ['^username']
+
+    def get_search_fields(self, request):
+        match = request.resolver_match
+        if match is not None and match.url_name == 'autocomplete':
+            return self.autocomplete_search_fields
+        return super().get_search_fields(request)
+
+    def get_search_results(self, request, queryset, search_term):
+        if '@' in search_term:
+            # Whole email addresses use the LOWER(email) index; anything else
+            # falls through to the search_fields scan
+            matches = queryset.with_email(search_term.strip())
+            if matches.exists():
+                return matches, False
+        return super().get_search_results(request, queryset, search_term)
 
 
 @admin.register(Article)
-class ArticleAdmin(admin.ModelAdmin):
+class ArticleAdmin(LargeTableAdmin):
     """Admin configuration for Article model"""
     list_display = ['title', 'slug', 'author', 'created_at', 'updated_at']
-    list_filter = ['created_at', 'updated_at', 'author']
+    list_filter = ['created_at', AuthorListFilter]
+    list_select_related = ['author']
+    autocomplete_fields = ['author', 'tags']
     search_fields = ['title', 'description', 'body', 'slug']
     prepopulated_fields = {'slug': ('title',)}
-    date_hierarchy = 'created_at'
     ordering = ['-created_at']
 
+    def get_search_results(self, request, queryset, search_term):
+        """Use the full-text index instead of LIKE '%term%' scans"""
+        if not search_term:
+            return queryset, False
+        return match_articles(queryset, search_term), False
+
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     """Admin configuration for Comment model"""
     list_display = ['author', 'article', 'created_at', 'body_preview']
-    list_filter = ['created_at', 'author']
-    search_fields = ['body', 'author__username', 'article__title']
-    date_hierarchy = 'created_at'
-    ordering = ['-created_at']
+    list_filter = ['created_at', AuthorListFilter]
+    autocomplete_fields = ['author', 'article']
+    # Exact lookups use the username and slug indexes; LIKE '%term%' on
+    # comment bodies would scan the table
+    search_fields = ['=author__username', '=article__slug']
+    # ids grow with created_at and are the clustered index
+    ordering = ['-id']
+
+    def get_queryset(self, request):
+        # Comment.__str__ and the changelist columns read the author and the
+        # article title; the article text is never shown
+        return super().get_queryset(request).select_related('author', 'article').defer(
+            'article__body', 'article__description'
+        )
 
     def body_preview(self, obj):
         return obj.body[:50] + '...' if len(obj.body) > 50 else obj.body
@@ -39,12 +155,19 @@ class CommentAdmin(admin.ModelAdmin):
 
 
 @admin.register(Tag)
-class TagAdmin(admin.ModelAdmin):
+class TagAdmin(LargeTableAdmin):
     """Admin configuration for Tag model"""
     list_display = ['name', 'created_at', 'article_count']
     search_fields = ['name']
     ordering = ['name']
 
+    def get_queryset(self, request):
+        # Read the count maintained in TagPopularity instead of COUNT(*) per row
+        return super().get_queryset(request).annotate(
+            articles_count=Coalesce('popularity__articles_count', 0)
+        )
+
     def article_count(self, obj):
-        return obj.articles.count()
+        return obj.articles_count
     article_count.short_description = 'Article Count'
+    article_count.admin_order_field = 'articles_count'
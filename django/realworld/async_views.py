@@ -0,0 +1,203 @@
+"""
+Async implementations of the hot read endpoints.
+
+When ``REALWORLD_ASYNC_READS`` is enabled (and the project is served through
+``config/asgi.py``), ``realworld.urls`` routes ``GET``/``HEAD`` requests for
+the article list, feed, article detail, comment list, tags and profiles to the
+views below; every other method, and ``?stream=true`` requests, still reach
+the synchronous views (see ``hybrid``).
+
+The views return the same bodies as their synchronous counterparts: they go
+through the same filters, pagination styles, conditional-request validators,
+response cache and ``realworld.fast_serializers`` output, but fetch rows with
+the async ORM and issue independent queries together with ``asyncio.gather``.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404
+from django.utils.decorators import method_decorator
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+
+from . import fast_serializers, tags
+from .caching import cache_response
+from .conditional import (
+    add_validators,
+    aload_article_state,
+    apage_validators,
+    article_condition,
+    not_modified,
+    pagination_state,
+    profile_validators,
+)
+from .feed import Feed
+from .filters import ArticleFilter
+from .models import Article, Comment, Tag, User
+from .pagination import AsyncPageNumberPagination, KeysetPagination
+from .serializers import ProfileSerializer, aget_following_ids
+from .views import AsyncAPIView
+
+
+def hybrid(async_view, sync_view):
+    """
+    Serve ``GET``/``HEAD`` with ``async_view`` and every other request with
+    ``sync_view``, so a single URL entry covers both.
+    """
+    async def view(request, *args, **kwargs):
+        # request is a plain HttpRequest here, hence GET rather than query_params
+        if request.method in ('GET', 'HEAD') and request.GET.get('stream') not in ('1', 'true'):
+            return await async_view(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    return view
+
+
+def _not_found():
+    return Http404('No Article matches the given query.')
+
+
+class AsyncArticleListMixin:
+    """Paginated article lists built from ``fast_serializers`` rows"""
+
+    def get_queryset(self):
+        return Article.objects.with_favorites(self.request.user)
+
+    @staticmethod
+    def get_paginator(request):
+        if KeysetPagination.is_requested(request):
+            return KeysetPagination(envelope='articles')
+        return AsyncPageNumberPagination()
+
+    async def list_response(self, request, queryset):
+        rows = fast_serializers.article_rows(queryset)
+        paginator = self.get_paginator(request)
+        page = await paginator.apaginate_queryset(rows, request, view=self)
+        if page is None:
+            paginator, page = None, [row async for row in rows]
+        return await self.page_response(request, paginator, page)
+
+    async def page_response(self, request, paginator, page):
+        """The response for fetched ``page`` rows, or a 304 (see ``realworld.conditional``)"""
+        validators = await apage_validators(request, page, *pagination_state(paginator))
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+        data = await fast_serializers.aserialize_articles(page, request)
+        if paginator is not None:
+            response = paginator.get_paginated_response(data)
+        else:
+            response = Response({'articles': data, 'articlesCount': len(data)})
+        return add_validators(response, *validators)
+
+
+class AsyncArticleListView(AsyncArticleListMixin, AsyncAPIView):
+    """``GET /api/articles/`` (``ArticleViewSet.list``)"""
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    filterset_class = ArticleFilter
+
+    @cache_response('articles')
+    async def get(self, request):
+        queryset = DjangoFilterBackend().filter_queryset(request, self.get_queryset(), self)
+        return await self.list_response(request, queryset)
+
+
+class AsyncFeedView(AsyncArticleListMixin, AsyncAPIView):
+    """``GET /api/articles/feed/`` (``ArticleViewSet.feed``)"""
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        following_ids = await aget_following_ids(request)
+        feed = Feed(request.user, following_ids, fast_serializers.article_rows(self.get_queryset()))
+        paginator = self.get_paginator(request)
+        # A page merges the inbox with read-time authors in Python; read it in one hop
+        page = await sync_to_async(paginator.paginate_queryset)(feed, request, self)
+        if page is None:
+            paginator, page = None, await sync_to_async(list)(feed)
+        return await self.page_response(request, paginator, page)
+
+
+class AsyncArticleDetailView(AsyncAPIView):
+    """``GET /api/articles/<slug>/`` (``ArticleViewSet.retrieve``)"""
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    async def get(self, request, slug):
+        # article_condition reads the article state synchronously; load it first
+        await aload_article_state(request, slug)
+        return await self.retrieve(request, slug=slug)
+
+    @method_decorator(article_condition)
+    async def retrieve(self, request, slug):
+        queryset = Article.objects.with_favorites(request.user).filter(slug=slug)
+        row = await fast_serializers.article_rows(queryset).afirst()
+        if row is None:
+            raise _not_found()
+        data = await fast_serializers.aserialize_articles([row], request)
+        return Response({'article': data[0]})
+
+
+class AsyncCommentListView(AsyncAPIView):
+    """``GET /api/articles/<slug>/comments/`` (``CommentViewSet.list``)"""
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    async def get(self, request, article_slug):
+        paginator = KeysetPagination(
+            envelope='comments',
+            page_size=getattr(settings, 'REALWORLD_COMMENTS_PAGE_SIZE', 100),
+        )
+        # Resolve the article once, then page on the (article_id, created_at) index
+        # instead of joining articles in the page query (as CommentViewSet.get_article)
+        article = await Article.objects.filter(slug=article_slug).values_list('id', 'comments_count').afirst()
+        if article is None:
+            raise _not_found()
+        article_id, comments_count = article
+        comments = Comment.objects.filter(article_id=article_id)
+        page = await paginator.apaginate_queryset(fast_serializers.comment_rows(comments), request, view=self)
+        count = comments_count if request.query_params.get('count') in ('1', 'true') else None
+        validators = await apage_validators(request, page, *pagination_state(paginator), count)
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+        response = paginator.get_paginated_response(
+            await fast_serializers.aserialize_comments(page, request)
+        )
+        if count is not None:
+            response.data['commentsCount'] = count
+        return add_validators(response, *validators)
+
+
+class AsyncTagListView(AsyncAPIView):
+    """``GET /api/tags/`` (``TagListView``)"""
+    permission_classes = [AllowAny]
+
+    @cache_response('tags')
+    async def get(self, request):
+        # The prefix index refresh is synchronous; ?top=N is one indexed query
+        names = await sync_to_async(tags.list_tags)(request.query_params)
+        if names is None:
+            names = [name async for name in Tag.objects.values_list('name', flat=True)]
+        return Response({'tags': names})
+
+
+class AsyncProfileView(AsyncAPIView):
+    """``GET /api/profiles/<username>/`` (``ProfileView``)"""
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    async def get(self, request, username):
+        lookups = [User.objects.filter(username=username).afirst()]
+        if request.user.is_authenticated:
+            # Loads the follow set ProfileSerializer reads
+            lookups.append(aget_following_ids(request))
+        profile, *_ = await asyncio.gather(*lookups)
+        if profile is None:
+            raise Http404('No User matches the given query.')
+        # The follow set is loaded above, so neither step queries
+        validators = profile_validators(request, profile)
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+        serializer = ProfileSerializer(profile, context={'request': request})
+        return add_validators(Response({'profile': serializer.data}), *validators)
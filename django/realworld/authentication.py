@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .caching import KEY_PREFIX, get_cache
+
+# What requests read from the authenticated user: ids and flags for the
+# permission checks, and the columns /api/user/ and profiles show
+CACHED_USER_FIELDS = ('id', 'username', 'email', 'bio', 'image', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_cache_key(user_id):
+    return f'{KEY_PREFIX}:auth-user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Forget the cached user so the next request reloads it"""
+    get_cache().delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the token's user from Django's cache.
+
+    Only ``CACHED_USER_FIELDS`` are cached, never the password hash: the user
+    is rebuilt from them with every other field deferred, so reading one loads
+    it and ``save()`` writes the loaded fields only. When tokens are revoked on
+    password changes, a digest of the hash is kept to compare with the token
+    claim instead.
+
+    Entries live for ``REALWORLD_AUTH_USER_CACHE_TIMEOUT`` seconds and are
+    dropped when the user is saved (see ``realworld.signals``). With the default
+    per-process local-memory cache only the saving process drops its entry, so
+    other workers may accept a deactivated user or show a stale profile for up
+    to that many seconds; a shared cache backend closes that window except for
+    writes that skip signals.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        cache = get_cache()
+        key = user_cache_key(user_id)
+        cached = cache.get(key)
+        if cached is None:
+            user = super().get_user(validated_token)
+            cache.set(key, self.cache_entry(user), getattr(settings, 'REALWORLD_AUTH_USER_CACHE_TIMEOUT', 10))
+            return user
+        db, values, password_digest = cached
+        user = self.user_model.from_db(db, self.cached_field_names(), values)
+
+        # Same checks as JWTAuthentication.get_user, against the cached row
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_digest:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
+        return user
+
+    def cached_field_names(self):
+        # Model.from_db expects the loaded fields in model order
+        return [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname in CACHED_USER_FIELDS
+        ]
+
+    def cache_entry(self, user):
+        values = [getattr(user, name) for name in self.cached_field_names()]
+        password_digest = get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None
+        return user._state.db, values, password_digest
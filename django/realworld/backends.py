@@ -0,0 +1,28 @@
+from django.contrib.auth.backends import ModelBackend
+
+from . import hashing
+from .models import User
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticate ``authenticate(email=..., password=...)`` calls.
+
+    The user is fetched once through the ``LOWER(email)`` unique index and the
+    password is checked against that row, instead of resolving the email to a
+    username and letting ``ModelBackend`` load the same user again. Hashing
+    runs on the password hashing pool (see ``realworld.hashing``), so the
+    calling thread only waits for it.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        user = User.objects.with_email(email).first()
+        if user is None:
+            # Hash anyway so unknown emails take as long as wrong passwords
+            hashing.make_password(password)
+            return None
+        if hashing.check_password(password, user.password) and self.user_can_authenticate(user):
+            return user
+        return None
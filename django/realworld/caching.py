@@ -0,0 +1,175 @@
+"""
+Versioned response cache for anonymous read endpoints.
+
+Each cached view depends on one or more *scopes* (``articles``, ``tags``...).
+Every scope has a version stored in the cache; writes bump the version (see
+``realworld.signals``), which changes the keys of all dependent entries so
+stale responses are never read again and simply expire. Versions are
+millisecond timestamps of the last bump.
+
+Cached entries keep the ``ETag``/``Last-Modified`` validators of the response
+(see ``realworld.conditional``), so cache hits still answer conditional
+requests with 304.
+
+Any Django cache backend works. With the default local-memory backend each
+worker process has its own cache and versions, so multi-process deployments
+should point ``CACHES['default']`` at a shared backend such as the file-based
+one.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from . import metrics
+
+KEY_PREFIX = 'realworld'
+
+
+def get_cache():
+    return caches[getattr(settings, 'REALWORLD_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(scope):
+    return f'{KEY_PREFIX}:version:{scope}'
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def get_versions(*scopes):
+    """Return the current version of each scope, initialising missing ones"""
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _now_ms() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump_version(scope):
+    """Invalidate every cached response that depends on ``scope``"""
+    cache = get_cache()
+    key = _version_key(scope)
+    current = cache.get(key, 0)
+    cache.set(key, max(current + 1, _now_ms()), timeout=None)
+
+
+def normalize_query(query_params):
+    """Stable representation of query params, independent of their order"""
+    return urlencode(sorted(
+        (key, value)
+        for key in query_params
+        for value in query_params.getlist(key)
+    ))
+
+
+def response_cache_key(request, scopes):
+    versions = get_versions(*scopes)
+    raw = f'{request.path}?{normalize_query(request.query_params)}'
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    stamp = '.'.join(f'{scope}{version}' for scope, version in zip(scopes, versions))
+    return f'{KEY_PREFIX}:response:{stamp}:{digest}'
+
+
+def cache_response(*scopes):
+    """
+    Cache the data of successful anonymous GET responses of a view method.
+
+    Authenticated requests bypass the cache because their bodies contain
+    per-user fields such as ``favorited`` and ``following``; streamed
+    responses are never buffered, so they bypass it too.
+    """
+    def decorator(view_method):
+        if iscoroutinefunction(view_method):
+            return _async_cache_response(view_method, scopes)
+
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if _bypasses_cache(request):
+                return view_method(self, request, *args, **kwargs)
+
+            cache = get_cache()
+            key = response_cache_key(request, scopes)
+            entry = cache.get(key)
+            if entry is not None:
+                return _cached_response(request, entry)
+
+            metrics.incr('response_cache.misses')
+            response = view_method(self, request, *args, **kwargs)
+            entry = _cache_entry(response)
+            if entry is not None:
+                cache.set(key, entry, _timeout())
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def _timeout():
+    return getattr(settings, 'REALWORLD_RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def _cache_entry(response):
+    """``(data, validator headers)`` to cache for ``response``, or None"""
+    if response.status_code != 200 or not isinstance(response, Response):
+        return None
+    return response.data, {name: response[name] for name in VALIDATOR_HEADERS if response.has_header(name)}
+
+
+def _cached_response(request, entry):
+    data, headers = entry
+    metrics.incr('response_cache.hits')
+    last_modified = headers.get('Last-Modified')
+    response = get_conditional_response(
+        request,
+        etag=headers.get('ETag'),
+        last_modified=last_modified and parse_http_date_safe(last_modified),
+    )
+    if response is None:
+        response = Response(data)
+    for name, value in headers.items():
+        response[name] = value
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+def _bypasses_cache(request):
+    return (request.method != 'GET' or request.user.is_authenticated
+            or request.query_params.get('stream'))
+
+
+def _async_cache_response(view_method, scopes):
+    """``cache_response`` for coroutine handlers, using the async cache API"""
+    @wraps(view_method)
+    async def wrapper(self, request, *args, **kwargs):
+        if _bypasses_cache(request):
+            return await view_method(self, request, *args, **kwargs)
+
+        cache = get_cache()
+        key = response_cache_key(request, scopes)
+        entry = await cache.aget(key)
+        if entry is not None:
+            return _cached_response(request, entry)
+
+        metrics.incr('response_cache.misses')
+        response = await view_method(self, request, *args, **kwargs)
+        entry = _cache_entry(response)
+        if entry is not None:
+            await cache.aset(key, entry, _timeout())
+        response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
@@ -0,0 +1,152 @@
+"""
+ETag and Last-Modified validators for conditional requests.
+
+Validators are derived from the database rows a response is built from, never
+from counters kept in a cache, so every worker process computes the same ones
+and writes that bypass signals (``.update()``, raw SQL, bulk loads) still
+change them. Bodies are never serialized to compute them:
+
+* lists (articles, feed, search, comments) hash the rows of the requested page,
+  fetched the way the fast serialization path fetches them, together with the
+  pagination state (total count, or whether neighbouring pages exist). The
+  views check the request's conditional headers between fetching the page and
+  serializing it (``page_validators``/``not_modified``);
+* a single article hashes one indexed query by slug and its sorted tag names
+  (``article_condition``), which also guards ``PUT``/``PATCH``/``DELETE``
+  with ``If-Match`` (412, or 404 when there is no such article);
+* profiles hash the user's public columns.
+
+Bodies contain per-user fields (``favorited``, ``following``), so validators
+also hash the requesting user's id and the flags they see.
+
+``Last-Modified`` is the newest ``updated_at`` of the rows shown; profiles have
+no timestamp and only send an ETag. Counters, flags and author profile edits
+do not move ``updated_at`` but do change the ETag, and ``If-None-Match`` takes
+precedence over ``If-Modified-Since``, so clients should revalidate with ETags.
+"""
+import hashlib
+from calendar import timegm
+
+from django.db.models import Exists, OuterRef
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+from .caching import normalize_query
+from .models import Article, User
+from .serializers import aget_following_ids, get_following_ids
+
+
+def _etag(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def _following(request):
+    # The follow set is loaded once per request and reused by serialization
+    return get_following_ids(request) if request.user.is_authenticated else set()
+
+
+def pagination_state(paginator):
+    """What a paginated envelope shows besides its rows"""
+    if paginator is None:
+        return ()
+    if hasattr(paginator, 'has_next'):
+        # KeysetPagination: links depend on whether neighbouring pages exist
+        return paginator.has_next, paginator.has_previous
+    return (paginator.page.paginator.count,)
+
+
+def page_validators(request, rows, *state):
+    """
+    ``(etag, last_modified)`` of a page of ``fast_serializers`` rows; ``state``
+    holds whatever else the body shows (see ``pagination_state``).
+    """
+    following = _following(request)
+    followed = sorted({row['author_id'] for row in rows} & following)
+    etag = _etag(request.path, normalize_query(request.query_params), request.user.pk,
+                 *state, followed, *rows)
+    last_modified = max((row['updated_at'] for row in rows), default=None)
+    return etag, last_modified
+
+
+async def apage_validators(request, rows, *state):
+    """``page_validators`` for async views"""
+    if request.user.is_authenticated:
+        await aget_following_ids(request)
+    return page_validators(request, rows, *state)
+
+
+def profile_validators(request, profile):
+    following = profile.pk in _following(request)
+    return _etag('profile', profile.pk, profile.username, profile.bio, profile.image,
+                 request.user.pk, following), None
+
+
+def not_modified(request, etag, last_modified=None):
+    """The 304 (or 412) answering ``request``'s conditional headers, or None"""
+    response = get_conditional_response(
+        request,
+        etag=quote_etag(etag),
+        last_modified=last_modified and timegm(last_modified.utctimetuple()),
+    )
+    if response is not None:
+        add_validators(response, etag, last_modified)
+    return response
+
+
+def add_validators(response, etag, last_modified=None):
+    response['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    return response
+
+
+def _article_state_query(request, slug):
+    # One row per tag (a single row with no name for an untagged article), so
+    # the tag names come back in the same query
+    fields = ['id', 'updated_at', 'favorites_count', 'author_id',
+              'author__username', 'author__bio', 'author__image']
+    queryset = Article.objects.filter(slug=slug)
+    user = request.user
+    if user.is_authenticated:
+        queryset = queryset.with_favorites(user).annotate(author_followed=Exists(
+            User.following.through.objects.filter(from_user_id=user.pk, to_user_id=OuterRef('author_id'))
+        ))
+        fields += ['is_favorited', 'author_followed']
+    return queryset.order_by('tags__name').values_list(*fields, 'tags__name')
+
+
+def _article_state_from(rows):
+    if not rows:
+        return None
+    return (*rows[0][:-1], tuple(row[-1] for row in rows if row[-1] is not None))
+
+
+def _article_state(request, slug):
+    if not hasattr(request, '_article_state'):
+        request._article_state = _article_state_from(list(_article_state_query(request, slug)))
+    return request._article_state
+
+
+async def aload_article_state(request, slug):
+    """Load the state ``article_condition`` reads, so async views never block on it"""
+    if not hasattr(request, '_article_state'):
+        rows = [row async for row in _article_state_query(request, slug)]
+        request._article_state = _article_state_from(rows)
+
+
+def article_etag(request, slug=None, **kwargs):
+    state = _article_state(request, slug)
+    if state is None:
+        # Without an ETag, ``condition`` answers If-Match with 412
+        raise Http404('No Article matches the given query.')
+    return _etag('article', *state, request.user.pk)
+
+
+def article_last_modified(request, slug=None, **kwargs):
+    state = _article_state(request, slug)
+    return state[1] if state is not None else None
+
+
+article_condition = condition(etag_func=article_etag, last_modified_func=article_last_modified)
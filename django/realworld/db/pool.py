@@ -0,0 +1,160 @@
+"""
+A thread-safe pool of DB-API connections.
+
+Used by the ``realworld.db.pooled`` database backend: Django's per-thread (and,
+under ASGI, per-``sync_to_async`` thread) ``DatabaseWrapper`` checks a
+connection out when it connects and returns it when Django closes the
+connection at the end of each request.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from .. import metrics
+
+
+class ConnectionPool:
+    """
+    Keep between ``min_size`` and ``max_size`` connections made by ``connect``.
+
+    ``acquire`` hands out an idle connection that passes ``check`` (or opens a
+    new one) and waits up to ``timeout`` seconds for one to be released when
+    ``max_size`` connections are in use, then raises ``timeout_error``.
+    Connections older than ``max_lifetime`` seconds are closed instead of
+    being reused.
+    """
+
+    def __init__(self, name, connect, check, min_size=1, max_size=10, max_lifetime=1800,
+                 timeout=10, timeout_error=TimeoutError):
+        self.name = name
+        self._connect = connect
+        self._check = check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.timeout_error = timeout_error
+        self.pid = os.getpid()
+
+        self._lock = threading.Condition()
+        self._idle = deque()
+        self._created = {}
+        self._in_use = 0
+        self._opening = 0
+        self._filled = False
+
+    @property
+    def size(self):
+        return len(self._created) + self._opening
+
+    def acquire(self):
+        started = time.monotonic()
+        self._fill()
+        while True:
+            conn = self._reserve(started + self.timeout)
+            if conn is None:
+                conn = self._open_reserved()
+                break
+            # Health checks run outside the lock; a failed one frees the slot
+            if not self._expired(conn) and self._check(conn):
+                break
+            metrics.incr(f'{self.name}.discarded')
+            self.release(conn, discard=True)
+        metrics.observe(f'{self.name}.wait', time.monotonic() - started)
+        return conn
+
+    def _reserve(self, deadline):
+        """Check out an idle connection, or return None after reserving a slot for a new one"""
+        with self._lock:
+            while not self._idle and self.size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.incr(f'{self.name}.timeouts')
+                    raise self.timeout_error(
+                        f'Timed out after {self.timeout}s waiting for a connection from {self.name}'
+                    )
+                self._lock.wait(remaining)
+            self._in_use += 1
+            if self._idle:
+                conn = self._idle.pop()  # most recently used, so surplus ones age out
+            else:
+                conn = None
+                self._opening += 1
+            self._report()
+            return conn
+
+    def _open_reserved(self):
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._lock:
+                self._opening -= 1
+                self._in_use -= 1
+                self._report()
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._opening -= 1
+            self._created[id(conn)] = time.monotonic()
+        return conn
+
+    def release(self, conn, discard=False):
+        with self._lock:
+            self._in_use -= 1
+            if discard or self._expired(conn):
+                self._discard(conn)
+            else:
+                self._idle.append(conn)
+            self._report()
+            self._lock.notify()
+
+    def close(self):
+        """Close the idle connections, e.g. before forking or at shutdown"""
+        with self._lock:
+            while self._idle:
+                self._discard(self._idle.popleft())
+            self._filled = False
+            self._report()
+
+    def stats(self):
+        with self._lock:
+            return {'size': self.size, 'in_use': self._in_use, 'idle': len(self._idle)}
+
+    def _fill(self):
+        """Open connections up to ``min_size`` on first use"""
+        with self._lock:
+            if self._filled:
+                return
+            self._filled = True
+        while True:
+            with self._lock:
+                if self.size >= self.min_size:
+                    return
+                self._opening += 1
+            try:
+                conn = self._connect()
+            finally:
+                with self._lock:
+                    self._opening -= 1
+            with self._lock:
+                self._created[id(conn)] = time.monotonic()
+                self._idle.append(conn)
+                self._report()
+                self._lock.notify()
+
+    def _expired(self, conn):
+        created = self._created.get(id(conn))
+        return created is None or time.monotonic() - created >= self.max_lifetime
+
+    def _discard(self, conn):
+        self._created.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _report(self):
+        metrics.set_value(f'{self.name}.size', self.size)
+        metrics.set_value(f'{self.name}.in_use', self._in_use)
+        metrics.set_value(f'{self.name}.idle', len(self._idle))
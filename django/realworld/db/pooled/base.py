@@ -0,0 +1,129 @@
+"""
+Pooled database backend.
+
+Wraps another backend's ``DatabaseWrapper`` so connections come from a
+``realworld.db.pool.ConnectionPool`` instead of being opened and closed for
+every request::
+
+    DATABASES['default'] = {
+        'ENGINE': 'realworld.db.pooled',
+        'NAME': ..., 'USER': ..., 'OPTIONS': ...,   # as for the wrapped engine
+        'POOL': {
+            'ENGINE': 'django.db.backends.mysql',   # the wrapped backend
+            'MIN_SIZE': 1,
+            'MAX_SIZE': 10,
+            'MAX_LIFETIME': 1800,                    # seconds
+            'TIMEOUT': 10,                           # seconds to wait at checkout
+            'HEALTH_CHECK': True,                    # ping idle connections at checkout
+        },
+    }
+
+Django keeps one ``DatabaseWrapper`` per thread, and ASGI runs sync code in
+``sync_to_async`` threads, so each thread checks a connection out when it
+first queries and returns it when Django closes the connection at the end of
+the request (keep ``CONN_MAX_AGE`` at 0). Pools are per process; a process
+forked after a pool was created starts a new one.
+
+Pool utilisation (``db_pool.<alias>.size``/``in_use``/``idle``), checkout wait
+time (``db_pool.<alias>.wait``), timeouts and discarded connections are
+reported through ``realworld.metrics``.
+"""
+import os
+import threading
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.utils import load_backend
+
+from ..pool import ConnectionPool
+
+POOL_DEFAULTS = {
+    'ENGINE': 'django.db.backends.mysql',
+    'MIN_SIZE': 1,
+    'MAX_SIZE': 10,
+    'MAX_LIFETIME': 1800,
+    'TIMEOUT': 10,
+    'HEALTH_CHECK': True,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+_wrapper_classes = {}
+
+
+def pool_settings(settings_dict):
+    return {**POOL_DEFAULTS, **settings_dict.get('POOL', {})}
+
+
+class PooledWrapperMixin:
+    """Check connections out of the pool instead of opening them"""
+
+    def get_pool(self, conn_params):
+        options = pool_settings(self.settings_dict)
+        key = (self.alias, repr(sorted(conn_params.items())), repr(sorted(options.items())))
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None or pool.pid != os.getpid():
+                pool = _pools[key] = ConnectionPool(
+                    f'db_pool.{self.alias}',
+                    connect=lambda: super(PooledWrapperMixin, self).get_new_connection(conn_params),
+                    check=self.check_raw_connection if options['HEALTH_CHECK'] else lambda conn: True,
+                    min_size=options['MIN_SIZE'],
+                    max_size=options['MAX_SIZE'],
+                    max_lifetime=options['MAX_LIFETIME'],
+                    timeout=options['TIMEOUT'],
+                    timeout_error=self.Database.OperationalError,
+                )
+            return pool
+
+    def get_new_connection(self, conn_params):
+        self._pool = self.get_pool(conn_params)
+        return self._pool.acquire()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Connections closed inside an atomic block stay referenced by the
+        # wrapper, and failed ones may be broken: neither goes back
+        discard = self.in_atomic_block or self.errors_occurred
+        if not discard and not self.autocommit:
+            try:
+                self.connection.rollback()
+            except self.Database.Error:
+                discard = True
+        self._pool.release(self.connection, discard=discard)
+
+    def check_raw_connection(self, conn):
+        """Whether an idle DB-API connection still answers"""
+        try:
+            if hasattr(conn, 'ping'):
+                # PyMySQL reconnects silently by default, which would hand out
+                # a new session that lost its settings; a failure discards it
+                conn.ping(reconnect=False)
+            else:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute('SELECT 1')
+                finally:
+                    cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+
+def pooled_wrapper_class(engine):
+    """The pooled subclass of ``engine``'s ``DatabaseWrapper`` (cached)"""
+    wrapper_class = _wrapper_classes.get(engine)
+    if wrapper_class is None:
+        base = load_backend(engine).DatabaseWrapper
+        wrapper_class = _wrapper_classes[engine] = type(
+            f'Pooled{base.__name__}', (PooledWrapperMixin, base), {'__module__': __name__},
+        )
+    return wrapper_class
+
+
+class DatabaseWrapper:
+    """Instantiates the pooled wrapper of the engine named in ``POOL['ENGINE']``"""
+
+    def __new__(cls, settings_dict, alias=DEFAULT_DB_ALIAS):
+        engine = pool_settings(settings_dict)['ENGINE']
+        return pooled_wrapper_class(engine)(settings_dict, alias)
@@ -0,0 +1,181 @@
+"""
+Read-only fast path for article and comment lists.
+
+``ArticleSerializer`` and ``CommentSerializer`` build every field through DRF's
+per-instance machinery (bound fields, nested ``ProfileSerializer``,
+``SerializerMethodField`` dispatch). For read-only list endpoints this module
+builds the same RealWorld dicts straight from ``.values()`` rows instead, with
+the column accessors and datetime formatting prepared once per call.
+
+The output is byte-for-byte what the DRF serializers produce; writes and
+single-object responses keep using ``realworld.serializers``. The
+``a``-prefixed variants load the tags and follow set with the async ORM, for
+the views in ``realworld.async_views``.
+"""
+import asyncio
+from datetime import timezone as dt_timezone
+from operator import itemgetter
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601
+from rest_framework.fields import DateTimeField
+from rest_framework.settings import api_settings
+
+from .models import Article
+from .serializers import aget_following_ids, get_following_ids
+
+AUTHOR_FIELDS = ('author_id', 'author__username', 'author__bio', 'author__image')
+ARTICLE_FIELDS = (
+    'id', 'slug', 'title', 'description', 'body', 'created_at', 'updated_at',
+    'favorites_count', 'is_favorited',
+) + AUTHOR_FIELDS
+COMMENT_FIELDS = ('id', 'body', 'created_at', 'updated_at') + AUTHOR_FIELDS
+
+_author = itemgetter(*AUTHOR_FIELDS)
+_article = itemgetter(
+    'id', 'slug', 'title', 'description', 'body', 'created_at', 'updated_at',
+    'favorites_count', 'is_favorited',
+)
+_comment = itemgetter('id', 'body', 'created_at', 'updated_at')
+
+
+def article_rows(queryset):
+    """``.values()`` rows for ``serialize_articles``; expects ``with_favorites()``"""
+    return queryset.prefetch_related(None).values(*ARTICLE_FIELDS)
+
+
+def comment_rows(queryset):
+    return queryset.values(*COMMENT_FIELDS)
+
+
+def datetime_formatter():
+    """Return a function formatting datetimes exactly like ``DateTimeField``"""
+    output_format = api_settings.DATETIME_FORMAT
+    if output_format is None or output_format.lower() != ISO_8601:
+        return DateTimeField().to_representation
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def format_datetime(value):
+        if not value:
+            return None
+        if tz is not None:
+            value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+        elif timezone.is_aware(value):
+            value = timezone.make_naive(value, dt_timezone.utc)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return format_datetime
+
+
+def _profile_builder(request):
+    following = set()
+    if request is not None and request.user.is_authenticated:
+        following = get_following_ids(request)
+
+    def build_profile(row):
+        author_id, username, bio, image = _author(row)
+        return {
+            'username': username,
+            'bio': bio,
+            'image': image,
+            'following': author_id in following,
+        }
+    return build_profile
+
+
+def _tag_links(article_ids):
+    return (
+        Article.tags.through.objects
+        .filter(article_id__in=article_ids)
+        .order_by('tag__name')
+        .values_list('article_id', 'tag__name')
+    )
+
+
+def tag_names_by_article(article_ids):
+    """``{article_id: [tag names sorted like Tag.Meta.ordering]}`` in one query"""
+    tags = {article_id: [] for article_id in article_ids}
+    for article_id, name in _tag_links(article_ids):
+        tags[article_id].append(name)
+    return tags
+
+
+async def atag_names_by_article(article_ids):
+    tags = {article_id: [] for article_id in article_ids}
+    async for article_id, name in _tag_links(article_ids):
+        tags[article_id].append(name)
+    return tags
+
+
+async def _aload_following(request):
+    if request is not None and request.user.is_authenticated:
+        await aget_following_ids(request)
+
+
+def serialize_articles(rows, request=None):
+    """Build ``ArticleSerializer``-shaped dicts from ``article_rows`` rows"""
+    rows = list(rows)
+    if not rows:
+        return []
+    return _build_articles(rows, tag_names_by_article([row['id'] for row in rows]), request)
+
+
+async def aserialize_articles(rows, request=None):
+    """``serialize_articles`` for a list of rows already fetched by an async view"""
+    if not rows:
+        return []
+    tags, _ = await asyncio.gather(
+        atag_names_by_article([row['id'] for row in rows]),
+        _aload_following(request),
+    )
+    return _build_articles(rows, tags, request)
+
+
+def _build_articles(rows, tags, request):
+    format_datetime = datetime_formatter()
+    build_profile = _profile_builder(request)
+
+    data = []
+    for row in rows:
+        (article_id, slug, title, description, body, created_at, updated_at,
+         favorites_count, is_favorited) = _article(row)
+        data.append({
+            'slug': slug,
+            'title': title,
+            'description': description,
+            'body': body,
+            'tagList': tags[article_id],
+            'createdAt': format_datetime(created_at),
+            'updatedAt': format_datetime(updated_at),
+            'favorited': bool(is_favorited),
+            'favoritesCount': favorites_count,
+            'author': build_profile(row),
+        })
+    return data
+
+
+async def aserialize_comments(rows, request=None):
+    """``serialize_comments`` for a list of rows already fetched by an async view"""
+    await _aload_following(request)
+    return serialize_comments(rows, request)
+
+
+def serialize_comments(rows, request=None):
+    """Build ``CommentSerializer``-shaped dicts from ``comment_rows`` rows"""
+    format_datetime = datetime_formatter()
+    build_profile = _profile_builder(request)
+
+    data = []
+    for row in rows:
+        comment_id, body, created_at, updated_at = _comment(row)
+        data.append({
+            'id': comment_id,
+            'body': body,
+            'author': build_profile(row),
+            'createdAt': format_datetime(created_at),
+            'updatedAt': format_datetime(updated_at),
+        })
+    return data
@@ -0,0 +1,229 @@
+"""
+Materialized feed inboxes (fan-out-on-write).
+
+New articles are copied into a ``FeedEntry`` row per follower so that a feed
+page is an indexed range read on ``(user, -created_at)`` (see ``Feed``).
+Authors with more than ``REALWORLD_FEED_FANOUT_LIMIT`` followers are not
+fanned out; their articles are flagged ``fanout_on_read`` and merged into
+followers' feeds at request time instead.
+
+Inboxes are capped at ``REALWORLD_FEED_INBOX_SIZE`` entries by
+``trim_inboxes`` (``manage.py trim_feed_inboxes``, run periodically) rather
+than on every publish; an inbox over the cap only shows a longer feed.
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.constants import OnConflict
+
+from .models import Article, FeedEntry, User
+
+BATCH_SIZE = 1000
+REBUILD_AUTHORS_PER_QUERY = 100
+
+
+def inbox_size():
+    return getattr(settings, 'REALWORLD_FEED_INBOX_SIZE', 1000)
+
+
+def fanout_limit():
+    return getattr(settings, 'REALWORLD_FEED_FANOUT_LIMIT', 10000)
+
+
+def feed_filter(user):
+    """
+    Q object selecting the articles in ``user``'s feed, for unpaginated
+    ``?stream=true`` exports; pages are read through ``Feed``
+    """
+    inbox = FeedEntry.objects.filter(user=user).values('article_id')
+    return Q(id__in=inbox) | Q(fanout_on_read=True, author__in=user.following.all())
+
+
+def fan_out_article(article):
+    """Copy a new article into its author's followers' inboxes"""
+    followers = User.following.through.objects.filter(to_user_id=article.author_id)
+    if followers.count() > fanout_limit():
+        Article.objects.filter(pk=article.pk).update(fanout_on_read=True)
+        return
+
+    follower_ids = list(followers.values_list('from_user_id', flat=True))
+    for start in range(0, len(follower_ids), BATCH_SIZE):
+        batch = follower_ids[start:start + BATCH_SIZE]
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, article_id=article.pk, created_at=article.created_at)
+             for user_id in batch],
+            ignore_conflicts=True,
+        )
+
+
+def backfill_inbox(user_id, author_ids):
+    """Add the recent articles of newly followed authors to an inbox"""
+    recent = (
+        Article.objects
+        .filter(author_id__in=author_ids, fanout_on_read=False)
+        .order_by('-created_at')
+        .values_list('id', 'created_at')[:inbox_size()]
+    )
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, article_id=article_id, created_at=created_at)
+         for article_id, created_at in recent],
+        ignore_conflicts=True,
+    )
+    trim_inbox(user_id)
+
+
+def prune_inbox(user_id, author_ids=None):
+    """Remove unfollowed authors' articles (or everything) from an inbox"""
+    entries = FeedEntry.objects.filter(user_id=user_id)
+    if author_ids is not None:
+        entries = entries.filter(article__author_id__in=author_ids)
+    entries.delete()
+
+
+def trim_inbox(user_id):
+    """
+    Delete the entries beyond the inbox size: one indexed read of the cutoff
+    entry, then a range delete below it
+    """
+    entries = FeedEntry.objects.filter(user_id=user_id)
+    cutoff = list(
+        entries.order_by('-created_at', '-article_id')
+        .values_list('created_at', 'article_id')[inbox_size():inbox_size() + 1]
+    )
+    if cutoff:
+        created_at, article_id = cutoff[0]
+        entries.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, article_id__lte=article_id)
+        ).delete()
+
+
+def trim_inboxes():
+    """Trim every inbox holding more than the inbox size; returns how many"""
+    crowded = (
+        FeedEntry.objects
+        .order_by()
+        .values('user_id')
+        .annotate(entries=Count('*'))
+        .filter(entries__gt=inbox_size())
+        .values_list('user_id', flat=True)
+    )
+    user_ids = list(crowded)
+    for user_id in user_ids:
+        trim_inbox(user_id)
+    return len(user_ids)
+
+
+def rebuild_inbox(user):
+    """
+    Recreate one user's inbox from the authors they follow.
+
+    The newest articles of each followed author are read from the
+    ``(author, -created_at)`` index (one ``LIMIT`` branch per author, joined
+    with ``UNION ALL``) and copied with ``INSERT ... SELECT``, so the cost
+    depends on the number of follows rather than on how much those authors
+    wrote, and no row is materialized in Python.
+
+    The rebuild is one transaction, and entries that a concurrent
+    ``fan_out_article`` inserted first are skipped rather than failing it.
+    """
+    with transaction.atomic():
+        _rebuild_inbox(user)
+
+
+def _rebuild_inbox(user):
+    prune_inbox(user.pk)
+    author_ids = list(user.following.values_list('id', flat=True))
+    limit = inbox_size()
+    table = connection.ops.quote_name(FeedEntry._meta.db_table)
+    # INSERT IGNORE / INSERT OR IGNORE / ... ON CONFLICT DO NOTHING
+    insert = connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)
+    on_conflict = connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, None, None)
+    # SQLite caps compound SELECTs at 500 terms
+    for start in range(0, len(author_ids), REBUILD_AUTHORS_PER_QUERY):
+        branches, params = [], [user.pk]
+        for author_id in author_ids[start:start + REBUILD_AUTHORS_PER_QUERY]:
+            newest = (
+                Article.objects
+                .filter(author_id=author_id, fanout_on_read=False)
+                .order_by('-created_at', '-id')
+                .values('id', 'created_at')[:limit]
+            )
+            sql, branch_params = newest.query.sql_with_params()
+            branches.append(f'SELECT * FROM ({sql}) branch{len(branches)}')
+            params.extend(branch_params)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{insert} {table} (user_id, article_id, created_at) '
+                f'SELECT %s, recent.id, recent.created_at FROM ({" UNION ALL ".join(branches)}) recent '
+                f'ORDER BY recent.created_at DESC, recent.id DESC LIMIT %s {on_conflict}',
+                (*params, limit),
+            )
+    if len(author_ids) > REBUILD_AUTHORS_PER_QUERY:
+        trim_inbox(user.pk)
+
+
+class Feed:
+    """
+    The feed of ``user``, who follows ``following_ids``, newest first, as a
+    sequence of ``articles`` rows (an ``article_rows`` queryset).
+
+    A slice reads the ``(created_at, article_id)`` keys of the inbox from the
+    ``(user, -created_at)`` index, merges them with those of the followed
+    fan-out-on-read authors' newest articles, and only then fetches the
+    articles of the slice by primary key. Provides what Django's ``Paginator``
+    (``count()`` and slicing) and ``KeysetPagination`` (``seek()``) use.
+    """
+    ordered = True
+
+    def __init__(self, user, following_ids, articles, position=None, reverse=False):
+        self.user = user
+        self.following_ids = following_ids
+        self.articles = articles
+        self.position = position
+        self.reverse = reverse
+
+    def seek(self, position, reverse=False):
+        """The entries after ``(created_at, id)``, or before it if ``reverse``"""
+        return Feed(self.user, self.following_ids, self.articles, position, reverse)
+
+    def _keys(self, queryset, id_field):
+        if self.position is not None:
+            created_at, pk = self.position
+            if self.reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, **{f'{id_field}__gt': pk})
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, **{f'{id_field}__lt': pk})
+                )
+        order = ('created_at', id_field) if self.reverse else ('-created_at', f'-{id_field}')
+        return queryset.order_by(*order).values_list('created_at', id_field)
+
+    def _inbox(self):
+        return self._keys(FeedEntry.objects.filter(user=self.user), 'article_id')
+
+    def _read_time(self):
+        articles = Article.objects.filter(fanout_on_read=True, author_id__in=self.following_ids)
+        return self._keys(articles, 'id')
+
+    def count(self):
+        return self._inbox().count() + self._read_time().count()
+
+    def __iter__(self):
+        return iter(self[:self.count()])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None or index.stop is None:
+            raise TypeError('Feed only supports bounded slices')
+        start, stop = index.start or 0, index.stop
+        if stop <= start:
+            return []
+        merged = heapq.merge(self._inbox()[:stop], self._read_time()[:stop], reverse=not self.reverse)
+        ids = [pk for _, pk in islice(merged, start, stop)]
+        rows = {row['id']: row for row in self.articles.filter(id__in=ids)}
+        # Articles deleted since their keys were read are skipped
+        return [rows[pk] for pk in ids if pk in rows]
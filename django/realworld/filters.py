@@ -1,16 +1,41 @@
 from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
 from .models import Article
 
 
+class StableOrderingFilter(filters.OrderingFilter):
+    """
+    ``OrderingFilter`` that breaks ties newest first, then by id, so rows with
+    equal values (most favorite counts are equal) keep one order across pages.
+    """
+    tie_breakers = ('-created_at', '-id')
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        ordering = [self.get_ordering_value(param) for param in value]
+        ordered = {field.lstrip('-') for field in ordering}
+        return qs.order_by(*ordering, *(
+            field for field in self.tie_breakers if field.lstrip('-') not in ordered
+        ))
+
+
 class ArticleFilter(filters.FilterSet):
     """Filter for articles by tag, author, and favorited"""
     tag = filters.CharFilter(field_name='tags__name', lookup_expr='iexact')
     author = filters.CharFilter(field_name='author__username', lookup_expr='iexact')
     favorited = filters.CharFilter(method='filter_favorited')
+    min_favorites = filters.NumberFilter(field_name='favorites_count', lookup_expr='gte')
+    ordering = StableOrderingFilter(
+        fields=(
+            ('favorites_count', 'favoritesCount'),
+            ('created_at', 'createdAt'),
+        )
+    )
 
     class Meta:
         model = Article
-        fields = ['tag', 'author', 'favorited']
+        fields = ['tag', 'author', 'favorited', 'min_favorites']
 
     def filter_favorited(self, queryset, name, value):
         """Filter articles favorited by a specific username"""
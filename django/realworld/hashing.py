@@ -0,0 +1,121 @@
+"""
+Password hashing on a bounded process pool.
+
+PBKDF2 is deliberately slow, so hashing on a request worker pins it (and,
+under the GIL, slows every other request it serves). ``make_password`` and
+``check_password`` (used by ``EmailBackend``, and ``amake_password`` by the
+async registration and profile update views) run the hasher in a
+``ProcessPoolExecutor`` of ``REALWORLD_PASSWORD_HASH_WORKERS`` processes.
+
+At most ``REALWORLD_PASSWORD_HASH_QUEUE_SIZE`` jobs may be pending at once;
+beyond that ``HashingUnavailable`` (503) is raised instead of queueing more
+work. The ``password_hash.queue_depth`` gauge and the ``password_hash.latency``
+timing are reported through ``realworld.metrics``.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import metrics
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-ins in progress, please retry shortly.'
+    default_code = 'password_hashing_unavailable'
+
+
+def pool_size():
+    return getattr(settings, 'REALWORLD_PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+
+
+def queue_size():
+    return getattr(settings, 'REALWORLD_PASSWORD_HASH_QUEUE_SIZE', 64)
+
+
+def _init_worker(settings_module):
+    # Spawned workers start from a fresh interpreter
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+class HashingPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=pool_size(),
+                # fork is unsafe once the server has started threads
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),),
+            )
+        return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= queue_size():
+                metrics.incr('password_hash.rejected')
+                raise HashingUnavailable()
+            self._pending += 1
+            metrics.set_value('password_hash.queue_depth', self._pending)
+            return self._get_executor()
+
+    def _release(self, started):
+        metrics.observe('password_hash.latency', time.perf_counter() - started)
+        with self._lock:
+            self._pending -= 1
+            metrics.set_value('password_hash.queue_depth', self._pending)
+
+    def run(self, func, *args):
+        """Run ``func(*args)`` on the pool, or raise ``HashingUnavailable`` when full"""
+        executor = self._acquire()
+        started = time.perf_counter()
+        try:
+            return executor.submit(func, *args).result()
+        finally:
+            self._release(started)
+
+    async def arun(self, func, *args):
+        executor = self._acquire()
+        started = time.perf_counter()
+        try:
+            return await asyncio.wrap_future(executor.submit(func, *args))
+        finally:
+            self._release(started)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+pool = HashingPool()
+
+
+def make_password(password):
+    """``django.contrib.auth.hashers.make_password`` run on the pool"""
+    return pool.run(hashers.make_password, password)
+
+
+def check_password(password, encoded):
+    """Verify ``password`` against the ``encoded`` hash on the pool"""
+    return pool.run(hashers.check_password, password, encoded)
+
+
+async def amake_password(password):
+    return await pool.arun(hashers.make_password, password)
@@ -0,0 +1,80 @@
+"""
+Deferred ``last_login`` writes.
+
+With ``SIMPLE_JWT['UPDATE_LAST_LOGIN']`` enabled every login would issue an
+``UPDATE users`` on the request path. ``record_login`` only stores the
+timestamp in memory; a daemon thread writes the pending timestamps every
+``REALWORLD_LAST_LOGIN_FLUSH_INTERVAL`` seconds with a single ``bulk_update``.
+Timestamps still pending when the process exits are flushed at exit. Set
+``REALWORLD_DEFER_LAST_LOGIN = False`` to write on the request path instead.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+def flush_interval():
+    return getattr(settings, 'REALWORLD_LAST_LOGIN_FLUSH_INTERVAL', 5)
+
+
+class LastLoginWriter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._thread = None
+
+    def record(self, user_id, when):
+        with self._lock:
+            self._pending[user_id] = when
+            if self._thread is None:
+                self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='last-login-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(flush_interval())
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Could not write deferred last_login timestamps')
+            finally:
+                connection.close()
+
+    def flush(self):
+        """Write the pending timestamps; returns the number of users updated"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        User.objects.bulk_update(
+            [User(pk=user_id, last_login=when) for user_id, when in pending.items()],
+            ['last_login'],
+        )
+        return len(pending)
+
+
+writer = LastLoginWriter()
+atexit.register(writer.flush)
+
+
+def record_login(user):
+    """Queue a ``last_login`` update for ``user``"""
+    now = timezone.now()
+    user.last_login = now
+    if getattr(settings, 'REALWORLD_DEFER_LAST_LOGIN', True):
+        writer.record(user.pk, now)
+    else:
+        User.objects.filter(pk=user.pk).update(last_login=now)
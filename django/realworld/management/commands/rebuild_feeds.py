@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from realworld.feed import rebuild_inbox
+from realworld.models import User
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized feed inboxes from follow edges'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help='Only rebuild the inbox of this username (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        rebuilt = 0
+        for user in users.iterator(chunk_size=500):
+            rebuild_inbox(user)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} feed inbox(es)'))
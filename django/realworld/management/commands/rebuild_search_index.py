@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from realworld.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Repopulate the article full-text search index'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the {backend.name} search index'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from realworld.caching import bump_version
+from realworld.tags import rebuild_popularity
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-tag article counts behind /api/tags/?top=N'
+
+    def handle(self, *args, **options):
+        counted = rebuild_popularity()
+        bump_version('tags')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt popularity of {counted} tag(s)'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from realworld.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Repair drift between Article.favorites_count and the favorites table'
+
+    def handle(self, *args, **options):
+        fixed = Article.objects.reconcile_favorites_count()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled favorites_count on {fixed} article(s)'))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from realworld.seeding import generate, rebuild_derived_data
+
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic data set with skewed (Zipf) distributions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--articles', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=500)
+        parser.add_argument('--follows', type=float, default=20,
+                            help='Mean number of users each user follows')
+        parser.add_argument('--tags-per-article', type=float, default=3)
+        parser.add_argument('--favorites', type=float, default=5,
+                            help='Mean number of favorites per article')
+        parser.add_argument('--comments', type=float, default=3,
+                            help='Mean number of comments per article')
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Exponent of the author, tag and favoriting-user distributions')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Rows per INSERT statement')
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Users or articles generated per unit of work')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Worker processes loading chunks in parallel')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed', help='Username prefix of the generated users')
+        parser.add_argument('--password', default='password123')
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help='Do not rebuild tag popularity, the search index and feed inboxes')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 and options['articles'] > 0:
+            raise CommandError('Articles need at least one user')
+        for name in ('batch_size', 'chunk_size', 'workers'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be positive')
+
+        started = time.perf_counter()
+
+        def log(message):
+            self.stdout.write(f'[{time.perf_counter() - started:7.1f}s] {message}')
+
+        generate(
+            users=options['users'],
+            articles=options['articles'],
+            tag_count=options['tags'],
+            follows=options['follows'],
+            tags_per_article=options['tags_per_article'],
+            favorites=options['favorites'],
+            comments=options['comments'],
+            zipf_s=options['zipf'],
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            password=options['password'],
+            log=log,
+        )
+        if not options['skip_rebuild']:
+            rebuild_derived_data(workers=options['workers'], log=log)
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.perf_counter() - started:.1f}s'))
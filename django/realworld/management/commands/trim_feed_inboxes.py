@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from realworld.feed import trim_inboxes
+
+
+class Command(BaseCommand):
+    help = 'Delete feed inbox entries beyond REALWORLD_FEED_INBOX_SIZE (run periodically)'
+
+    def handle(self, *args, **options):
+        trimmed = trim_inboxes()
+        self.stdout.write(self.style.SUCCESS(f'Trimmed {trimmed} feed inbox(es)'))
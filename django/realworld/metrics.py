@@ -0,0 +1,41 @@
+"""
+In-process counters, gauges and timings exposed through ``MetricsView``.
+
+Values are per worker process; they reset on restart and are meant for quick
+measurements rather than long-term monitoring.
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+
+
+def incr(name, value=1):
+    """Increase the counter ``name`` by ``value``"""
+    with _lock:
+        _counters[name] += value
+
+
+def set_value(name, value):
+    """Set the gauge ``name`` to ``value``"""
+    with _lock:
+        _counters[name] = value
+
+
+def observe(name, seconds):
+    """Record one timing: ``<name>.count`` and ``<name>.total_ms`` accumulate"""
+    with _lock:
+        _counters[f'{name}.count'] += 1
+        _counters[f'{name}.total_ms'] += seconds * 1000
+
+
+def snapshot():
+    """Return a copy of all counters"""
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,197 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .routers import request_scope
+
+logger = logging.getLogger('realworld.sql')
+
+PIN_COOKIE = 'realworld_pin'
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Open a replica routing scope (``realworld.routers``) for each request.
+
+    Unsafe requests and requests carrying the pin cookie read from the
+    primary. A request that wrote sets the cookie for
+    ``REALWORLD_REPLICA_PIN_SECONDS`` so the client's next reads also go to the
+    primary while replicas catch up.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_scope(self.pinned(request)) as state:
+            response = self.get_response(request)
+        return self.process_response(state, response)
+
+    async def __acall__(self, request):
+        with request_scope(self.pinned(request)) as state:
+            response = await self.get_response(request)
+        return self.process_response(state, response)
+
+    @staticmethod
+    def pinned(request):
+        return request.method in UNSAFE_METHODS or PIN_COOKIE in request.COOKIES
+
+    @staticmethod
+    def process_response(state, response):
+        if state.wrote:
+            max_age = getattr(settings, 'REALWORLD_REPLICA_PIN_SECONDS', 5)
+            response.set_cookie(PIN_COOKIE, '1', max_age=max_age, httponly=True, samesite='Lax')
+        return response
+
+
+# Quoted strings and numbers inlined in SQL, and ``IN (%s, %s, ...)`` lists
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+SQL_IN_LISTS = re.compile(r'\bIN \(%s(?:\s*,\s*%s)*\)')
+
+
+def query_shape(sql):
+    """``sql`` with literals and ``IN`` lists collapsed, so that repeated
+    lookups with different parameters compare equal"""
+    return SQL_IN_LISTS.sub('IN (...)', SQL_LITERALS.sub('%s', sql))
+
+
+def duplicate_threshold():
+    return getattr(settings, 'REALWORLD_SQL_DUPLICATE_THRESHOLD', 3)
+
+
+class QueryLog:
+    """Number, time and shapes of the SQL statements run for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[query_shape(sql)] += 1
+
+    def duplicates(self, threshold=None):
+        """``{shape: executions}`` of the shapes run at least ``threshold`` times"""
+        threshold = threshold or duplicate_threshold()
+        return {shape: count for shape, count in self.shapes.most_common() if count >= threshold}
+
+
+_query_log = ContextVar('realworld_query_log', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper timing each statement into the current request's QueryLog"""
+    log = _query_log.get()
+    if log is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        log.record(sql, time.perf_counter() - start)
+
+
+def install_query_recorder():
+    """
+    Keep ``record_query`` on this thread's connections. Async requests run
+    their queries in sync_to_async's executor thread, which a context manager
+    entered on the event loop would not reach; outside an instrumented request
+    the wrapper only passes statements through.
+    """
+    for conn in connections.all():
+        if record_query not in conn.execute_wrappers:
+            conn.execute_wrappers.append(record_query)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Count and time the SQL queries of each request through
+    ``connection.execute_wrapper``, which unlike ``connection.queries`` also
+    works with ``DEBUG=False``.
+
+    The totals are sent in a ``Server-Timing`` header and logged to
+    ``realworld.sql`` per view, with the summary as the record's
+    ``sql_summary`` attribute. Requests repeating a query shape
+    ``REALWORLD_SQL_DUPLICATE_THRESHOLD`` times (usually an N+1 loop) are
+    logged as warnings. The ``QueryLog`` is kept on ``response.query_log`` for
+    tests. Rows fetched while a streaming response is consumed are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        log = QueryLog()
+        token = _query_log.set(log)
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    if record_query not in conn.execute_wrappers:
+                        stack.enter_context(conn.execute_wrapper(record_query))
+                response = self.get_response(request)
+        finally:
+            _query_log.reset(token)
+        return self.process_response(request, response, log)
+
+    async def __acall__(self, request):
+        log = QueryLog()
+        token = _query_log.set(log)
+        try:
+            await sync_to_async(install_query_recorder)()
+            response = await self.get_response(request)
+        finally:
+            _query_log.reset(token)
+        return self.process_response(request, response, log)
+
+    @staticmethod
+    def process_response(request, response, log):
+        total_ms = (time.perf_counter() - log.started) * 1000
+        db_ms = log.duration * 1000
+        timing = f'db;dur={db_ms:.1f};desc="{log.count} queries", app;dur={total_ms:.1f}'
+        if response.has_header('Server-Timing'):
+            timing = f'{response["Server-Timing"]}, {timing}'
+        response['Server-Timing'] = timing
+        response.query_log = log
+
+        match = request.resolver_match
+        duplicates = log.duplicates()
+        summary = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': log.count,
+            'db_ms': round(db_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'duplicates': [{'sql': shape, 'count': count} for shape, count in duplicates.items()],
+        }
+        logger.log(
+            logging.WARNING if duplicates else logging.INFO,
+            '%s %s (%s): %d queries in %.1fms, %d repeated shapes',
+            summary['method'], summary['path'], summary['view'], log.count, db_ms, len(duplicates),
+            extra={'sql_summary': summary},
+        )
+        return response
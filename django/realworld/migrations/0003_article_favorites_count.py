@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:42
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_favorites_count(apps, schema_editor):
+    Article = apps.get_model('realworld', 'Article')
+    Favorite = Article.favorited_by.through
+    counts = (
+        Favorite.objects
+        .filter(article_id=OuterRef('pk'))
+        .order_by()
+        .values('article_id')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    Article.objects.update(
+        favorites_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realworld', '0002_feed_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_favorites_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-favorites_count', '-created_at'], name='articles_favorit_546d76_idx'),
+        ),
+    ]
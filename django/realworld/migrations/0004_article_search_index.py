@@ -0,0 +1,44 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX articles_fulltext ON articles (title, description, body)'
+        )
+    elif connection.vendor == 'sqlite':
+        # A standalone FTS5 table (not external content) maintained from
+        # realworld.signals, so SQLite table rebuilds in later migrations
+        # cannot silently drop triggers. Builds without FTS5 fall back to the
+        # in-memory index.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE articles_fts USING fts5(title, description, body)'
+        )
+        schema_editor.execute(
+            'INSERT INTO articles_fts (rowid, title, description, body) '
+            'SELECT id, title, description, body FROM articles'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX articles_fulltext ON articles')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS articles_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realworld', '0003_article_favorites_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:50
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_comments_count(apps, schema_editor):
+    Article = apps.get_model('realworld', 'Article')
+    Comment = apps.get_model('realworld', 'Comment')
+    counts = (
+        Comment.objects
+        .filter(article_id=OuterRef('pk'))
+        .order_by()
+        .values('article_id')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    Article.objects.update(
+        comments_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realworld', '0004_article_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_comments_count, migrations.RunPython.noop),
+    ]
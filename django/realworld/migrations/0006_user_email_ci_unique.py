@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:01
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+import realworld.models
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Stop before the unique index is built if emails already collide ignoring
+    case, naming them so they can be merged or changed by hand: which account
+    keeps an address is not something a migration can decide.
+    """
+    User = apps.get_model('realworld', 'User')
+    duplicates = list(
+        User.objects.using(schema_editor.connection.alias)
+        .exclude(email='')
+        .values(email_lower=Lower('email'))
+        .annotate(accounts=Count('id'))
+        .filter(accounts__gt=1)
+        .order_by('email_lower')
+        .values_list('email_lower', 'accounts')[:20]
+    )
+    if duplicates:
+        listed = ', '.join(f'{email} ({accounts} accounts)' for email, accounts in duplicates)
+        raise RuntimeError(
+            f'Emails used by more than one account ignoring case: {listed}. '
+            'Resolve them before applying realworld.0006_user_email_ci_unique.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('realworld', '0005_article_comments_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', realworld.models.UserManager()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.NullIf(django.db.models.functions.text.Lower('email'), models.Value('')), name='users_email_ci_unique'),
+        ),
+    ]
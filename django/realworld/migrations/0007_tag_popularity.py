@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_tag_popularity(apps, schema_editor):
+    Article = apps.get_model('realworld', 'Article')
+    TagPopularity = apps.get_model('realworld', 'TagPopularity')
+    counts = (
+        Article.tags.through.objects
+        .order_by()
+        .values('tag_id')
+        .annotate(total=Count('*'))
+        .values_list('tag_id', 'total')
+    )
+    TagPopularity.objects.bulk_create(
+        [TagPopularity(tag_id=tag_id, articles_count=total) for tag_id, total in counts],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realworld', '0006_user_email_ci_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagPopularity',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='realworld.tag')),
+                ('articles_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'tag_popularity',
+                'indexes': [models.Index(fields=['-articles_count', 'tag'], name='tag_popular_article_a173aa_idx')],
+            },
+        ),
+        migrations.RunPython(populate_tag_popularity, migrations.RunPython.noop),
+    ]
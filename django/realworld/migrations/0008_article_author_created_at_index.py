@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realworld', '0007_tag_popularity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['author', '-created_at'], name='articles_author__f81e79_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 06:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realworld', '0008_article_author_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='article',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+    ]
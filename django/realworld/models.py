@@ -1,7 +1,51 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser
+import re
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Exists, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Length, Lower, NullIf
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
 from django.utils.text import slugify
 from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+# Slug collisions with concurrent inserts are retried this many times
+SLUG_INSERT_ATTEMPTS = 5
+# Base slug of titles that slugify to nothing
+FALLBACK_SLUG = 'article'
+# The unique index on articles.slug as SQLite ("UNIQUE constraint failed:
+# articles.slug"), MySQL ("for key 'articles.slug'", or "for key 'slug'"
+# before 8.0.19) and PostgreSQL ('unique constraint "articles_slug_key"')
+# name it. Only the index name is matched: the message may also quote the
+# offending values, which can contain anything
+SLUG_CONFLICT = re.compile(
+    r"UNIQUE constraint failed: articles\.slug\b"
+    r"|for key '(?:articles\.)?slug'"
+    r'|unique constraint "articles_slug_key"'
+)
+
+
+def is_slug_conflict(error):
+    """Whether an IntegrityError from inserting an article is a taken slug"""
+    return SLUG_CONFLICT.search(str(error)) is not None
+
+
+def email_key():
+    """
+    The expression unique emails are indexed on: the lowercased email, or NULL
+    for a blank one so that accounts without an email never collide. (MySQL
+    has no partial indexes, so a ``condition`` would drop the constraint there.)
+    """
+    return NullIf(Lower('email'), Value(''))
+
+
+class UserQuerySet(models.QuerySet):
+    def with_email(self, email):
+        """Match ``email`` case-insensitively using the ``users_email_ci_unique`` index"""
+        return self.alias(email_key=email_key()).filter(email_key=email.lower())
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
 
 
 class User(AbstractUser):
@@ -15,11 +59,16 @@ class User(AbstractUser):
         blank=True
     )
 
+    objects = UserManager()
+
     def __str__(self):
         return self.username
 
     class Meta:
         db_table = 'users'
+        constraints = [
+            models.UniqueConstraint(email_key(), name='users_email_ci_unique'),
+        ]
 
 
 class Tag(models.Model):
@@ -35,6 +84,67 @@ class Tag(models.Model):
         ordering = ['name']
 
 
+class TagPopularity(models.Model):
+    """
+    Number of articles carrying ``tag``, kept up to date by ``realworld.signals``
+    so the most popular tags are read from an index instead of counted.
+    """
+    tag = models.OneToOneField(
+        Tag,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity'
+    )
+    articles_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'tag_popularity'
+        indexes = [
+            models.Index(fields=['-articles_count', 'tag']),
+        ]
+
+    def __str__(self):
+        return f'{self.tag_id}: {self.articles_count}'
+
+
+class ArticleQuerySet(models.QuerySet):
+    """QuerySet helpers for article read paths"""
+
+    def with_favorites(self, user=None):
+        """Annotate ``is_favorited`` (for ``user``) in SQL"""
+        if user is not None and user.is_authenticated:
+            is_favorited = Exists(
+                Article.favorited_by.through.objects.filter(
+                    article_id=OuterRef('pk'), user_id=user.pk
+                )
+            )
+        else:
+            is_favorited = Value(False)
+        return self.annotate(is_favorited=is_favorited)
+
+    @staticmethod
+    def favorites_total():
+        """The number of favorites of each article, counted in the favorites table"""
+        counts = (
+            Article.favorited_by.through.objects
+            .filter(article_id=OuterRef('pk'))
+            .order_by()
+            .values('article_id')
+            .annotate(total=Count('*'))
+            .values('total')
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    def recount_favorites(self):
+        """Set ``favorites_count`` from the favorites table in one statement"""
+        return self.update(favorites_count=self.favorites_total())
+
+    def reconcile_favorites_count(self):
+        """Repair ``favorites_count`` drift; returns the number of rows fixed"""
+        actual = self.favorites_total()
+        return self.exclude(favorites_count=actual).update(favorites_count=actual)
+
+
 class Article(models.Model):
     """Article model for blog posts"""
     slug = models.SlugField(unique=True, max_length=255, db_index=True)
@@ -56,15 +166,24 @@ class Article(models.Model):
         related_name='favorite_articles',
         blank=True
     )
+    # Denormalized sizes of favorited_by and comments, kept in sync by realworld.signals
+    favorites_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    # Set when the author had too many followers to fan the article out to inboxes
+    fanout_on_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ArticleQuerySet.as_manager()
+
     class Meta:
         db_table = 'articles'
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['slug']),
+            models.Index(fields=['-favorites_count', '-created_at']),
+            models.Index(fields=['author', '-created_at']),
         ]
 
     def __str__(self):
@@ -72,20 +191,55 @@ class Article(models.Model):
 
     def save(self, *args, **kwargs):
         """Auto-generate slug from title if not provided"""
-        if not self.slug:
-            base_slug = slugify(self.title)
-            slug = base_slug
-            counter = 1
-            while Article.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
-
-    @property
-    def favorites_count(self):
-        """Return the number of users who favorited this article"""
-        return self.favorited_by.count()
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        # Titles without any ASCII letter or digit slugify to ''; an empty
+        # prefix would make next_free_slug scan the whole table
+        base_slug = slugify(self.title) or FALLBACK_SLUG
+        self.slug = self.next_free_slug(base_slug)
+        for _ in range(SLUG_INSERT_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError as error:
+                if not is_slug_conflict(error):
+                    raise
+            # A concurrent insert took the slug. Do not look again: under
+            # REPEATABLE READ the enclosing transaction's snapshot predates
+            # that insert, so the next suffix is tried blindly instead
+            self.slug = self.bump_slug_suffix(base_slug, self.slug)
+        # Still colliding under heavy contention: fall back to a random suffix
+        self.slug = f"{base_slug}-{get_random_string(8, 'abcdefghijklmnopqrstuvwxyz0123456789')}"
+        return super().save(*args, **kwargs)
+
+    @staticmethod
+    def bump_slug_suffix(base_slug, slug):
+        """The suffixed slug after ``slug`` (``base_slug`` or ``base_slug-N``)"""
+        if slug == base_slug:
+            return f'{base_slug}-1'
+        return f'{base_slug}-{int(slug.rsplit("-", 1)[1]) + 1}'
+
+    @staticmethod
+    def next_free_slug(base_slug):
+        """
+        Return ``base_slug`` or ``base_slug-N`` with N one above the highest taken.
+
+        A single query scans the slug index for the prefix and returns only the
+        largest existing suffix (longest, then lexicographically greatest).
+        """
+        highest = (
+            Article.objects
+            .filter(slug__istartswith=base_slug)
+            .filter(Q(slug=base_slug) | Q(slug__regex=rf'^{re.escape(base_slug)}-[0-9]+$'))
+            .annotate(slug_length=Length('slug'))
+            .order_by('-slug_length', '-slug')
+            .values_list('slug', flat=True)
+            .first()
+        )
+        if highest is None:
+            return base_slug
+        return Article.bump_slug_suffix(base_slug, highest)
 
 
 class Comment(models.Model):
@@ -112,4 +266,33 @@ class Comment(models.Model):
         ]
 
     def __str__(self):
-        return f'Comment by {self.author.username} on {self.article.title}'
\ No newline at end of file
+        return f'Comment by {self.author.username} on {self.article.title}'
+
+
+class FeedEntry(models.Model):
+    """Materialized feed inbox row: ``article`` appears in ``user``'s feed"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    # Copy of article.created_at so inbox pages are read from one index
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'feed_entries'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'article'], name='feed_entries_user_article_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.article_id} in feed of {self.user_id}'
@@ -0,0 +1,265 @@
+import asyncio
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on ``(created_at, id)`` instead of using OFFSET.
+
+    Rows are returned newest first. A page is fetched with a range condition on
+    the ``-created_at`` index (InnoDB secondary indexes carry the primary key,
+    so ``id`` breaks ties without a separate index), which keeps the cost of
+    page 10,000 the same as page 1. No ``COUNT(*)`` is issued.
+
+    That is the only order pages can be sought in, so any other ``?ordering=``
+    is rejected with a 400 rather than silently ignored.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    ordering_query_param = 'ordering'
+    supported_orderings = ('', '-createdAt')
+    max_page_size = 100
+    envelope = 'articles'
+    invalid_cursor_message = 'Invalid cursor'
+    invalid_ordering_message = 'Only -createdAt is supported with cursor pagination.'
+
+    def __init__(self, envelope=None, page_size=None):
+        if envelope is not None:
+            self.envelope = envelope
+        self.page_size = page_size or api_settings.PAGE_SIZE
+
+    @classmethod
+    def is_requested(cls, request):
+        """Keyset mode is opt-in: clients ask for it by sending ``?cursor=``"""
+        return cls.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, cursor, page_size = self._page_queryset(queryset, request)
+        return self._set_page(list(queryset[:page_size + 1]), cursor, page_size)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views"""
+        queryset, cursor, page_size = self._page_queryset(queryset, request)
+        return self._set_page([item async for item in queryset[:page_size + 1]], cursor, page_size)
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        ordering = request.query_params.get(self.ordering_query_param, '')
+        if ordering.strip() not in self.supported_orderings:
+            raise ValidationError({self.ordering_query_param: [self.invalid_ordering_message]})
+
+        if hasattr(queryset, 'seek'):
+            # Sequences that position themselves, such as realworld.feed.Feed
+            if cursor is None:
+                return queryset, cursor, page_size
+            reverse, created_at, pk = cursor
+            return queryset.seek((created_at, pk), reverse), cursor, page_size
+        if cursor is None:
+            return queryset.order_by('-created_at', '-id'), cursor, page_size
+        reverse, created_at, pk = cursor
+        if reverse:
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by('created_at', 'id')
+        else:
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            ).order_by('-created_at', '-id')
+        return queryset, cursor, page_size
+
+    def _set_page(self, results, cursor, page_size):
+        reverse = cursor is not None and cursor[0]
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response({
+            self.envelope: data,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        })
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # An empty cursor is the first page, still in keyset mode
+            return replace_query_param(self.base_url, self.cursor_query_param, '')
+        return self.encode_cursor(True, self.page[0])
+
+    def decode_cursor(self, request):
+        """Return ``(reverse, created_at, id)`` or ``None`` for the first page"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            direction, created_at, pk = (
+                urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            )
+            if direction not in ('n', 'p'):
+                raise ValueError(direction)
+            return direction == 'p', datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, reverse, item):
+        created_at, pk = self.get_position(item)
+        raw = f"{'p' if reverse else 'n'}|{created_at.isoformat()}|{pk}"
+        encoded = urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def get_position(item):
+        if isinstance(item, dict):
+            return item['created_at'], item['id']
+        return item.created_at, item.id
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque keyset cursor; send an empty value to start',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    ``PageNumberPagination`` for async views.
+
+    The ``COUNT(*)`` and the page fetch are issued together with
+    ``asyncio.gather``; the page number is validated once both are back.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            if page_number in self.last_page_strings:
+                paginator.count = await queryset.acount()
+                number = paginator.num_pages
+                rows = await self._fetch(queryset, number, page_size)
+            else:
+                # Fetch the requested page alongside the count; seeding
+                # paginator.count lets validate_number() skip its own COUNT(*)
+                paginator.count, rows = await asyncio.gather(
+                    queryset.acount(),
+                    self._fetch(queryset, self._guess_number(page_number), page_size),
+                )
+                number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        self.page = paginator.page(number)
+        self.page.object_list = rows
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return rows
+
+    @staticmethod
+    def _guess_number(page_number):
+        """The page to fetch alongside the count; 1 if it is not a valid number"""
+        try:
+            return max(int(page_number), 1)
+        except (TypeError, ValueError):
+            return 1
+
+    @staticmethod
+    async def _fetch(queryset, number, page_size):
+        offset = (number - 1) * page_size
+        return [item async for item in queryset[offset:offset + page_size]]
+
+
+def estimated_row_count(model, using):
+    """
+    The row count of ``model``'s table from the database statistics, or None
+    when the database keeps none (SQLite) or the table was never analyzed.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'mysql':
+        sql = ('SELECT TABLE_ROWS FROM information_schema.TABLES '
+               'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s')
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)'
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Django ``Paginator`` whose ``count`` never scans a large table.
+
+    Unfiltered querysets are counted from the table statistics (see
+    ``estimated_row_count``) once they exceed ``REALWORLD_ADMIN_COUNT_LIMIT``
+    rows; everything else is counted up to that limit only, so at most
+    ``limit / per_page`` pages are reachable.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = getattr(settings, 'REALWORLD_ADMIN_COUNT_LIMIT', 100_000)
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
@@ -11,8 +11,9 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        # Write permissions are only allowed to the author
-        return obj.author == request.user
+        # Write permissions are only allowed to the author; compare ids so the
+        # author row is never loaded
+        return obj.author_id == request.user.id
 
 
 class IsCommentAuthorOrReadOnly(permissions.BasePermission):
@@ -26,4 +27,4 @@ class IsCommentAuthorOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions are only allowed to the comment author
-        return obj.author == request.user
+        return obj.author_id == request.user.id
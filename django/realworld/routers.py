@@ -0,0 +1,134 @@
+"""
+Read-replica routing for the realworld app.
+
+``ReplicaRouter`` sends reads of realworld models to the replica aliases in
+``REALWORLD_DATABASE_REPLICAS`` (``{alias: weight}``) using smooth weighted
+round-robin, and everything else to ``default``. Reads stay on the primary:
+
+* outside a request (management commands, shells, background threads);
+* inside a transaction on the primary;
+* for the rest of a request once it has written anything, and for requests
+  carrying the pin cookie set after a write (see ``ReplicaPinningMiddleware``),
+  so clients read their own writes despite replication lag.
+
+Replicas are health-checked at most every ``REALWORLD_REPLICA_HEALTH_INTERVAL``
+seconds and skipped while unhealthy; with no healthy replica reads fall back
+to the primary.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from . import metrics
+
+APP_LABEL = 'realworld'
+
+_request_state = ContextVar('realworld_replica_state', default=None)
+
+
+class RequestState:
+    """Per-request routing flag; ``pinned`` sends every read to the primary"""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+@contextmanager
+def request_scope(pinned=False):
+    """Route reads to replicas for the duration of a request"""
+    state = RequestState(pinned)
+    token = _request_state.set(state)
+    try:
+        yield state
+    finally:
+        _request_state.reset(token)
+
+
+def pin_to_primary():
+    """Send the remaining reads of the current request to the primary"""
+    state = _request_state.get()
+    if state is not None:
+        state.pinned = True
+
+
+def replica_weights():
+    return getattr(settings, 'REALWORLD_DATABASE_REPLICAS', {})
+
+
+def health_interval():
+    return getattr(settings, 'REALWORLD_REPLICA_HEALTH_INTERVAL', 5)
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = {}
+        self._health = {}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        state = _request_state.get()
+        if state is None or state.pinned or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        alias = self.next_replica([alias for alias in replica_weights() if self.is_healthy(alias)])
+        return alias or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_weights()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema through replication
+        if db in replica_weights():
+            return False
+        return None
+
+    def next_replica(self, aliases):
+        """Smooth weighted round-robin over ``aliases`` (nginx's algorithm)"""
+        if not aliases:
+            return None
+        weights = replica_weights()
+        with self._lock:
+            total = 0
+            best = None
+            for alias in aliases:
+                weight = weights[alias]
+                self._current[alias] = self._current.get(alias, 0) + weight
+                total += weight
+                if best is None or self._current[alias] > self._current[best]:
+                    best = alias
+            self._current[best] -= total
+        metrics.incr(f'db_router.{best}.reads')
+        return best
+
+    def is_healthy(self, alias):
+        healthy, checked_at = self._health.get(alias, (True, None))
+        if checked_at is None or time.monotonic() - checked_at >= health_interval():
+            healthy = self.check_health(alias)
+            self._health[alias] = (healthy, time.monotonic())
+            if not healthy:
+                metrics.incr(f'db_router.{alias}.unhealthy')
+        return healthy
+
+    def check_health(self, alias):
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            return connection.is_usable()
+        except DatabaseError:
+            connection.close()
+            return False
@@ -0,0 +1,315 @@
+"""
+Full-text search over articles.
+
+Three interchangeable backends answer ``search_articles(queryset, query)``:
+
+* ``mysql``  - ``MATCH ... AGAINST`` on the ``articles_fulltext`` FULLTEXT index
+* ``sqlite`` - the ``articles_fts`` FTS5 table, ranked with ``bm25()``
+* ``python`` - an in-process inverted index, used when neither is available
+
+The ``mysql`` and ``sqlite`` backends return the given queryset restricted
+to matching articles, annotated with ``rank`` (higher is more relevant) and
+ordered by it, all in the query that applies the queryset's filters. The
+``python`` backend keeps the best ``REALWORLD_SEARCH_MAX_RESULTS`` matches
+that pass them and returns them as ``RankedArticles``, which puts each
+fetched page in rank order in Python. ``match_articles`` only restricts the
+queryset, for callers that order the results themselves. The FTS5 table and
+the Python index are kept up to date by ``realworld.signals``; the
+``rebuild_search_index`` command repopulates them after bulk loads.
+"""
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Article
+
+FTS_TABLE = 'articles_fts'
+SEARCH_FIELDS = ('title', 'description', 'body')
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def max_results():
+    return getattr(settings, 'REALWORLD_SEARCH_MAX_RESULTS', 1000)
+
+
+def _best_matches(queryset, scores):
+    """
+    The ids of the best ``max_results()`` of ``scores`` ({id: score}) that
+    pass the filters of ``queryset``, best first.
+
+    Candidates are checked against the queryset in rank order, a batch at a
+    time, so filtered searches are truncated after filtering rather than
+    before.
+    """
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    limit = max_results()
+    kept = []
+    for start in range(0, len(ranked), limit):
+        batch = ranked[start:start + limit]
+        passing = set(queryset.filter(id__in=batch).values_list('id', flat=True))
+        kept.extend(article_id for article_id in batch if article_id in passing)
+        if len(kept) >= limit:
+            break
+    return kept[:limit]
+
+
+class RankedArticles:
+    """
+    The articles of ``queryset`` whose ids are in ``ids``, in that order, as
+    a sequence.
+
+    A slice fetches only the articles of the slice by primary key and sorts
+    them in Python, so the ranking never has to be spelled out in SQL.
+    Provides what Django's ``Paginator`` uses, and passes ``values()`` and
+    ``prefetch_related()`` through so it can stand in for a queryset of
+    ``fast_serializers.article_rows``. ``filter()`` and ``order_by()`` give
+    up the ranking and return a queryset of the matches, as they do for the
+    annotated querysets of the other backends (``KeysetPagination`` seeks on
+    ``(created_at, id)``).
+    """
+    ordered = True
+
+    def __init__(self, queryset, ids):
+        self.articles = queryset.filter(id__in=ids)
+        self.ids = ids
+
+    def _chain(self, queryset):
+        return RankedArticles(queryset, self.ids)
+
+    def values(self, *fields):
+        return self._chain(self.articles.values(*fields))
+
+    def prefetch_related(self, *lookups):
+        return self._chain(self.articles.prefetch_related(*lookups))
+
+    def filter(self, *args, **kwargs):
+        return self.articles.filter(*args, **kwargs)
+
+    def order_by(self, *fields):
+        return self.articles.order_by(*fields)
+
+    def count(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1 or None][0]
+        ids = self.ids[key]
+        fetched = {}
+        for article in self.articles.filter(id__in=ids):
+            fetched[article['id'] if isinstance(article, dict) else article.pk] = article
+        # Articles deleted since the search are skipped
+        return [fetched[article_id] for article_id in ids if article_id in fetched]
+
+
+class MySQLFullTextBackend:
+    name = 'mysql'
+    match_sql = (
+        f'MATCH ({", ".join(f"{Article._meta.db_table}.{field}" for field in SEARCH_FIELDS)}) '
+        'AGAINST (%s IN NATURAL LANGUAGE MODE)'
+    )
+
+    def search(self, queryset, query):
+        return (
+            self.match(queryset, query)
+            .annotate(rank=RawSQL(self.match_sql, [query], output_field=FloatField()))
+            .order_by('-rank', '-created_at')
+        )
+
+    def match(self, queryset, query):
+        return queryset.filter(RawSQL(self.match_sql, [query], output_field=BooleanField()))
+
+    def index_article(self, article):
+        """The FULLTEXT index is maintained by MySQL itself"""
+
+    def remove_article(self, article_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteFTS5Backend:
+    name = 'sqlite'
+
+    @staticmethod
+    def match_expression(query):
+        # Quote every term so user input can never be parsed as FTS5 syntax
+        terms = ['"%s"' % term.replace('"', '""') for term in tokenize(query)]
+        return ' OR '.join(terms)
+
+    def search(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+        # The queryset's filters, the ranking and pagination all run in the
+        # one query; FTS5 answers both subqueries from its index
+        return (
+            self.match(queryset, query)
+            .annotate(rank=RawSQL(
+                # bm25() is lower-is-better; flip it so rank sorts descending
+                f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = {Article._meta.db_table}.id',
+                [expression],
+                output_field=FloatField(),
+            ))
+            .order_by('-rank', '-created_at')
+        )
+
+    def match(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression])
+        )
+
+    def index_article(self, article):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [article.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description, body) VALUES (%s, %s, %s, %s)',
+                [article.pk, article.title, article.description, article.body],
+            )
+
+    def remove_article(self, article_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [article_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description, body) '
+                f'SELECT id, title, description, body FROM {Article._meta.db_table}'
+            )
+
+
+class InMemoryIndexBackend:
+    """
+    Pure-Python TF-IDF inverted index, built lazily on first search.
+
+    The index lives in the worker process and only sees writes made by that
+    process, so it is meant for development and databases without a native
+    full-text engine.
+    """
+    name = 'python'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._documents = {}
+
+    def _ensure_built(self):
+        if self._postings is None:
+            self.rebuild()
+
+    def rebuild(self):
+        postings = defaultdict(dict)
+        documents = {}
+        rows = Article.objects.values_list('id', *SEARCH_FIELDS).iterator(chunk_size=2000)
+        for article_id, *texts in rows:
+            terms = Counter(tokenize(' '.join(texts)))
+            documents[article_id] = terms
+            for term, count in terms.items():
+                postings[term][article_id] = count
+        with self._lock:
+            self._postings, self._documents = postings, documents
+
+    def index_article(self, article):
+        with self._lock:
+            if self._postings is None:
+                return
+            self._remove(article.pk)
+            terms = Counter(tokenize(' '.join(getattr(article, field) for field in SEARCH_FIELDS)))
+            self._documents[article.pk] = terms
+            for term, count in terms.items():
+                self._postings[term][article.pk] = count
+
+    def remove_article(self, article_id):
+        with self._lock:
+            if self._postings is not None:
+                self._remove(article_id)
+
+    def _remove(self, article_id):
+        for term in self._documents.pop(article_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(article_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def scores(self, query):
+        self._ensure_built()
+        scores = defaultdict(float)
+        with self._lock:
+            total = len(self._documents) or 1
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + total / len(postings))
+                for article_id, count in postings.items():
+                    scores[article_id] += (1 + math.log(count)) * idf
+        return scores
+
+    def search(self, queryset, query):
+        return RankedArticles(queryset, _best_matches(queryset, self.scores(query)))
+
+    def match(self, queryset, query):
+        return queryset.filter(id__in=_best_matches(queryset, self.scores(query)))
+
+
+_python_backend = InMemoryIndexBackend()
+_fts5_available = None
+
+
+def fts5_available():
+    """Whether the FTS5 table was created by the search migration"""
+    global _fts5_available
+    if _fts5_available is None:
+        _fts5_available = FTS_TABLE in connection.introspection.table_names()
+    return _fts5_available
+
+
+def get_backend():
+    """Pick the configured backend, or the best one for the current database"""
+    name = getattr(settings, 'REALWORLD_SEARCH_BACKEND', None)
+    if name is None:
+        if connection.vendor == 'mysql':
+            name = 'mysql'
+        elif connection.vendor == 'sqlite' and fts5_available():
+            name = 'sqlite'
+        else:
+            name = 'python'
+    if name == 'mysql':
+        return MySQLFullTextBackend()
+    if name == 'sqlite':
+        return SQLiteFTS5Backend()
+    return _python_backend
+
+
+def search_articles(queryset, query):
+    """Return ``queryset`` restricted to articles matching ``query``, best first"""
+    return get_backend().search(queryset, query)
+
+
+def match_articles(queryset, query):
+    """Return ``queryset`` restricted to articles matching ``query``, unranked"""
+    return get_backend().match(queryset, query)
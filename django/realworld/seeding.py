@@ -0,0 +1,288 @@
+"""
+Synthetic data generator behind ``manage.py seed_data``.
+
+Loads users, follow edges, tags, articles, tag links, favorites and comments
+with skewed, production-like distributions:
+
+* authors, followed users, favoriting users, commenters and tags are drawn
+  from Zipf distributions (rank ``k`` is picked with weight ``1 / k ** s``)
+  over a shuffled order, so a few users and tags dominate;
+* the number of follows per user and of favorites and comments per article
+  are heavy-tailed (Pareto) around the requested means.
+
+Work is split into chunks of users or articles, each generated and inserted
+in one transaction and then dropped, so memory stays flat whatever the volume.
+Users and articles go through ``bulk_create`` (their primary keys are needed
+for the links); follow edges, tag links, favorites and comments are plain
+tuples inserted with ``executemany`` straight into their tables.
+``Article.favorites_count``/``comments_count`` are computed while generating;
+everything else maintained by ``realworld.signals`` (tag popularity, search
+index, feed inboxes) is rebuilt once at the end by ``rebuild_derived_data``.
+
+With ``workers > 1`` chunks are loaded by forked worker processes, which
+inherit the generator state; SQLite serializes their writes, so the gain
+there is limited to generating rows in parallel.
+"""
+import itertools
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import feed, search, tags
+from .caching import bump_version
+from .models import Article, Comment, Tag, User
+
+WORDS = (
+    'python django async cache index query shard replica latency throughput '
+    'queue worker stream batch cursor token feed follow tag search vector '
+    'cluster deploy docker kubernetes metric trace profile memory thread '
+    'process socket schema migration backup review release design pattern '
+    'testing debug refactor scale pool lock commit branch merge bench web'
+).split()
+
+# Pareto shape of the per-row counts: mean 2, unbounded variance
+TAIL_ALPHA = 2.0
+
+# Generator state shared with forked workers (see Loader)
+_state = {}
+
+
+class Zipf:
+    """Draws ``items`` with probability proportional to ``1 / rank ** s``"""
+
+    def __init__(self, items, s):
+        self.items = items
+        self.cum_weights = list(itertools.accumulate(1 / rank ** s for rank in range(1, len(items) + 1)))
+
+    def sample(self, rng, k):
+        if not self.items or k <= 0:
+            return []
+        return rng.choices(self.items, cum_weights=self.cum_weights, k=k)
+
+
+def skewed_count(rng, mean, cap):
+    """A heavy-tailed non-negative integer averaging about ``mean``"""
+    if mean <= 0:
+        return 0
+    return min(cap, int(mean * (rng.paretovariate(TAIL_ALPHA) - 1) + rng.random()))
+
+
+def words(rng, count):
+    return ' '.join(rng.choices(WORDS, k=count))
+
+
+def chunks(total, size):
+    """``(start, stop)`` ranges covering ``range(total)``"""
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def _rng(kind, start):
+    return random.Random(f'{_state["seed"]}:{kind}:{start}')
+
+
+def insert_rows(model, fields, rows):
+    """INSERT ``rows`` (tuples ordered like ``fields``) without building model instances"""
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+    sql = (f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+           f'VALUES ({", ".join(["%s"] * len(fields))})')
+    batch_size = _state['batch_size']
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+    return len(rows)
+
+
+@transaction.atomic
+def load_users(start, stop):
+    """Insert users ``start``..``stop`` of this run; returns the number inserted"""
+    prefix, password = _state['prefix'], _state['password_hash']
+    rng = _rng('users', start)
+    users = [
+        User(username=f'{prefix}{n}', email=f'{prefix}{n}@example.com', password=password,
+             bio=words(rng, 8))
+        for n in range(_state['user_base'] + start, _state['user_base'] + stop)
+    ]
+    User.objects.bulk_create(users, batch_size=_state['batch_size'])
+    return len(users)
+
+
+@transaction.atomic
+def load_follows(start, stop):
+    """Follow edges of the users at positions ``start``..``stop``"""
+    rng = _rng('follows', start)
+    user_ids, popular = _state['user_ids'], _state['users_by_popularity']
+    rows = []
+    for user_id in user_ids[start:stop]:
+        followed = set(popular.sample(rng, skewed_count(rng, _state['follows'], len(user_ids) - 1)))
+        followed.discard(user_id)
+        rows.extend((user_id, other) for other in followed)
+    return insert_rows(User.following.through, ['from_user', 'to_user'], rows)
+
+
+@transaction.atomic
+def load_articles(start, stop):
+    """Articles ``start``..``stop`` of this run with their tags, favorites and comments"""
+    rng = _rng('articles', start)
+    users, tag_ids = _state['users_by_popularity'], _state['tags_by_popularity']
+
+    articles, links = [], []
+    for n in range(_state['article_base'] + start, _state['article_base'] + stop):
+        title = words(rng, rng.randint(3, 8)).capitalize()
+        tagged = set(tag_ids.sample(rng, skewed_count(rng, _state['tags_per_article'], 10)))
+        favorited = set(users.sample(rng, skewed_count(rng, _state['favorites'], len(users.items))))
+        commenters = users.sample(rng, skewed_count(rng, _state['comments'], 1000))
+        articles.append(Article(
+            author_id=users.sample(rng, 1)[0],
+            slug=f'{slugify(title)}-{n}',
+            title=title,
+            description=words(rng, 15),
+            body=words(rng, rng.randint(50, 300)),
+            favorites_count=len(favorited),
+            comments_count=len(commenters),
+        ))
+        links.append((tagged, favorited, commenters))
+
+    Article.objects.bulk_create(articles, batch_size=_state['batch_size'])
+    if any(article.pk is None for article in articles):
+        # MySQL does not return the primary keys of bulk inserts
+        ids = dict(
+            Article.objects.filter(slug__in=[article.slug for article in articles]).values_list('slug', 'pk')
+        )
+        for article in articles:
+            article.pk = ids[article.slug]
+
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    taggings, favorites, comments = [], [], []
+    for article, (tagged, favorited, commenters) in zip(articles, links):
+        taggings.extend((article.pk, tag_id) for tag_id in tagged)
+        favorites.extend((article.pk, user_id) for user_id in favorited)
+        comments.extend(
+            (article.pk, user_id, words(rng, rng.randint(5, 40)), now, now) for user_id in commenters
+        )
+    insert_rows(Article.tags.through, ['article', 'tag'], taggings)
+    insert_rows(Article.favorited_by.through, ['article', 'user'], favorites)
+    insert_rows(Comment, ['article', 'author', 'body', 'created_at', 'updated_at'], comments)
+    return len(articles)
+
+
+@transaction.atomic
+def rebuild_inboxes(start, stop):
+    """Rebuild the feed inboxes of the followers at positions ``start``..``stop``"""
+    for user_id in _state['follower_ids'][start:stop]:
+        feed.rebuild_inbox(User(pk=user_id))
+    return stop - start
+
+
+def create_tags(count, rng):
+    """Insert ``count`` tag names (existing ones are reused); returns their ids"""
+    names = [f'{WORDS[i % len(WORDS)]}{i // len(WORDS) or ""}' for i in range(count)]
+    rng.shuffle(names)
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    return list(Tag.objects.filter(name__in=names).values_list('pk', flat=True))
+
+
+def _init_worker():
+    if connection.vendor == 'sqlite':
+        # Workers take turns holding the database write lock; wait for it
+        # rather than failing with "database is locked"
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout = 600000')
+
+
+class Loader:
+    """Runs chunk functions in-process, or on ``workers`` forked processes"""
+
+    def __init__(self, workers):
+        self.workers = workers
+
+    def run(self, func, tasks):
+        """Call ``func(start, stop)`` for every task; returns the summed results"""
+        if self.workers <= 1 or len(tasks) <= 1:
+            return sum(func(start, stop) for start, stop in tasks)
+        # Children must open their own connections rather than share ours
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            # Workers inherit _state instead of unpickling it
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker,
+        ) as executor:
+            futures = [executor.submit(func, start, stop) for start, stop in tasks]
+            return sum(future.result() for future in futures)
+
+
+def generate(users, articles, tag_count, follows, tags_per_article, favorites, comments,
+             zipf_s=1.1, batch_size=2000, chunk_size=10000, workers=1, seed=0, prefix='seed',
+             password='password123', log=print):
+    """Generate and insert a data set; see the module docstring"""
+    rng = random.Random(seed)
+    _state.clear()
+    _state.update(
+        seed=seed,
+        prefix=prefix,
+        batch_size=batch_size,
+        follows=follows,
+        tags_per_article=tags_per_article,
+        favorites=favorites,
+        comments=comments,
+        password_hash=make_password(password),
+        user_base=User.objects.aggregate(top=Max('pk'))['top'] or 0,
+        article_base=Article.objects.aggregate(top=Max('pk'))['top'] or 0,
+    )
+    loader = Loader(workers)
+
+    loader.run(load_users, chunks(users, chunk_size))
+    user_ids = list(
+        User.objects.filter(pk__gt=_state['user_base']).order_by('pk').values_list('pk', flat=True)
+    )
+    log(f'{len(user_ids)} users')
+
+    tag_ids = create_tags(tag_count, rng)
+    log(f'{len(tag_ids)} tags')
+
+    popular_users = user_ids[:]
+    rng.shuffle(popular_users)
+    _state.update(
+        user_ids=user_ids,
+        users_by_popularity=Zipf(popular_users, zipf_s),
+        tags_by_popularity=Zipf(tag_ids, zipf_s),
+    )
+    edges = loader.run(load_follows, chunks(len(user_ids), chunk_size))
+    log(f'{edges} follow edges')
+
+    loaded = loader.run(load_articles, chunks(articles, chunk_size))
+    log(f'{loaded} articles')
+
+
+def rebuild_derived_data(workers=1, chunk_size=1000, log=print):
+    """Recompute what bulk inserts bypass: signal-maintained tables and indexes"""
+    tags.rebuild_popularity()
+    log('tag popularity rebuilt')
+
+    backend = search.get_backend()
+    backend.rebuild()
+    log(f'{backend.name} search index rebuilt')
+
+    # Authors beyond the fan-out limit are merged into feeds at read time
+    crowded = (
+        User.objects.annotate(follower_count=Count('followers'))
+        .filter(follower_count__gt=feed.fanout_limit())
+        .values('pk')
+    )
+    Article.objects.filter(author__in=crowded).update(fanout_on_read=True)
+    _state['follower_ids'] = list(
+        User.following.through.objects.order_by('from_user_id')
+        .values_list('from_user_id', flat=True).distinct()
+    )
+    rebuilt = Loader(workers).run(rebuild_inboxes, chunks(len(_state['follower_ids']), chunk_size))
+    log(f'{rebuilt} feed inboxes rebuilt')
+
+    for scope in ('articles', 'tags'):
+        bump_version(scope)
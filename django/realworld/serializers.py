@@ -1,9 +1,23 @@
+from datetime import datetime, timedelta, timezone
+
 from rest_framework import serializers
-from django.contrib.auth import authenticate
+from django.conf import settings
+from django.db import transaction
 from rest_framework_simplejwt.tokens import RefreshToken
+from . import hashing
 from .models import User, Article, Comment, Tag
 
 
+def validate_email_available(email, instance=None):
+    """Reject emails already used by another account, ignoring case"""
+    users = User.objects.with_email(email)
+    if instance is not None:
+        users = users.exclude(pk=instance.pk)
+    if users.exists():
+        raise serializers.ValidationError('A user with that email already exists.')
+    return email
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """Serializer for user registration"""
     password = serializers.CharField(write_only=True, min_length=8)
@@ -12,39 +26,56 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         model = User
         fields = ['username', 'email', 'password']
 
+    def validate_email(self, value):
+        return validate_email_available(value)
+
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password']
+        # UserRegistrationView hashes the password on the pool and passes the
+        # result to save(password_hash=...)
+        password_hash = validated_data.pop('password_hash', None)
+        if password_hash is None:
+            password_hash = hashing.make_password(validated_data['password'])
+        user = User(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data['email']),
+            password=password_hash,
         )
+        user.save()
         return user
 
 
 class UserLoginSerializer(serializers.Serializer):
-    """Serializer for user login"""
+    """
+    Serializer for user login.
+
+    Only validates the payload; ``UserLoginView`` checks the credentials with
+    ``aauthenticate()``, and ``EmailBackend`` hashes on the password hashing pool.
+    """
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
 
-    def validate(self, data):
-        email = data.get('email')
-        password = data.get('password')
 
-        if email and password:
-            # Try to authenticate with email as username
-            try:
-                user_obj = User.objects.get(email=email)
-                user = authenticate(username=user_obj.username, password=password)
-            except User.DoesNotExist:
-                user = None
+def get_following_ids(request):
+    """Return the ids followed by ``request.user``, loaded once per request"""
+    following_ids = getattr(request, '_following_ids', None)
+    if following_ids is None:
+        following_ids = set(request.user.following.values_list('id', flat=True))
+        request._following_ids = following_ids
+    return following_ids
 
-            if not user:
-                raise serializers.ValidationError('Invalid credentials')
 
-            data['user'] = user
-            return data
-        else:
-            raise serializers.ValidationError('Must include email and password')
+async def aget_following_ids(request):
+    """``get_following_ids`` for async views; fills the same per-request cache"""
+    following_ids = getattr(request, '_following_ids', None)
+    if following_ids is None:
+        following_ids = {pk async for pk in request.user.following.values_list('id', flat=True)}
+        request._following_ids = following_ids
+    return following_ids
+
+
+def clear_following_ids(request):
+    """Drop the per-request follow set after the user's follows change"""
+    request._following_ids = None
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -58,29 +89,59 @@ class ProfileSerializer(serializers.ModelSerializer):
     def get_following(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return request.user.following.filter(id=obj.id).exists()
+            return obj.id in get_following_ids(request)
         return False
 
 
+def reusable_token(request, user):
+    """
+    The access token ``request`` was authenticated with, if it belongs to
+    ``user`` and stays valid for at least ``REALWORLD_TOKEN_REUSE_MIN_LIFETIME``.
+    """
+    token = getattr(request, 'auth', None)
+    raw = getattr(token, 'token', None)
+    if raw is None or request.user.pk != user.pk:
+        return None
+    expires_at = datetime.fromtimestamp(token['exp'], tz=timezone.utc)
+    min_lifetime = getattr(settings, 'REALWORLD_TOKEN_REUSE_MIN_LIFETIME', timedelta(days=1))
+    if expires_at - datetime.now(tz=timezone.utc) < min_lifetime:
+        return None
+    return raw.decode('ascii') if isinstance(raw, bytes) else raw
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for authenticated user with token"""
     token = serializers.SerializerMethodField()
+    password = serializers.CharField(write_only=True, required=False, min_length=8)
 
     class Meta:
         model = User
-        fields = ['email', 'username', 'bio', 'image', 'token']
+        fields = ['email', 'username', 'password', 'bio', 'image', 'token']
 
     def get_token(self, obj):
+        # Login and registration pass issue_token=True; otherwise echo the
+        # caller's token back while it is far enough from expiry
+        request = self.context.get('request')
+        if request is not None and not self.context.get('issue_token'):
+            token = reusable_token(request, obj)
+            if token is not None:
+                return token
         refresh = RefreshToken.for_user(obj)
         return str(refresh.access_token)
 
+    def validate_email(self, value):
+        return validate_email_available(value, self.instance)
+
     def update(self, instance, validated_data):
         password = validated_data.pop('password', None)
+        # CurrentUserView hashes a new password on the pool and passes the
+        # result to save(password_hash=...)
+        password_hash = validated_data.pop('password_hash', None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
         if password:
-            instance.set_password(password)
+            instance.password = password_hash or hashing.make_password(password)
 
         instance.save()
         return instance
@@ -105,6 +166,30 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'author', 'createdAt', 'updatedAt']
 
 
+def set_article_tags(article, tag_names, created=False):
+    """
+    Make ``article``'s tags exactly ``tag_names``.
+
+    Existing tags are resolved with one ``IN`` query and missing ones inserted
+    with a single ``bulk_create``; only the links that differ from the current
+    ones are added or removed. Pass ``created=True`` for a brand new article to
+    skip reading its (empty) current links.
+    """
+    names = list(dict.fromkeys(tag_names))
+    tag_ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = [name for name in names if name not in tag_ids]
+    if missing:
+        Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+        tag_ids.update(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+
+    wanted = set(tag_ids.values())
+    current = set() if created else set(article.tags.values_list('id', flat=True))
+    if current - wanted:
+        article.tags.remove(*(current - wanted))
+    if wanted - current:
+        article.tags.add(*(wanted - current))
+
+
 class ArticleSerializer(serializers.ModelSerializer):
     """Serializer for articles"""
     author = ProfileSerializer(read_only=True)
@@ -127,9 +212,12 @@ class ArticleSerializer(serializers.ModelSerializer):
         return [tag.name for tag in obj.tags.all()]
 
     def get_favoritesCount(self, obj):
-        return obj.favorited_by.count()
+        return obj.favorites_count
 
     def get_favorited(self, obj):
+        # Prefer the value annotated by ArticleQuerySet.with_favorites()
+        if hasattr(obj, 'is_favorited'):
+            return bool(obj.is_favorited)
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.favorited_by.filter(id=request.user.id).exists()
@@ -142,14 +230,10 @@ class ArticleSerializer(serializers.ModelSerializer):
         if request and hasattr(request, 'data'):
             tag_list = request.data.get('article', {}).get('tagList', [])
 
-        # Create article
-        article = Article.objects.create(**validated_data)
-
-        # Add tags
-        if tag_list:
-            for tag_name in tag_list:
-                tag, created = Tag.objects.get_or_create(name=tag_name)
-                article.tags.add(tag)
+        with transaction.atomic():
+            article = Article.objects.create(**validated_data)
+            if tag_list:
+                set_article_tags(article, tag_list, created=True)
 
         return article
 
@@ -158,17 +242,16 @@ class ArticleSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
-        # Handle tags if present
         request = self.context.get('request')
+        tag_list = None
         if request and hasattr(request, 'data'):
             tag_list = request.data.get('article', {}).get('tagList')
-            if tag_list is not None:
-                instance.tags.clear()
-                for tag_name in tag_list:
-                    tag, created = Tag.objects.get_or_create(name=tag_name)
-                    instance.tags.add(tag)
 
-        instance.save()
+        with transaction.atomic():
+            # Handle tags if present
+            if tag_list is not None:
+                set_article_tags(instance, tag_list)
+            instance.save()
         return instance
 
 
@@ -186,11 +269,9 @@ class ArticleCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         tag_list = validated_data.pop('tagList', [])
-        article = Article.objects.create(**validated_data)
-
-        # Add tags
-        for tag_name in tag_list:
-            tag, created = Tag.objects.get_or_create(name=tag_name)
-            article.tags.add(tag)
+        with transaction.atomic():
+            article = Article.objects.create(**validated_data)
+            if tag_list:
+                set_article_tags(article, tag_list, created=True)
 
         return article
@@ -0,0 +1,183 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import feed, search, tags
+from .authentication import invalidate_cached_user
+from .caching import bump_version
+from .models import Article, Comment, FeedEntry, Tag, User
+
+
+@receiver(post_save, sender=Article)
+def fan_out_new_article(sender, instance, created, **kwargs):
+    """Push new articles into followers' feed inboxes once the insert commits"""
+    if created:
+        transaction.on_commit(lambda: feed.fan_out_article(instance))
+
+
+@receiver(m2m_changed, sender=User.following.through)
+def sync_feed_inbox(sender, instance, action, reverse, pk_set, **kwargs):
+    """Backfill or prune feed inboxes when follow edges change"""
+    if action == 'post_add' and pk_set:
+        if reverse:
+            # author.followers.add(*users)
+            for user_id in pk_set:
+                feed.backfill_inbox(user_id, [instance.pk])
+        else:
+            feed.backfill_inbox(instance.pk, pk_set)
+    elif action == 'post_remove' and pk_set:
+        if reverse:
+            for user_id in pk_set:
+                feed.prune_inbox(user_id, [instance.pk])
+        else:
+            feed.prune_inbox(instance.pk, pk_set)
+    elif action == 'post_clear':
+        if reverse:
+            FeedEntry.objects.filter(article__author=instance).delete()
+        else:
+            feed.prune_inbox(instance.pk)
+
+
+@receiver(m2m_changed, sender=Article.favorited_by.through)
+def update_favorites_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep ``Article.favorites_count`` in step with the favorites table.
+
+    The affected articles are recounted rather than incremented: two
+    concurrent ``add()`` calls for the same favorite both report it in
+    ``post_add`` although only one row is inserted.
+    """
+    if reverse and action == 'pre_clear':
+        # user.favorite_articles.clear(): remember which articles lose a favorite
+        instance._favorites_changed = set(
+            Article.favorited_by.through.objects.filter(user_id=instance.pk).values_list('article_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        # article.favorited_by.<action>(*users)
+        if pk_set or action == 'post_clear':
+            Article.objects.filter(pk=instance.pk).recount_favorites()
+        return
+    # user.favorite_articles.<action>(*articles)
+    changed = instance.__dict__.pop('_favorites_changed', set()) if action == 'post_clear' else pk_set
+    if changed:
+        Article.objects.filter(pk__in=changed).recount_favorites()
+
+
+@receiver([post_save, post_delete], sender=Article)
+@receiver(m2m_changed, sender=Article.tags.through)
+@receiver(m2m_changed, sender=Article.favorited_by.through)
+def invalidate_articles(sender, **kwargs):
+    # m2m_changed fires pre_* and post_* actions; bump once, after the change
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        bump_version('articles')
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def invalidate_tags_on_tagging(sender, action, **kwargs):
+    # Tags may be bulk-created (no post_save) right before they are linked, and
+    # every tagging change moves the ?top=N ranking
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version('tags')
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def update_tag_popularity(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep ``TagPopularity.articles_count`` in step with the tagging table, the
+    same way ``update_favorites_count`` maintains ``favorites_count``.
+    """
+    if not reverse and action == 'pre_clear':
+        # article.tags.clear(): remember which tags lose an article
+        instance._tags_changed = set(
+            Article.tags.through.objects.filter(article_id=instance.pk).values_list('tag_id', flat=True)
+        )
+        return
+    if action == 'post_add':
+        # The tags may have just been bulk-created, which sends no post_save
+        tags.prefix_index.invalidate()
+    elif action not in ('post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        # tag.articles.<action>(*articles)
+        if pk_set or action == 'post_clear':
+            tags.recount_popularity([instance.pk], added=action == 'post_add')
+        return
+    # article.tags.<action>(*tags)
+    changed = instance.__dict__.pop('_tags_changed', set()) if action == 'post_clear' else pk_set
+    tags.recount_popularity(changed, added=action == 'post_add')
+
+
+@receiver(pre_delete, sender=Article)
+def uncount_article_tags(sender, instance, **kwargs):
+    # The tagging rows are removed by the cascade, which sends no m2m_changed;
+    # recount their tags once the article is gone
+    instance._deleted_tag_ids = list(
+        Article.tags.through.objects.filter(article_id=instance.pk).values_list('tag_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Article)
+def recount_deleted_article_tags(sender, instance, **kwargs):
+    tag_ids = instance.__dict__.pop('_deleted_tag_ids', None)
+    if tag_ids:
+        tags.recount_popularity(tag_ids)
+        bump_version('tags')
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    # Tag names are also rendered in article tagLists
+    bump_version('tags')
+    bump_version('articles')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_names(sender, created=False, **kwargs):
+    # New tags are picked up incrementally by the prefix index; renames and
+    # deletes make it rebuild. Other processes notice on their own (see tags)
+    tags.prefix_index.invalidate(rebuild=not created)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        Article.objects.filter(pk=instance.article_id).update(comments_count=F('comments_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Article) or getattr(origin, 'model', None) is Article:
+        # Cascade from deleting the article itself: one UPDATE per comment for nothing
+        return
+    Article.objects.filter(pk=instance.article_id).update(comments_count=F('comments_count') - 1)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_authenticated_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_profiles(sender, created, update_fields=None, **kwargs):
+    """Profile edits change the nested author of cached articles"""
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    bump_version('articles')
+
+
+@receiver(post_save, sender=Article)
+def index_article(sender, instance, **kwargs):
+    search.get_backend().index_article(instance)
+
+
+@receiver(post_delete, sender=Article)
+def unindex_article(sender, instance, **kwargs):
+    search.get_backend().remove_article(instance.pk)
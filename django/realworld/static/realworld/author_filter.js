@@ -0,0 +1,15 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    // Reload the changelist filtered on the author picked in the sidebar
+    $(function() {
+        $('select[data-filter-query]').on('change', function() {
+            const params = new URLSearchParams(this.dataset.filterQuery);
+            if (this.value) {
+                params.set(this.name, this.value);
+            }
+            window.location.search = params.toString();
+        });
+    });
+}
@@ -0,0 +1,79 @@
+"""
+Incremental JSON rendering for large list responses.
+
+``stream_list_response`` walks a queryset with ``.iterator(chunk_size=...)``,
+serializes one chunk at a time and writes the JSON array piece by piece through
+``StreamingHttpResponse``, so worker memory stays bounded by the chunk size and
+the first bytes leave before the whole result has been serialized.
+
+Under ASGI Django buffers a synchronous iterator completely before sending it,
+so there the response gets an async iterator that pulls each chunk through
+``sync_to_async`` instead.
+"""
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+
+def is_requested(request):
+    """Streaming is opt-in with ``?stream=true``"""
+    return request.query_params.get('stream') in ('1', 'true')
+
+
+def _dumps(data):
+    # Same encoder options as rest_framework.renderers.JSONRenderer
+    return json.dumps(
+        data,
+        cls=encoders.JSONEncoder,
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=SHORT_SEPARATORS if api_settings.COMPACT_JSON else LONG_SEPARATORS,
+    )
+
+
+def _render(queryset, serializer_class, context, envelope, count_key, chunk_size):
+    """Yield the body one serialized chunk of rows at a time"""
+    yield '{%s:[' % _dumps(envelope)
+    rows = queryset.iterator(chunk_size=chunk_size)
+    count = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        items = serializer_class(chunk, many=True, context=context).data
+        yield (',' if count else '') + ','.join(_dumps(item) for item in items)
+        count += len(items)
+    if count_key:
+        yield '],%s:%d}' % (_dumps(count_key), count)
+    else:
+        yield ']}'
+
+
+async def _aiterate(parts):
+    # The queryset iterator holds a cursor on the request's thread-bound
+    # connection, so every chunk is read on the same thread
+    read = sync_to_async(next, thread_sensitive=True)
+    while (part := await read(parts, None)) is not None:
+        yield part
+
+
+def stream_list_response(queryset, serializer_class, context, envelope, count_key=None):
+    """
+    Stream ``{envelope: [...], count_key: n}`` for every row of ``queryset``.
+
+    The count is the number of rows written, so no separate ``COUNT(*)`` query
+    is needed.
+    """
+    chunk_size = getattr(settings, 'REALWORLD_STREAM_CHUNK_SIZE', 500)
+    parts = _render(queryset, serializer_class, context, envelope, count_key, chunk_size)
+    request = context['request']
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        parts = _aiterate(parts)
+    return StreamingHttpResponse(parts, content_type='application/json')
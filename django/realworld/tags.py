@@ -0,0 +1,177 @@
+"""
+Tag popularity ranking and autocomplete for ``/api/tags/``.
+
+``TagPopularity`` holds the number of articles carrying each tag. Whenever
+article tags change, ``realworld.signals`` recounts it for the tags involved in
+one statement (a count that cannot drift, unlike increments replayed by
+concurrent duplicate links), so ``?top=N`` reads N rows from the
+``(-articles_count, tag)`` index instead of counting the tagging table. ``rebuild_popularity`` recomputes it from
+scratch after bulk loads (``manage.py rebuild_tag_popularity``).
+
+``?prefix=`` is answered from ``TagPrefixIndex``: a sorted array of
+lower-cased tag names searched with ``bisect``, held by each worker process.
+At most every ``REALWORLD_TAGS_INDEX_CHECK_INTERVAL`` seconds the index compares
+``MAX(id)`` and ``COUNT(*)`` of the tags table with what it holds: a higher id
+loads only the tags created since, a count that still differs (tags were
+deleted) rebuilds it. Renames change neither, so the index is also rebuilt
+once it is ``REALWORLD_TAGS_INDEX_MAX_AGE`` seconds old; renames and deletes
+made by this process (see ``realworld.signals``) rebuild it at once.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import ValidationError
+
+from .models import Article, Tag, TagPopularity
+
+
+def top_limit():
+    return getattr(settings, 'REALWORLD_TAGS_TOP_MAX', 100)
+
+
+def autocomplete_limit():
+    return getattr(settings, 'REALWORLD_TAGS_AUTOCOMPLETE_LIMIT', 20)
+
+
+def parse_top(query_params):
+    """The ``?top=N`` value, or None when absent; capped at ``top_limit()``"""
+    raw = query_params.get('top')
+    if raw is None:
+        return None
+    try:
+        top = int(raw)
+    except ValueError:
+        top = 0
+    if top < 1:
+        raise ValidationError({'top': ['Must be a positive integer.']})
+    return min(top, top_limit())
+
+
+def top_tags(limit):
+    """Names of the ``limit`` tags used by the most articles, most used first"""
+    return (
+        TagPopularity.objects
+        .filter(articles_count__gt=0)
+        .order_by('-articles_count', 'tag')
+        .values_list('tag__name', flat=True)[:limit]
+    )
+
+
+def recount_popularity(tag_ids, added=False):
+    """
+    Set the article count of each tag in ``tag_ids`` from the tagging table.
+    Pass ``added=True`` when tags were linked: they may have been bulk-created
+    without a popularity row.
+    """
+    if not tag_ids:
+        return
+    if added:
+        TagPopularity.objects.bulk_create(
+            [TagPopularity(tag_id=tag_id) for tag_id in tag_ids], ignore_conflicts=True
+        )
+    counts = (
+        Article.tags.through.objects
+        .filter(tag_id=OuterRef('tag_id'))
+        .order_by()
+        .values('tag_id')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    TagPopularity.objects.filter(tag_id__in=tag_ids).update(
+        articles_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    )
+
+
+def rebuild_popularity():
+    """Recompute every tag's article count; returns the number of tags counted"""
+    counts = (
+        Article.tags.through.objects
+        .order_by()
+        .values('tag_id')
+        .annotate(total=Count('*'))
+        .values_list('tag_id', 'total')
+    )
+    rows = [TagPopularity(tag_id=tag_id, articles_count=total) for tag_id, total in counts]
+    TagPopularity.objects.all().delete()
+    TagPopularity.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+class TagPrefixIndex:
+    """Case-insensitive prefix lookups over all tag names"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []  # sorted (name.lower(), name)
+        self._max_id = 0
+        self._built_at = None
+        self._checked_at = None
+
+    def invalidate(self, rebuild=False):
+        """Check the tags table on the next lookup; ``rebuild`` also reloads it"""
+        with self._lock:
+            self._checked_at = None
+            if rebuild:
+                self._built_at = None
+
+    def rebuild(self):
+        rows = list(Tag.objects.order_by().values_list('id', 'name'))
+        self._entries = sorted((name.lower(), name) for _, name in rows)
+        self._max_id = max((tag_id for tag_id, _ in rows), default=0)
+        self._built_at = time.monotonic()
+
+    def _load_new_tags(self):
+        rows = Tag.objects.filter(id__gt=self._max_id).order_by().values_list('id', 'name')
+        for tag_id, name in rows:
+            bisect.insort(self._entries, (name.lower(), name))
+            self._max_id = max(self._max_id, tag_id)
+
+    def _refresh(self):
+        now = time.monotonic()
+        check_interval = getattr(settings, 'REALWORLD_TAGS_INDEX_CHECK_INTERVAL', 5)
+        if self._checked_at is not None and now - self._checked_at < check_interval:
+            return
+        self._checked_at = now
+        if self._built_at is None or now - self._built_at >= getattr(settings, 'REALWORLD_TAGS_INDEX_MAX_AGE', 300):
+            self.rebuild()
+            return
+        state = Tag.objects.aggregate(max_id=Max('id'), count=Count('id'))
+        if (state['max_id'] or 0) > self._max_id:
+            self._load_new_tags()
+        if state['count'] != len(self._entries):
+            self.rebuild()
+
+    def search(self, prefix, limit):
+        """Up to ``limit`` tag names starting with ``prefix``, in name order"""
+        prefix = prefix.lower()
+        with self._lock:
+            self._refresh()
+            entries = self._entries
+            start = bisect.bisect_left(entries, (prefix,))
+            names = []
+            for key, name in entries[start:start + limit]:
+                if not key.startswith(prefix):
+                    break
+                names.append(name)
+        return names
+
+
+prefix_index = TagPrefixIndex()
+
+
+def list_tags(query_params):
+    """
+    The tag names ``/api/tags/`` answers with for ``query_params``, or None for
+    a plain listing of every tag.
+    """
+    top = parse_top(query_params)
+    prefix = query_params.get('prefix')
+    if prefix:
+        return prefix_index.search(prefix, top or autocomplete_limit())
+    if top is not None:
+        return list(top_tags(top))
+    return None
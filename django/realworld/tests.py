@@ -1,3 +1,1772 @@
-from django.test import TestCase
+import json
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.db import IntegrityError, connection, connections
+from django.db.models import Count, Sum
+from django.db.models.signals import m2m_changed
+from django.utils import timezone
+from django.conf import settings
+from django.contrib.auth.signals import user_login_failed
+from django.http import JsonResponse
+from django.core.management import call_command
+from django.db.utils import ConnectionHandler, OperationalError
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, resolve
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import fast_serializers, feed, last_login, metrics, search, tags
+from . import urls as realworld_urls
+from .authentication import user_cache_key
+from .caching import get_cache
+from .middleware import QueryInstrumentationMiddleware, query_shape, record_query
+from .pagination import EstimatedCountPaginator
+from .routers import ReplicaRouter
+from .models import User, Article, Comment, FeedEntry, Tag, TagPopularity, is_slug_conflict
+from .serializers import ArticleSerializer, CommentSerializer
+
+
+def make_user(username, **extra):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='password123',
+        **extra
+    )
+
+
+def make_article(author, title='Hello world', tags=(), **extra):
+    fields = {'description': 'description', 'body': 'body', **extra}
+    article = Article.objects.create(author=author, title=title, **fields)
+    for name in tags:
+        tag, _ = Tag.objects.get_or_create(name=name)
+        article.tags.add(tag)
+    return article
+
+
+class RealworldTestCase(TestCase):
+    """Starts every test with an empty response cache"""
+
+    def setUp(self):
+        super().setUp()
+        get_cache().clear()
+        self.client = APIClient()
+
+
+class ArticleFavoritesQueryTests(RealworldTestCase):
+    """favoritesCount/favorited come from queryset annotations, not per-row queries"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+        self.reader = make_user('reader')
+        self.fans = [make_user(f'fan{i}') for i in range(3)]
+
+    def _create_articles(self, count):
+        for i in range(count):
+            article = make_article(self.author, title=f'Article {i}', tags=['django'])
+            article.favorited_by.add(*self.fans)
+            if i % 2:
+                article.favorited_by.add(self.reader)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_list_query_count_is_independent_of_page_size(self):
+        self._create_articles(2)
+        small, _ = self._count_queries('/api/articles/')
+        self._create_articles(10)
+        large, response = self._count_queries('/api/articles/')
+        self.assertEqual(small, large)
+        self.assertEqual(response.data['count'], 12)
+
+    def test_annotated_values(self):
+        self.client.force_authenticate(self.reader)
+        self._create_articles(2)
+        response = self.client.get('/api/articles/')
+        by_title = {a['title']: a for a in response.data['results']}
+        self.assertEqual(by_title['Article 0']['favoritesCount'], 3)
+        self.assertFalse(by_title['Article 0']['favorited'])
+        self.assertEqual(by_title['Article 1']['favoritesCount'], 4)
+        self.assertTrue(by_title['Article 1']['favorited'])
+
+    def test_favorite_and_unfavorite_return_fresh_counts(self):
+        article = make_article(self.author)
+        self.client.force_authenticate(self.reader)
+        url = f'/api/articles/{article.slug}/favorite/'
+        response = self.client.post(url)
+        self.assertEqual(response.data['article']['favoritesCount'], 1)
+        self.assertTrue(response.data['article']['favorited'])
+        response = self.client.delete(url)
+        self.assertEqual(response.data['article']['favoritesCount'], 0)
+        self.assertFalse(response.data['article']['favorited'])
+
+
+class FollowingQueryTests(RealworldTestCase):
+    """The reader's follow set is loaded once per request for nested authors"""
+
+    def setUp(self):
+        super().setUp()
+        self.reader = make_user('reader')
+        self.authors = [make_user(f'author{i}') for i in range(12)]
+        self.reader.following.add(*self.authors[::2])
+        self.client.force_authenticate(self.reader)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_comment_list_query_count_is_constant(self):
+        article = make_article(self.authors[0])
+        for author in self.authors[:2]:
+            Comment.objects.create(article=article, author=author, body='first')
+        url = f'/api/articles/{article.slug}/comments/'
+        small, _ = self._count_queries(url)
+        for author in self.authors[2:]:
+            Comment.objects.create(article=article, author=author, body='more')
+        large, response = self._count_queries(url)
+        self.assertEqual(small, large)
+        following = {c['author']['username']: c['author']['following'] for c in response.data['comments']}
+        self.assertTrue(following['author0'])
+        self.assertFalse(following['author1'])
+
+    def test_feed_query_count_is_constant(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for author in self.authors[:4:2]:
+                make_article(author, title=f'By {author.username}')
+        small, _ = self._count_queries('/api/articles/feed/')
+        with self.captureOnCommitCallbacks(execute=True):
+            for author in self.authors[4::2]:
+                make_article(author, title=f'By {author.username}')
+        large, response = self._count_queries('/api/articles/feed/')
+        self.assertEqual(small, large)
+        self.assertEqual(response.data['count'], 6)
+        self.assertTrue(all(a['author']['following'] for a in response.data['results']))
+
+    def test_follow_updates_profile_in_same_request(self):
+        url = f'/api/profiles/{self.authors[1].username}/follow/'
+        self.assertTrue(self.client.post(url).data['profile']['following'])
+        self.assertFalse(self.client.delete(url).data['profile']['following'])
+
+
+class KeysetPaginationTests(RealworldTestCase):
+    """Opt-in ?cursor= pagination seeks on (created_at, id)"""
+
+    def setUp(self):
+        super().setUp()
+        author = make_user('author')
+        now = timezone.now()
+        self.articles = [make_article(author, title=f'Article {i}') for i in range(7)]
+        # Give several rows the same timestamp so ties are broken by id
+        for i, article in enumerate(self.articles):
+            Article.objects.filter(pk=article.pk).update(created_at=now - timedelta(minutes=i // 3))
+
+    def _slugs(self, response):
+        return [a['slug'] for a in response.data['articles']]
+
+    def test_walks_forward_and_back_without_gaps(self):
+        expected = [a.slug for a in Article.objects.order_by('-created_at', '-id')]
+        response = self.client.get('/api/articles/', {'cursor': '', 'limit': 3})
+        self.assertIsNone(response.data['previous'])
+        seen = list(self._slugs(response))
+        pages = [self._slugs(response)]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            pages.append(self._slugs(response))
+            seen += pages[-1]
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self._slugs(response), pages[1])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self._slugs(response), pages[0])
+        self.assertIsNone(response.data['previous'])
+
+    def test_empty_page_links_back_to_the_first_keyset_page(self):
+        next_url = self.client.get('/api/articles/', {'cursor': '', 'limit': 3}).data['next']
+        Article.objects.exclude(pk__in=[a.pk for a in self.articles[-3:]]).delete()
+        Article.objects.filter(pk__in=[a.pk for a in self.articles[-3:]]).update(
+            created_at=timezone.now() + timedelta(days=1)
+        )
+        response = self.client.get(next_url)
+        self.assertEqual(response.data['articles'], [])
+        self.assertIn('cursor=&', response.data['previous'])
+        response = self.client.get(response.data['previous'])
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['articles']), 3)
+
+    def test_does_not_count_rows(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/articles/', {'cursor': ''})
+        self.assertFalse(any('COUNT(' in q['sql'] and 'GROUP BY' not in q['sql']
+                             for q in ctx.captured_queries))
+
+    def test_orderings_it_cannot_seek_are_rejected(self):
+        response = self.client.get('/api/articles/', {'cursor': '', 'ordering': '-favoritesCount'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.data)
+        response = self.client.get('/api/articles/', {'cursor': '', 'ordering': '-createdAt'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._slugs(response), self._slugs(self.client.get('/api/articles/', {'cursor': ''})))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/articles/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_pagination_is_still_default(self):
+        response = self.client.get('/api/articles/')
+        self.assertEqual(response.data['count'], 7)
+
+
+class FeedInboxTests(RealworldTestCase):
+    """Articles are fanned out to followers' inboxes on write"""
+
+    def setUp(self):
+        super().setUp()
+        self.reader = make_user('reader')
+        self.author = make_user('author')
+        self.client.force_authenticate(self.reader)
+
+    def _feed_titles(self):
+        response = self.client.get('/api/articles/feed/')
+        return [a['title'] for a in response.data['results']]
+
+    def _publish(self, author, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_article(author, title=title)
+
+    def test_new_articles_fan_out_to_followers(self):
+        self.reader.following.add(self.author)
+        self._publish(self.author, 'Fresh')
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self._feed_titles(), ['Fresh'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        self._publish(self.author, 'Older')
+        url = f'/api/profiles/{self.author.username}/follow/'
+        self.client.post(url)
+        self.assertEqual(self._feed_titles(), ['Older'])
+        self.client.delete(url)
+        self.assertEqual(self._feed_titles(), [])
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    @override_settings(REALWORLD_FEED_INBOX_SIZE=2)
+    def test_inbox_is_capped(self):
+        self.reader.following.add(self.author)
+        make_user('other').following.add(self.author)
+        for i in range(4):
+            self._publish(self.author, f'Article {i}')
+        # Publishing never trims; the periodic command does
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 4)
+        call_command('trim_feed_inboxes', stdout=StringIO())
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(self._feed_titles(), ['Article 3', 'Article 2'])
+
+    def test_pages_merge_the_inbox_with_read_time_authors(self):
+        celebrity = make_user('celebrity')
+        self.reader.following.add(self.author, celebrity)
+        for i in range(25):
+            article = self._publish(celebrity if i % 3 == 0 else self.author, f'Article {i}')
+            if i % 3 == 0:
+                Article.objects.filter(pk=article.pk).update(fanout_on_read=True)
+                FeedEntry.objects.filter(article=article).delete()
+        expected = [f'Article {i}' for i in reversed(range(25))]
+
+        first = self.client.get('/api/articles/feed/')
+        self.assertEqual(first.data['count'], 25)
+        second = self.client.get('/api/articles/feed/?page=2')
+        titles = [a['title'] for a in first.data['results'] + second.data['results']]
+        self.assertEqual(titles, expected)
+
+        titles, url = [], '/api/articles/feed/?cursor=&limit=10'
+        while url:
+            page = self.client.get(url).data
+            titles += [a['title'] for a in page['articles']]
+            url = page['next']
+        self.assertEqual(titles, expected)
+        previous = self.client.get(self.client.get(page['previous']).data['next']).data
+        self.assertEqual([a['title'] for a in previous['articles']], expected[20:])
+
+    def test_pages_are_read_from_the_inbox_index(self):
+        self.reader.following.add(self.author)
+        for i in range(3):
+            self._publish(self.author, f'Article {i}')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/articles/feed/')
+        inbox_reads = [q['sql'] for q in ctx.captured_queries if 'FROM "feed_entries"' in q['sql']]
+        self.assertTrue(any('ORDER BY "feed_entries"."created_at" DESC' in sql for sql in inbox_reads))
+        # Articles are only fetched by primary key, never through the inbox
+        article_reads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT "articles"."id"')]
+        self.assertTrue(article_reads)
+        self.assertFalse(any('feed_entries' in sql for sql in article_reads))
+
+    @override_settings(REALWORLD_FEED_FANOUT_LIMIT=1)
+    def test_popular_authors_are_read_at_request_time(self):
+        self.reader.following.add(self.author)
+        make_user('other').following.add(self.author)
+        article = self._publish(self.author, 'Celebrity post')
+        article.refresh_from_db()
+        self.assertTrue(article.fanout_on_read)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self._feed_titles(), ['Celebrity post'])
+
+    def test_rebuild_feeds_command(self):
+        self.reader.following.add(self.author)
+        self._publish(self.author, 'Rebuilt')
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(self._feed_titles(), ['Rebuilt'])
+
+    def test_rebuild_skips_entries_fanned_out_meanwhile(self):
+        self.reader.following.add(self.author)
+        article = self._publish(self.author, 'Raced')
+        prune = feed.prune_inbox
+
+        def prune_then_fan_out(*args):
+            prune(*args)
+            # A fan-out committing between the prune and the copy
+            FeedEntry.objects.create(user=self.reader, article=article, created_at=article.created_at)
+
+        with mock.patch('realworld.feed.prune_inbox', side_effect=prune_then_fan_out):
+            feed.rebuild_inbox(self.reader)
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 1)
+
+    @override_settings(REALWORLD_FEED_INBOX_SIZE=3)
+    def test_rebuild_keeps_the_newest_articles_across_authors(self):
+        other = make_user('other')
+        self.reader.following.add(self.author, other)
+        for i in range(4):
+            self._publish(self.author if i % 2 else other, f'Article {i}')
+        FeedEntry.objects.all().delete()
+        # One query per followed author, then a trim of the merged inbox
+        with mock.patch('realworld.feed.REBUILD_AUTHORS_PER_QUERY', 1):
+            call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(self._feed_titles(), ['Article 3', 'Article 2', 'Article 1'])
+
+
+class FavoritesCounterTests(RealworldTestCase):
+    """Article.favorites_count is maintained on M2M changes"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+        self.fans = [make_user(f'fan{i}') for i in range(3)]
+        self.article = make_article(self.author)
+
+    def _count(self):
+        self.article.refresh_from_db()
+        return self.article.favorites_count
+
+    def test_counter_follows_relation_changes(self):
+        self.article.favorited_by.add(*self.fans)
+        self.assertEqual(self._count(), 3)
+        self.article.favorited_by.add(self.fans[0])
+        self.assertEqual(self._count(), 3)
+        self.fans[1].favorite_articles.remove(self.article)
+        self.fans[1].favorite_articles.remove(self.article)
+        self.assertEqual(self._count(), 2)
+        self.article.favorited_by.clear()
+        self.assertEqual(self._count(), 0)
+
+    def test_racing_adds_of_one_favorite_count_once(self):
+        Favorite = Article.favorited_by.through
+        Favorite.objects.create(article=self.article, user=self.fans[0])
+        # Both add() calls saw the favorite missing and report it in post_add,
+        # but ignore_conflicts kept a single row
+        for _ in range(2):
+            m2m_changed.send(sender=Favorite, instance=self.article, action='post_add', reverse=False,
+                             model=User, pk_set={self.fans[0].pk}, using='default')
+        self.assertEqual(self._count(), 1)
+
+        Tagging = Article.tags.through
+        tag = Tag.objects.create(name='raced')
+        Tagging.objects.create(article=self.article, tag=tag)
+        for _ in range(2):
+            m2m_changed.send(sender=Tagging, instance=self.article, action='post_add', reverse=False,
+                             model=Tag, pk_set={tag.pk}, using='default')
+        self.assertEqual(TagPopularity.objects.get(tag=tag).articles_count, 1)
+
+    def test_repeated_favorite_requests_count_once(self):
+        self.client.force_authenticate(self.fans[0])
+        url = f'/api/articles/{self.article.slug}/favorite/'
+        self.client.post(url)
+        response = self.client.post(url)
+        self.assertEqual(response.data['article']['favoritesCount'], 1)
+        self.client.delete(url)
+        response = self.client.delete(url)
+        self.assertEqual(response.data['article']['favoritesCount'], 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        self.article.favorited_by.add(*self.fans)
+        Article.objects.filter(pk=self.article.pk).update(favorites_count=42)
+        out = StringIO()
+        call_command('reconcile_favorites', stdout=out)
+        self.assertIn('1 article', out.getvalue())
+        self.assertEqual(self._count(), 3)
+
+    def test_order_and_filter_by_popularity(self):
+        popular = make_article(self.author, title='Popular')
+        popular.favorited_by.add(*self.fans)
+        self.article.favorited_by.add(self.fans[0])
+        response = self.client.get('/api/articles/', {'ordering': '-favoritesCount'})
+        self.assertEqual([a['title'] for a in response.data['results']], ['Popular', 'Hello world'])
+        response = self.client.get('/api/articles/', {'min_favorites': 2})
+        self.assertEqual([a['title'] for a in response.data['results']], ['Popular'])
+
+    def test_equal_counts_keep_one_order_across_pages(self):
+        now = timezone.now()
+        for i in range(4):
+            article = make_article(self.author, title=f'Tied {i}')
+            # Equal counts and timestamps leave only the id to order by
+            Article.objects.filter(pk=article.pk).update(created_at=now)
+        titles = []
+        with mock.patch.object(PageNumberPagination, 'page_size', 2):
+            for page in (1, 2, 3):
+                response = self.client.get('/api/articles/', {'ordering': '-favoritesCount', 'page': page})
+                titles += [a['title'] for a in response.data['results']]
+        self.assertEqual(titles, ['Tied 3', 'Tied 2', 'Tied 1', 'Tied 0', 'Hello world'])
+
+
+class ResponseCacheTests(RealworldTestCase):
+    """Anonymous article and tag lists are served from a versioned cache"""
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        self.author = make_user('author')
+        self.article = make_article(self.author, tags=['django'])
+
+    def test_repeated_reads_hit_the_cache(self):
+        first = self.client.get('/api/articles/', {'tag': 'django', 'author': 'author'})
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/articles/', {'author': 'author', 'tag': 'django'})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(metrics.snapshot(), {'response_cache.misses': 1, 'response_cache.hits': 1})
+
+    def test_writes_invalidate(self):
+        self.client.get('/api/articles/')
+        self.article.favorited_by.add(self.author)
+        response = self.client.get('/api/articles/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['favoritesCount'], 1)
+
+        self.client.get('/api/tags/')
+        make_article(self.author, title='Another', tags=['python'])
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['tags'], ['django', 'python'])
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.force_authenticate(self.author)
+        self.client.get('/api/articles/')
+        response = self.client.get('/api/articles/')
+        self.assertFalse(response.has_header('X-Cache'))
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get('/api/tags/')
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        self.client.force_authenticate(make_user('admin', is_staff=True))
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.data['metrics']['response_cache.misses'], 1)
+
+
+class ArticleTagAssignmentTests(RealworldTestCase):
+    """Tags are resolved in bulk and links are diffed on update"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+        self.client.force_authenticate(self.author)
+        Tag.objects.create(name='existing')
+
+    def _create(self, tags, title='Tagged'):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/articles/', {'article': {
+                'title': title, 'description': 'd', 'body': 'b', 'tagList': tags,
+            }}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_tags(self):
+        _, few = self._create(['existing', 'a'])
+        response, many = self._create(['existing'] + [f'tag{i}' for i in range(14)], title='Many')
+        self.assertEqual(few, many)
+        self.assertEqual(len(response.data['article']['tagList']), 15)
+
+    def test_update_only_touches_changed_links(self):
+        response, _ = self._create(['keep', 'drop'])
+        slug = response.data['article']['slug']
+        Through = Article.tags.through
+        kept = Through.objects.get(article__slug=slug, tag__name='keep').pk
+
+        response = self.client.patch(f'/api/articles/{slug}/', {'article': {
+            'tagList': ['keep', 'add', 'keep'],
+        }}, format='json')
+        self.assertEqual(sorted(response.data['article']['tagList']), ['add', 'keep'])
+        self.assertTrue(Through.objects.filter(pk=kept).exists())
+        self.assertFalse(Through.objects.filter(article__slug=slug, tag__name='drop').exists())
+
+    def test_create_serializer_shares_code_path(self):
+        from .serializers import ArticleCreateSerializer
+        serializer = ArticleCreateSerializer(data={
+            'title': 'Via create serializer', 'description': 'd', 'body': 'b',
+            'tagList': ['existing', 'new'],
+        })
+        serializer.is_valid(raise_exception=True)
+        article = serializer.save(author=self.author)
+        self.assertEqual(sorted(article.tags.values_list('name', flat=True)), ['existing', 'new'])
+        self.assertEqual(Tag.objects.count(), 2)
+
+
+class TagPopularityTests(RealworldTestCase):
+    """Tag ranking and autocomplete are answered without scanning the tags table"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(tags, 'prefix_index', tags.TagPrefixIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.author = make_user('author')
+
+    def _counts(self):
+        return dict(TagPopularity.objects.values_list('tag__name', 'articles_count'))
+
+    def test_counts_follow_tagging_changes(self):
+        first = make_article(self.author, title='First', tags=['django', 'python'])
+        second = make_article(self.author, title='Second', tags=['django'])
+        self.assertEqual(self._counts(), {'django': 2, 'python': 1})
+
+        first.tags.remove(Tag.objects.get(name='python'), Tag.objects.create(name='unused'))
+        self.assertEqual(self._counts(), {'django': 2, 'python': 0})
+
+        python = Tag.objects.get(name='python')
+        python.articles.add(first, second)
+        python.articles.add(first)
+        self.assertEqual(self._counts()['python'], 2)
+
+        second.tags.clear()
+        self.assertEqual(self._counts(), {'django': 1, 'python': 1})
+        first.delete()
+        self.assertEqual(self._counts(), {'django': 0, 'python': 0})
+
+    def test_top_tags_are_ranked_by_article_count(self):
+        for i in range(3):
+            make_article(self.author, title=f'Article {i}', tags=['common', f'tag{i}'][:i + 1])
+        make_article(self.author, title='Another', tags=['tag2'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/tags/?top=2')
+        self.assertEqual(response.data['tags'], ['common', 'tag2'])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn('FROM "tag_popularity"', ctx.captured_queries[0]['sql'])
+
+        self.assertEqual(self.client.get('/api/tags/?top=10').data['tags'], ['common', 'tag2', 'tag1'])
+        with override_settings(REALWORLD_TAGS_TOP_MAX=1):
+            self.assertEqual(self.client.get('/api/tags/?top=5').data['tags'], ['common'])
+        self.assertEqual(self.client.get('/api/tags/?top=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/tags/?top=many').status_code, 400)
+
+        # The ranking moves with the tags, and so do cached responses
+        Article.objects.filter(title__in=['Article 0', 'Article 1']).delete()
+        self.assertEqual(self.client.get('/api/tags/?top=1').data['tags'], ['tag2'])
+
+    def test_prefix_lookups_use_the_in_memory_index(self):
+        Tag.objects.bulk_create([Tag(name=name) for name in ['Django', 'django-rest', 'dj', 'flask', 'docker']])
+        response = self.client.get('/api/tags/?prefix=DJ')
+        self.assertEqual(response.data['tags'], ['dj', 'Django', 'django-rest'])
+        self.assertEqual(self.client.get('/api/tags/?prefix=dj&top=2').data['tags'], ['dj', 'Django'])
+        self.assertEqual(self.client.get('/api/tags/?prefix=zz').data['tags'], [])
+        with override_settings(REALWORLD_TAGS_AUTOCOMPLETE_LIMIT=1):
+            self.assertEqual(tags.list_tags({'prefix': 'd'}), ['dj'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(tags.prefix_index.search('do', 10), ['docker'])
+
+        # New tags are loaded incrementally, renames and deletes rebuild
+        make_article(self.author, title='Tagged', tags=['djangocon'])
+        self.assertEqual(tags.prefix_index.search('djangoc', 10), ['djangocon'])
+        Tag.objects.filter(name='docker').delete()
+        tag = Tag.objects.get(name='flask')
+        tag.name = 'dotnet'
+        tag.save()
+        self.assertEqual(tags.prefix_index.search('do', 10), ['dotnet'])
+
+    def test_prefix_index_sees_writes_from_other_processes(self):
+        self.assertEqual(tags.prefix_index.search('py', 10), [])
+        # Writes that send no signals here, as writes by another worker would
+        Tag.objects.bulk_create([Tag(name='python'), Tag(name='pytest')])
+        with override_settings(REALWORLD_TAGS_INDEX_CHECK_INTERVAL=0):
+            with self.assertNumQueries(2):
+                self.assertEqual(tags.prefix_index.search('py', 10), ['pytest', 'python'])
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM tags WHERE name = %s', ['pytest'])
+            self.assertEqual(tags.prefix_index.search('py', 10), ['python'])
+            Tag.objects.filter(name='python').update(name='pypy')
+            self.assertEqual(tags.prefix_index.search('pyt', 10), ['python'])
+            with override_settings(REALWORLD_TAGS_INDEX_MAX_AGE=0):
+                self.assertEqual(tags.prefix_index.search('py', 10), ['pypy'])
+
+    def test_rebuild_command_repairs_drift(self):
+        make_article(self.author, tags=['django', 'python'])
+        TagPopularity.objects.update(articles_count=7)
+        TagPopularity.objects.filter(tag__name='python').delete()
+
+        out = StringIO()
+        call_command('rebuild_tag_popularity', stdout=out)
+        self.assertIn('2 tag(s)', out.getvalue())
+        self.assertEqual(self._counts(), {'django': 1, 'python': 1})
+
+
+class AdminChangelistTests(RealworldTestCase):
+    """Admin changelists issue a fixed number of queries and no full-table counts"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password123'
+        )
+        self.client.force_login(self.admin)
+        self.author = make_user('author')
+
+    def _add_rows(self, count):
+        for _ in range(count):
+            article = make_article(self.author, title='Admin article', tags=[f'tag{Tag.objects.count()}'])
+            Comment.objects.create(article=article, author=self.author, body='x' * 80)
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in ctx.captured_queries]
+
+    def test_query_count_does_not_grow_with_rows(self):
+        urls = [
+            '/admin/realworld/article/',
+            '/admin/realworld/comment/',
+            '/admin/realworld/tag/',
+            f'/admin/realworld/comment/?author={self.author.pk}',
+        ]
+        self._add_rows(2)
+        few = {url: len(self._queries(url)) for url in urls}
+        self._add_rows(10)
+        for url in urls:
+            queries = self._queries(url)
+            self.assertEqual(len(queries), few[url], url)
+            self.assertFalse(
+                any('COUNT(' in sql and 'LIMIT' not in sql for sql in queries), url
+            )
+
+    def test_author_filter_picks_authors_through_autocomplete(self):
+        self._add_rows(1)
+        make_article(make_user('other'), title='Other article')
+        response = self.client.get(f'/admin/realworld/article/?author={self.author.pk}')
+        self.assertEqual(response.context['cl'].result_count, 1)
+        # The picker renders the selected author only and searches the rest
+        self.assertContains(response, f'<option value="{self.author.pk}" selected>author</option>', html=True)
+        self.assertNotContains(response, '>other</option>')
+        self.assertContains(response, 'realworld/author_filter.js')
+        self.assertEqual(self.client.get('/admin/realworld/article/').context['cl'].result_count, 2)
+
+        response = self.client.get('/admin/autocomplete/', {
+            'term': 'oth', 'app_label': 'realworld', 'model_name': 'comment', 'field_name': 'author',
+        })
+        self.assertEqual([result['text'] for result in response.json()['results']], ['other'])
+        response = self.client.get('/admin/realworld/user/', {'q': 'OTHER@example.com'})
+        self.assertEqual([user.username for user in response.context['cl'].result_list], ['other'])
+
+        # The changelist still searches names and emails; the picker does not
+        User.objects.filter(username='other').update(first_name='Grace')
+        for term in ('grace', 'other@example'):
+            response = self.client.get('/admin/realworld/user/', {'q': term})
+            self.assertEqual([user.username for user in response.context['cl'].result_list], ['other'], term)
+        response = self.client.get('/admin/autocomplete/', {
+            'term': 'grace', 'app_label': 'realworld', 'model_name': 'comment', 'field_name': 'author',
+        })
+        self.assertEqual(response.json()['results'], [])
+
+    def test_paginator_counts_are_bounded(self):
+        self._add_rows(3)
+        with override_settings(REALWORLD_ADMIN_COUNT_LIMIT=2):
+            self.assertEqual(EstimatedCountPaginator(Comment.objects.filter(body__startswith='x'), 1).count, 2)
+            with mock.patch('realworld.pagination.estimated_row_count', return_value=10_000_000):
+                self.assertEqual(EstimatedCountPaginator(Comment.objects.all(), 100).count, 10_000_000)
+                self.assertEqual(EstimatedCountPaginator(Comment.objects.filter(pk__gt=0), 100).count, 2)
+        self.assertEqual(EstimatedCountPaginator(Comment.objects.all(), 100).count, 3)
+
+
+class SeedDataTests(RealworldTestCase):
+    """seed_data loads consistent data, including what signals normally maintain"""
+
+    def test_generated_data_is_consistent(self):
+        out = StringIO()
+        call_command(
+            'seed_data', users=40, articles=120, tags=15, follows=5, comments=2,
+            chunk_size=50, batch_size=7, stdout=out,
+        )
+        self.assertIn('120 articles', out.getvalue())
+        self.assertEqual(User.objects.filter(username__startswith='seed').count(), 40)
+        self.assertEqual(Article.objects.count(), 120)
+        self.assertTrue(Article.favorited_by.through.objects.exists())
+        self.assertTrue(Comment.objects.exists())
+
+        self.assertEqual(Article.objects.reconcile_favorites_count(), 0)
+        comment_counts = dict(
+            Comment.objects.order_by().values('article_id').annotate(total=Count('*'))
+            .values_list('article_id', 'total')
+        )
+        for article_id, comments_count in Article.objects.values_list('id', 'comments_count'):
+            self.assertEqual(comments_count, comment_counts.get(article_id, 0))
+        self.assertEqual(
+            TagPopularity.objects.aggregate(total=Sum('articles_count'))['total'],
+            Article.tags.through.objects.count(),
+        )
+
+        follower = User.objects.filter(following__isnull=False).first()
+        inbox = set(FeedEntry.objects.filter(user=follower).values_list('article_id', flat=True))
+        self.assertEqual(inbox, set(Article.objects.filter(author__followers=follower).values_list('id', flat=True)))
+
+    def test_tags_and_authors_are_skewed(self):
+        call_command('seed_data', users=200, articles=400, tags=50, comments=0, favorites=0,
+                     skip_rebuild=True, stdout=StringIO())
+        per_author = sorted(
+            Article.objects.order_by().values('author_id').annotate(total=Count('*'))
+            .values_list('total', flat=True),
+            reverse=True,
+        )
+        # The most prolific author writes a large share, most users write little
+        self.assertGreater(per_author[0], 10 * 400 / 200)
+        self.assertLess(len(per_author), 200)
+
+
+class SlugAllocationTests(RealworldTestCase):
+    """Article.save finds a free slug in constant queries"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+
+    def test_suffixes_continue_from_the_highest(self):
+        slugs = [make_article(self.author, title='Hello world').slug for _ in range(12)]
+        self.assertEqual(slugs[:3], ['hello-world', 'hello-world-1', 'hello-world-2'])
+        self.assertEqual(slugs[-1], 'hello-world-11')
+        # Similar prefixes are not mistaken for suffixes
+        self.assertEqual(make_article(self.author, title='Hello world again').slug, 'hello-world-again')
+
+    def test_query_count_is_flat(self):
+        make_article(self.author, title='Hello world')
+        with CaptureQueriesContext(connection) as few:
+            make_article(self.author, title='Hello world')
+        for _ in range(10):
+            make_article(self.author, title='Hello world')
+        with CaptureQueriesContext(connection) as many:
+            make_article(self.author, title='Hello world')
+        self.assertEqual(len(few), len(many))
+
+    def test_retries_when_a_concurrent_insert_takes_the_slug(self):
+        make_article(self.author, title='Hello world')
+        real = Article.next_free_slug
+        calls = []
+
+        def stale_then_real(base_slug):
+            calls.append(base_slug)
+            # First answer is what a racing transaction would have computed
+            return 'hello-world' if len(calls) == 1 else real(base_slug)
+
+        with mock.patch.object(Article, 'next_free_slug', side_effect=stale_then_real):
+            article = make_article(self.author, title='Hello world')
+        self.assertEqual(article.slug, 'hello-world-1')
+        # The retry does not re-read: under REPEATABLE READ it would see the same snapshot
+        self.assertEqual(len(calls), 1)
+
+    def test_only_slug_conflicts_are_retried(self):
+        with mock.patch('django.db.models.Model.save', side_effect=IntegrityError('NOT NULL constraint failed')):
+            with self.assertRaises(IntegrityError):
+                make_article(self.author, title='Hello world')
+
+    def test_slug_conflicts_are_recognized_by_index_name(self):
+        conflicts = [
+            'UNIQUE constraint failed: articles.slug',
+            "(1062, \"Duplicate entry 'hello' for key 'articles.slug'\")",
+            "(1062, \"Duplicate entry 'hello' for key 'slug'\")",
+            'duplicate key value violates unique constraint "articles_slug_key"',
+        ]
+        others = [
+            'NOT NULL constraint failed: articles.slug_source',
+            'FOREIGN KEY constraint failed',
+            "(1062, \"Duplicate entry 'my slug' for key 'users.username'\")",
+            'null value in column "slug" violates not-null constraint',
+        ]
+        for message in conflicts:
+            self.assertTrue(is_slug_conflict(IntegrityError(message)), message)
+        for message in others:
+            self.assertFalse(is_slug_conflict(IntegrityError(message)), message)
+
+    def test_titles_without_slug_characters(self):
+        slugs = [make_article(self.author, title='!!! ???').slug for _ in range(2)]
+        self.assertEqual(slugs, ['article', 'article-1'])
+
+
+class ArticleSearchTests(RealworldTestCase):
+    """GET /api/articles/search/ ranks articles with the full-text backend"""
+
+    def setUp(self):
+        super().setUp()
+        search._python_backend._postings = None
+        self.author = make_user('author')
+        self.other = make_user('other')
+        make_article(self.author, title='Django ORM tips', tags=['django'],
+                     body='Django querysets and the Django ORM')
+        make_article(self.other, title='Cooking pasta', body='Boil water, add pasta')
+        make_article(self.other, title='Intro', tags=['python'], body='A short django mention')
+
+    def _titles(self, **params):
+        response = self.client.get('/api/articles/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [a['title'] for a in response.data['results']]
+
+    def _check_backend(self):
+        self.assertEqual(self._titles(q='django'), ['Django ORM tips', 'Intro'])
+        self.assertEqual(self._titles(q='django', tag='python'), ['Intro'])
+        self.assertEqual(self._titles(q='django', author='author'), ['Django ORM tips'])
+        self.assertEqual(self._titles(q='"pasta" OR'), ['Cooking pasta'])
+        self.assertEqual(self._titles(q='nothing-matches-this'), [])
+        # Filters run before results are truncated
+        with override_settings(REALWORLD_SEARCH_MAX_RESULTS=1):
+            self.assertEqual(self._titles(q='django', tag='python'), ['Intro'])
+            self.assertEqual(self._titles(q='django', author='other'), ['Intro'])
+
+    def test_sqlite_fts5_backend(self):
+        self.assertEqual(search.get_backend().name, 'sqlite')
+        self._check_backend()
+        with CaptureQueriesContext(connection) as ctx:
+            self._titles(q='django', tag='python')
+        [query] = [q['sql'] for q in ctx.captured_queries if 'bm25' in q['sql']]
+        self.assertIn('MATCH', query)
+        self.assertNotIn('CASE', query)
+
+    @override_settings(REALWORLD_SEARCH_BACKEND='python')
+    def test_python_backend(self):
+        self._check_backend()
+        # Pages are sorted in Python, not with a CASE over every match
+        with CaptureQueriesContext(connection) as ctx, \
+                mock.patch.object(PageNumberPagination, 'page_size', 1):
+            self.assertEqual(self._titles(q='django'), ['Django ORM tips'])
+            self.assertEqual(self._titles(q='django', page=2), ['Intro'])
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'CASE' in q['sql']])
+        article = Article.objects.get(title='Cooking pasta')
+        article.body = 'Now about django'
+        article.save()
+        self.assertIn('Cooking pasta', self._titles(q='django'))
+        article.delete()
+        self.assertNotIn('Cooking pasta', self._titles(q='django'))
+
+    def test_updates_are_indexed(self):
+        article = Article.objects.get(title='Cooking pasta')
+        article.title = 'Cooking risotto'
+        article.save()
+        self.assertEqual(self._titles(q='risotto'), ['Cooking risotto'])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self._titles(q='risotto'), ['Cooking risotto'])
+
+    def test_query_is_required(self):
+        response = self.client.get('/api/articles/search/')
+        self.assertEqual(response.status_code, 400)
+
+
+class CommentListTests(RealworldTestCase):
+    """Comment threads are keyset-paginated and filtered by article_id"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+        self.article = make_article(self.author)
+        self.url = f'/api/articles/{self.article.slug}/comments/'
+        for i in range(5):
+            Comment.objects.create(article=self.article, author=self.author, body=f'comment {i}')
+
+    def test_pages_through_the_thread(self):
+        response = self.client.get(self.url, {'limit': 2})
+        bodies = [c['body'] for c in response.data['comments']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            bodies += [c['body'] for c in response.data['comments']]
+        self.assertEqual(bodies, [f'comment {i}' for i in reversed(range(5))])
+
+    def test_does_not_join_the_article(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        comment_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "comments"' in q['sql']]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertNotIn('"articles"', comment_queries[0])
+
+    def test_optional_count_comes_from_the_counter(self):
+        self.assertNotIn('commentsCount', self.client.get(self.url).data)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'count': 'true', 'limit': 1})
+        self.assertEqual(response.data['commentsCount'], 5)
+
+        self.client.force_authenticate(self.author)
+        comment_id = response.data['comments'][0]['id']
+        self.assertEqual(self.client.delete(f'{self.url}{comment_id}/').status_code, 204)
+        self.client.post(self.url, {'comment': {'body': 'new'}}, format='json')
+        self.client.post(self.url, {'comment': {'body': 'newer'}}, format='json')
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.comments_count, 6)
+
+    def test_unknown_article(self):
+        self.assertEqual(self.client.get('/api/articles/missing/comments/').status_code, 404)
+
+
+@override_settings(REALWORLD_STREAM_CHUNK_SIZE=3)
+class StreamingListTests(RealworldTestCase):
+    """?stream=true renders list responses incrementally"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+        self.reader = make_user('reader')
+        self.reader.following.add(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.articles = [make_article(self.author, title=f'Article {i}', tags=['t']) for i in range(7)]
+
+    def _stream(self, url, **params):
+        response = self.client.get(url, {'stream': 'true', **params})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_article_list_matches_serializer_output(self):
+        body = self._stream('/api/articles/', tag='t')
+        self.assertEqual(body['articlesCount'], 7)
+        regular = self.client.get('/api/articles/', {'tag': 't'}).json()
+        self.assertEqual(body['articles'], regular['results'])
+
+    def test_feed_and_comments(self):
+        self.client.force_authenticate(self.reader)
+        body = self._stream('/api/articles/feed/')
+        self.assertEqual([a['title'] for a in body['articles']], [f'Article {i}' for i in reversed(range(7))])
+        self.assertTrue(all(a['author']['following'] for a in body['articles']))
+
+        article = self.articles[0]
+        for i in range(4):
+            Comment.objects.create(article=article, author=self.author, body=f'c{i}')
+        body = self._stream(f'/api/articles/{article.slug}/comments/')
+        self.assertEqual([c['body'] for c in body['comments']], ['c3', 'c2', 'c1', 'c0'])
+
+    def test_empty_result(self):
+        self.assertEqual(self._stream('/api/articles/', tag='none'), {'articles': [], 'articlesCount': 0})
+
+    @override_settings(REALWORLD_STREAM_CHUNK_SIZE=3)
+    def test_asgi_responses_are_not_buffered(self):
+        async def fetch():
+            response = await AsyncClient().get('/api/articles/', {'stream': 'true', 'tag': 't'})
+            # Django would consume a synchronous iterator in full before sending
+            self.assertTrue(response.is_async)
+            return [part async for part in response.streaming_content]
+
+        parts = async_to_sync(fetch)()
+        self.assertEqual(len(parts), 5)
+        body = json.loads(b''.join(parts))
+        self.assertEqual(body['articles'], self._stream('/api/articles/', tag='t')['articles'])
+
+
+class FastSerializationTests(RealworldTestCase):
+    """The fast read path renders exactly what the DRF serializers render"""
+
+    def setUp(self):
+        super().setUp()
+        self.reader = make_user('reader')
+        self.author = make_user('author', bio='Writes about ünïcode ✓', image='https://example.com/a.png')
+        self.reader.following.add(self.author)
+        stranger = make_user('stranger')
+        for i, author in enumerate([self.author, stranger, self.author]):
+            article = make_article(author, title=f'Título {i}', tags=['zeta', 'alpha', f'tag{i}'],
+                                   description='' if i else 'desc "quoted"')
+            if i != 1:
+                article.favorited_by.add(self.reader)
+            Comment.objects.create(article=article, author=author, body=f'Comment ✓ {i}')
+
+    def _render(self, data):
+        return JSONRenderer().render(data)
+
+    def _drf_request(self):
+        request = Request(APIRequestFactory().get('/api/articles/'))
+        request.user = self.reader
+        return request
+
+    def test_articles_are_byte_identical(self):
+        request = self._drf_request()
+        queryset = Article.objects.select_related('author').prefetch_related('tags').with_favorites(self.reader)
+        expected = ArticleSerializer(queryset, many=True, context={'request': request}).data
+        actual = fast_serializers.serialize_articles(fast_serializers.article_rows(queryset), request)
+        self.assertEqual(self._render(actual), self._render(expected))
+
+    def test_anonymous_articles_are_byte_identical(self):
+        queryset = Article.objects.select_related('author').prefetch_related('tags').with_favorites(None)
+        expected = ArticleSerializer(queryset, many=True, context={}).data
+        actual = fast_serializers.serialize_articles(fast_serializers.article_rows(queryset))
+        self.assertEqual(self._render(actual), self._render(expected))
+
+    def test_comments_are_byte_identical(self):
+        request = self._drf_request()
+        queryset = Comment.objects.select_related('author')
+        expected = CommentSerializer(queryset, many=True, context={'request': request}).data
+        actual = fast_serializers.serialize_comments(fast_serializers.comment_rows(queryset), request)
+        self.assertEqual(self._render(actual), self._render(expected))
+
+
+class ConditionalRequestTests(RealworldTestCase):
+    """ETag/Last-Modified validators answer 304 and guard writes with 412"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+        self.reader = make_user('reader')
+        self.article = make_article(self.author)
+        self.url = f'/api/articles/{self.article.slug}/'
+
+    def _revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_article_not_modified_until_it_changes(self):
+        first = self.client.get(self.url)
+        self.assertTrue(first.has_header('Last-Modified'))
+        with self.assertNumQueries(1):
+            self.assertEqual(self._revalidate(self.url, first).status_code, 304)
+        self.article.favorited_by.add(self.reader)
+        self.assertEqual(self._revalidate(self.url, first).status_code, 200)
+
+    def test_if_modified_since(self):
+        first = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_validators_are_per_user(self):
+        self.client.force_authenticate(self.reader)
+        first = self.client.get(self.url)
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self._revalidate(self.url, first).status_code, 200)
+
+    def test_lists_and_profiles_revalidate_from_the_data(self):
+        self.client.force_authenticate(self.reader)
+        Comment.objects.create(article=self.article, author=self.author, body='hi')
+        urls = ['/api/articles/', '/api/articles/feed/', f'{self.url}comments/', '/api/profiles/author/']
+        responses = {url: self.client.get(url) for url in urls}
+        for url, response in responses.items():
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self._revalidate(url, response).status_code, 304, url)
+            # Answered before serialization: no tag lookup
+            self.assertFalse(any('articles_tags' in query['sql'] for query in ctx.captured_queries), url)
+
+        # Following changes the reader's own flags everywhere
+        self.client.post('/api/profiles/author/follow/')
+        for url, response in responses.items():
+            self.assertEqual(self._revalidate(url, response).status_code, 200, url)
+
+    def test_writes_that_skip_signals_change_validators(self):
+        # Authenticated requests bypass the response cache
+        self.client.force_authenticate(self.reader)
+        list_url, comments_url = '/api/articles/', f'{self.url}comments/'
+        Comment.objects.create(article=self.article, author=self.author, body='hi')
+        first = {url: self.client.get(url) for url in (self.url, list_url, comments_url, '/api/profiles/author/')}
+        Article.objects.filter(pk=self.article.pk).update(favorites_count=7)
+        Comment.objects.update(body='edited')
+        User.objects.filter(pk=self.author.pk).update(bio='rewritten')
+        for url, response in first.items():
+            self.assertEqual(self._revalidate(url, response).status_code, 200, url)
+
+    def test_write_preconditions(self):
+        self.client.force_authenticate(self.author)
+        etag = self.client.get(self.url)['ETag']
+        self.client.patch(self.url, {'article': {'body': 'edited'}}, format='json')
+        response = self.client.patch(self.url, {'article': {'body': 'lost update'}},
+                                     format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        response = self.client.delete(self.url, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.delete(self.url, HTTP_IF_MATCH=etag).status_code, 204)
+        # The article is gone: 404 rather than a failed precondition
+        self.assertEqual(self.client.delete(self.url, HTTP_IF_MATCH=etag).status_code, 404)
+        response = self.client.patch(self.url, {'article': {'body': 'x'}}, format='json', HTTP_IF_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+    def test_tag_changes_change_the_article_etag(self):
+        response = self.client.get(self.url)
+        self.article.tags.add(Tag.objects.create(name='django'))
+        response = self._revalidate(self.url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['article']['tagList'], ['django'])
+        Tag.objects.filter(name='django').update(name='python')
+        self.assertEqual(self._revalidate(self.url, response).status_code, 200)
+
+
+def token_for(user):
+    return str(RefreshToken.for_user(user).access_token)
+
+
+class CachedAuthenticationTests(RealworldTestCase):
+    """JWT users are resolved from the cache and permissions compare ids"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token_for(self.author)}')
+
+    def _user_queries(self, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, [q['sql'] for q in ctx.captured_queries if 'FROM "users"' in q['sql']]
+
+    def test_second_request_skips_the_user_lookup(self):
+        _, first = self._user_queries('get', '/api/user/')
+        response, second = self._user_queries('get', '/api/user/')
+        self.assertEqual(response.data['user']['username'], 'author')
+        self.assertEqual(len(first), 1)
+        self.assertEqual(second, [])
+
+    def test_profile_update_invalidates_the_cached_user(self):
+        self.client.get('/api/user/')
+        self.client.put('/api/user/', {'user': {'bio': 'updated'}}, format='json')
+        response, queries = self._user_queries('get', '/api/user/')
+        self.assertEqual(response.data['user']['bio'], 'updated')
+        self.assertEqual(len(queries), 1)
+
+    def test_password_hashes_are_not_cached(self):
+        self.client.get('/api/user/')
+        cached = get_cache().get(user_cache_key(self.author.pk))
+        self.assertNotIn(self.author.password, repr(cached))
+
+    def test_cached_users_save_only_loaded_fields(self):
+        self.client.get('/api/user/')
+        response = self.client.put('/api/user/', {'user': {'bio': 'updated'}}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.bio, 'updated')
+        self.assertTrue(self.author.check_password('password123'))
+
+    def test_deactivated_users_are_rejected(self):
+        self.client.get('/api/user/')
+        User.objects.filter(pk=self.author.pk).update(is_active=False)
+        self.author.refresh_from_db()
+        self.author.save()
+        self.assertEqual(self.client.get('/api/user/').status_code, 401)
+
+    def test_permission_check_does_not_load_the_author(self):
+        article = make_article(self.author)
+        self.client.get('/api/user/')
+        response, queries = self._user_queries(
+            'delete', f'/api/articles/{article.slug}/',
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(queries, [])
+
+
+class TokenReuseTests(RealworldTestCase):
+    """GET/PUT /api/user/ echo the caller's token instead of minting one"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+        self.token = token_for(self.author)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_current_user_echoes_the_request_token(self):
+        with mock.patch('realworld.serializers.RefreshToken.for_user') as for_user:
+            get = self.client.get('/api/user/')
+            put = self.client.put('/api/user/', {'user': {'bio': 'updated'}}, format='json')
+        self.assertEqual(get.data['user']['token'], self.token)
+        self.assertEqual(put.data['user']['token'], self.token)
+        for_user.assert_not_called()
+
+    @override_settings(REALWORLD_TOKEN_REUSE_MIN_LIFETIME=timedelta(days=8))
+    def test_tokens_close_to_expiry_are_replaced(self):
+        response = self.client.get('/api/user/')
+        self.assertNotEqual(response.data['user']['token'], self.token)
+
+    @override_settings(REALWORLD_DEFER_LAST_LOGIN=False)
+    def test_login_always_issues_a_new_token(self):
+        response = self.client.post(
+            '/api/users/login/',
+            {'user': {'email': 'author@example.com', 'password': 'password123'}},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['user']['token'], self.token)
+
+
+class EmailLoginTests(RealworldTestCase):
+    """Logins use one case-insensitive indexed lookup and defer last_login"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author')
+
+    def _login(self, email, password='password123'):
+        return self.client.post(
+            '/api/users/login/', {'user': {'email': email, 'password': password}}, format='json',
+        )
+
+    @override_settings(REALWORLD_DEFER_LAST_LOGIN=False)
+    def test_login_fetches_the_user_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._login('Author@Example.com')
+        self.assertEqual(response.status_code, 200)
+        selects = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('LOWER', selects[0])
+
+    def test_wrong_password_and_unknown_email_are_rejected(self):
+        self.assertEqual(self._login('author@example.com', 'wrong-password').status_code, 400)
+        self.assertEqual(self._login('nobody@example.com').status_code, 400)
+
+    def test_emails_are_unique_ignoring_case(self):
+        response = self.client.post(
+            '/api/users/',
+            {'user': {'username': 'other', 'email': 'AUTHOR@example.com', 'password': 'password123'}},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        with self.assertRaises(IntegrityError):
+            User.objects.create_user(username='other', email='Author@Example.COM', password='x')
+
+    def test_accounts_without_email_do_not_collide(self):
+        User.objects.create_superuser('admin1', None, 'x')
+        User.objects.create_superuser('admin2', '', 'x')
+        self.assertEqual(User.objects.filter(email='').count(), 2)
+        self.assertFalse(User.objects.with_email('').exists())
+
+    def test_last_login_is_written_by_the_flush(self):
+        with mock.patch.object(last_login.writer, '_start'):
+            self.assertEqual(self._login('author@example.com').status_code, 200)
+        self.author.refresh_from_db()
+        self.assertIsNone(self.author.last_login)
+        self.assertEqual(last_login.writer.flush(), 1)
+        self.author.refresh_from_db()
+        self.assertIsNotNone(self.author.last_login)
+
+
+class PasswordHashingPoolTests(RealworldTestCase):
+    """Registration and login hash passwords on the bounded process pool"""
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def _register(self, username='newbie'):
+        return self.client.post(
+            '/api/users/',
+            {'user': {'username': username, 'email': f'{username}@example.com', 'password': 'password123'}},
+            format='json',
+        )
+
+    @override_settings(REALWORLD_DEFER_LAST_LOGIN=False)
+    def test_register_and_login_through_the_pool(self):
+        self.assertEqual(self._register().status_code, 201)
+        self.assertTrue(User.objects.get(username='newbie').check_password('password123'))
+        response = self.client.post(
+            '/api/users/login/',
+            {'user': {'email': 'newbie@example.com', 'password': 'password123'}},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['username'], 'newbie')
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['password_hash.latency.count'], 2)
+        self.assertEqual(snapshot['password_hash.queue_depth'], 0)
+
+    def test_failed_logins_are_signalled(self):
+        make_user('author')
+        failures = []
+        user_login_failed.connect(lambda **kwargs: failures.append(kwargs['credentials']), weak=False,
+                                  dispatch_uid='test_failed_logins')
+        self.addCleanup(user_login_failed.disconnect, dispatch_uid='test_failed_logins')
+        response = self.client.post(
+            '/api/users/login/',
+            {'user': {'email': 'author@example.com', 'password': 'wrong-password'}},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(failures, [{'email': 'author@example.com', 'password': '********************'}])
+        self.assertEqual(metrics.snapshot()['password_hash.latency.count'], 1)
+
+    def test_password_updates_through_the_pool(self):
+        author = make_user('author')
+        self.client.force_authenticate(author)
+        response = self.client.put('/api/user/', {'user': {'password': 'new-password123'}}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('password', response.data['user'])
+        author.refresh_from_db()
+        self.assertTrue(author.check_password('new-password123'))
+        self.assertEqual(metrics.snapshot()['password_hash.latency.count'], 1)
+        response = self.client.put('/api/user/', {'user': {'password': 'short'}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(REALWORLD_PASSWORD_HASH_QUEUE_SIZE=0)
+    def test_full_queue_answers_503(self):
+        response = self._register()
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(User.objects.filter(username='newbie').exists())
+        self.assertEqual(metrics.snapshot()['password_hash.rejected'], 1)
+
+
+# URLconf with the async read endpoints enabled, for AsyncReadViewTests
+urlpatterns = [
+    path('api/', include(realworld_urls.async_urlpatterns + realworld_urls.urlpatterns)),
+]
+
+
+class AsyncReadViewTests(RealworldTestCase):
+    """The async read views answer exactly like the synchronous ones"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author', bio='writes things')
+        self.reader = make_user('reader')
+        self.reader.following.add(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.articles = [
+                make_article(self.author, title=f'Article {i}', tags=['django', f'tag{i % 2}'])
+                for i in range(25)
+            ]
+        self.articles[3].favorited_by.add(self.reader)
+        for i in range(3):
+            Comment.objects.create(article=self.articles[0], author=self.reader, body=f'Comment {i}')
+
+    def _get_both(self, url, **extra):
+        sync = self.client.get(url, **extra)
+        with override_settings(ROOT_URLCONF='realworld.tests'):
+            get_cache().clear()
+            asynchronous = self.client.get(url, **extra)
+        return sync, asynchronous
+
+    def test_responses_match_the_sync_views(self):
+        slug = self.articles[0].slug
+        urls = [
+            '/api/articles/',
+            '/api/articles/?page=2',
+            '/api/articles/?tag=tag1&ordering=-favoritesCount',
+            '/api/articles/?cursor=&limit=5',
+            '/api/articles/feed/',
+            f'/api/articles/{self.articles[3].slug}/',
+            f'/api/articles/{slug}/comments/?count=true',
+            '/api/tags/',
+            '/api/tags/?top=1',
+            '/api/tags/?prefix=TAG',
+            '/api/profiles/author/',
+        ]
+        for authenticated in (False, True):
+            if authenticated:
+                self.client.force_authenticate(self.reader)
+            for url in urls:
+                if url.endswith('/feed/') and not authenticated:
+                    continue
+                with self.subTest(url=url, authenticated=authenticated):
+                    sync, asynchronous = self._get_both(url)
+                    self.assertEqual(asynchronous.status_code, 200)
+                    self.assertEqual(asynchronous.data, sync.data)
+
+    def test_errors_match_the_sync_views(self):
+        for url in ['/api/articles/missing/', '/api/articles/missing/comments/',
+                    '/api/profiles/nobody/', '/api/articles/?page=9', '/api/articles/?page=x']:
+            with self.subTest(url=url):
+                sync, asynchronous = self._get_both(url)
+                self.assertEqual(asynchronous.status_code, sync.status_code)
+                self.assertEqual(asynchronous.data, sync.data)
+        self.assertEqual(self._get_both('/api/articles/feed/')[1].status_code, 401)
+
+    @override_settings(ROOT_URLCONF='realworld.tests')
+    def test_read_endpoints_resolve_to_async_views(self):
+        for url in ['/api/articles/', '/api/articles/feed/', '/api/articles/slug/',
+                    '/api/articles/slug/comments/', '/api/tags/', '/api/profiles/author/']:
+            with self.subTest(url=url):
+                self.assertTrue(iscoroutinefunction(resolve(url).func))
+        self.assertFalse(iscoroutinefunction(resolve('/api/articles/search/').func))
+
+    @override_settings(ROOT_URLCONF='realworld.tests')
+    def test_conditional_requests_and_response_cache(self):
+        url = f'/api/articles/{self.articles[0].slug}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/tags/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/tags/')['X-Cache'], 'HIT')
+
+    @override_settings(ROOT_URLCONF='realworld.tests')
+    def test_comment_pages_filter_on_the_article_id(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/articles/{self.articles[0].slug}/comments/')
+        self.assertEqual(len(response.data['comments']), 3)
+        comment_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "comments"' in q['sql']]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertNotIn('JOIN "articles"', comment_queries[0])
+        self.assertEqual(self.client.get('/api/articles/missing/comments/').status_code, 404)
+
+    @override_settings(ROOT_URLCONF='realworld.tests')
+    def test_writes_reach_the_sync_views(self):
+        self.client.force_authenticate(self.reader)
+        url = f'/api/articles/{self.articles[0].slug}/comments/'
+        response = self.client.post(url, {'comment': {'body': 'Async?'}}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get(url).data['comments'][0]['body'], 'Async?')
+
+
+class PooledBackendTests(SimpleTestCase):
+    """realworld.db.pooled reuses, bounds, checks and expires connections"""
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.name = f'{directory.name}/pool.sqlite3'
+
+    def _handler(self, **pool):
+        handler = ConnectionHandler({'default': {}, 'pooled': {
+            'ENGINE': 'realworld.db.pooled',
+            'NAME': self.name,
+            'POOL': {'ENGINE': 'django.db.backends.sqlite3', 'MAX_SIZE': 2, 'TIMEOUT': 0.1, **pool},
+        }})
+        self.addCleanup(handler.close_all)
+        return handler
+
+    def _checkout(self, handler):
+        wrapper = handler.create_connection('pooled')
+        wrapper.ensure_connection()
+        return wrapper
+
+    def test_closed_connections_are_reused(self):
+        handler = self._handler()
+        wrapper = self._checkout(handler)
+        raw = wrapper.connection
+        wrapper.close()
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, raw)
+        self.assertEqual(wrapper.vendor, 'sqlite')
+        wrapper.close()
+
+    def test_checkout_waits_then_times_out_at_max_size(self):
+        handler = self._handler()
+        first, second = self._checkout(handler), self._checkout(handler)
+        self.assertIsNot(first.connection, second.connection)
+        self.assertEqual(metrics.snapshot()['db_pool.pooled.in_use'], 2)
+        with self.assertRaises(OperationalError):
+            self._checkout(handler)
+        self.assertEqual(metrics.snapshot()['db_pool.pooled.timeouts'], 1)
+
+        first.inc_thread_sharing()
+        threading.Timer(0.02, first.close).start()
+        third = self._checkout(handler)
+        self.assertIsNotNone(third.connection)
+        self.assertGreater(metrics.snapshot()['db_pool.pooled.wait.total_ms'], 0)
+        second.close()
+        third.close()
+
+    def test_expired_and_broken_connections_are_replaced(self):
+        handler = self._handler(MAX_LIFETIME=0)
+        wrapper = self._checkout(handler)
+        raw = wrapper.connection
+        wrapper.close()
+        wrapper.ensure_connection()
+        self.assertIsNot(wrapper.connection, raw)
+
+        metrics.reset()
+        handler = self._handler()
+        wrapper = self._checkout(handler)
+        raw = wrapper.connection
+        wrapper.close()
+        raw.close()
+        wrapper.ensure_connection()
+        self.assertIsNot(wrapper.connection, raw)
+        self.assertEqual(metrics.snapshot()['db_pool.pooled.discarded'], 1)
+        wrapper.close()
+
+    def test_health_checks_never_reconnect(self):
+        wrapper = self._handler()['pooled']
+        conn = mock.Mock()
+        self.assertTrue(wrapper.check_raw_connection(conn))
+        conn.ping.assert_called_once_with(reconnect=False)
+        conn.ping.side_effect = wrapper.Database.OperationalError('gone away')
+        self.assertFalse(wrapper.check_raw_connection(conn))
+
+    def test_each_thread_checks_out_its_own_connection(self):
+        handler = self._handler()
+        seen, barrier = [], threading.Barrier(2)
+
+        def work():
+            with handler['pooled'].cursor() as cursor:
+                cursor.execute('SELECT 1')
+                seen.append(id(handler['pooled'].connection))
+                barrier.wait()
+            handler['pooled'].close()
+
+        threads = [threading.Thread(target=work) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(seen)), 2)
+        self.assertEqual(metrics.snapshot()['db_pool.pooled.idle'], 2)
+
+
+@override_settings(
+    REALWORLD_DATABASE_REPLICAS={'replica_a': 2, 'replica_b': 1},
+    REALWORLD_REPLICA_HEALTH_INTERVAL=0,
+    DATABASE_ROUTERS=['realworld.routers.ReplicaRouter'],
+    MIDDLEWARE=['realworld.middleware.ReplicaPinningMiddleware', *settings.MIDDLEWARE],
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Request reads go to SQLite replica files; writes and pinned reads to default"""
+
+    def setUp(self):
+        super().setUp()
+        get_cache().clear()
+        metrics.reset()
+        self.client = APIClient()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.author = make_user('author')
+        self.article = make_article(self.author, title='Replicated title')
+        for alias in ('replica_a', 'replica_b'):
+            self._add_replica(alias, f'{directory.name}/{alias}.sqlite3')
+        # The primary moves on; the replicas lag behind
+        Article.objects.filter(pk=self.article.pk).update(title='Primary title')
+        self.url = f'/api/articles/{self.article.slug}/'
+
+    def _add_replica(self, alias, path):
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM INTO %s', [path])
+        connections.settings[alias] = {**connections.settings['default'], 'NAME': path}
+        self.addCleanup(self._remove_replica, alias)
+
+    @staticmethod
+    def _remove_replica(alias):
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+    def test_request_reads_are_weighted_across_replicas(self):
+        self.assertEqual(self.client.get(self.url).data['article']['title'], 'Replicated title')
+        reads = metrics.snapshot()
+        self.assertGreater(reads['db_router.replica_a.reads'], reads['db_router.replica_b.reads'])
+
+        router = ReplicaRouter()
+        picks = [router.next_replica(['replica_a', 'replica_b']) for _ in range(6)]
+        self.assertEqual(picks, ['replica_a', 'replica_b', 'replica_a'] * 2)
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(Article.objects.get(pk=self.article.pk).title, 'Primary title')
+
+    def test_clients_read_their_own_writes(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.post(f'{self.url}comments/', {'comment': {'body': 'First'}}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('realworld_pin', response.cookies)
+        self.assertEqual(self.client.get(self.url).data['article']['title'], 'Primary title')
+
+    def test_unhealthy_replicas_are_skipped(self):
+        with mock.patch.object(ReplicaRouter, 'check_health', lambda router, alias: alias == 'replica_b'):
+            self.assertEqual(self.client.get(self.url).data['article']['title'], 'Replicated title')
+        self.assertNotIn('db_router.replica_a.reads', metrics.snapshot())
+
+        with override_settings(REALWORLD_DATABASE_REPLICAS={'replica_a': 1}), \
+                mock.patch.object(ReplicaRouter, 'check_health', return_value=False):
+            self.assertEqual(self.client.get(self.url).data['article']['title'], 'Primary title')
+
+
+class QueryInstrumentationTests(RealworldTestCase):
+    """QueryInstrumentationMiddleware counts, times and logs request queries"""
+
+    def setUp(self):
+        super().setUp()
+        self.users = [make_user(f'user{i}') for i in range(4)]
+        self.factory = APIRequestFactory()
+
+    def _lookup_users(self, request):
+        for user in self.users:
+            User.objects.get(pk=user.pk)
+        return JsonResponse({})
+
+    def test_server_timing_header_and_query_log(self):
+        article = make_article(self.users[0], tags=['django'])
+        response = self.client.get(f'/api/articles/{article.slug}/')
+        log = response.query_log
+        self.assertGreater(log.count, 0)
+        self.assertRegex(response['Server-Timing'], rf'^db;dur=[\d.]+;desc="{log.count} queries", app;dur=[\d.]+$')
+
+    def test_repeated_query_shapes_are_logged_as_warnings(self):
+        middleware = QueryInstrumentationMiddleware(self._lookup_users)
+        with self.assertLogs('realworld.sql', 'WARNING') as logs:
+            response = middleware(self.factory.get('/api/users/'))
+        self.assertEqual(response.query_log.count, 4)
+        summary = logs.records[0].sql_summary
+        self.assertEqual(summary['queries'], 4)
+        self.assertEqual(len(summary['duplicates']), 1)
+        self.assertEqual(summary['duplicates'][0]['count'], 4)
+        self.assertIn('WHERE "users"."id" = %s LIMIT %s', summary['duplicates'][0]['sql'])
+
+    def test_query_shapes_ignore_parameters(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            query_shape("SELECT * FROM t WHERE id IN (%s) AND name = 'y' LIMIT 5"),
+        )
+
+    def test_async_requests(self):
+        self.addCleanup(connection.execute_wrappers.remove, record_query)
+
+        async def view(request):
+            for user in self.users[:2]:
+                await User.objects.aget(pk=user.pk)
+            return JsonResponse({})
+
+        middleware = QueryInstrumentationMiddleware(view)
+        with self.assertLogs('realworld.sql', 'INFO') as logs:
+            response = async_to_sync(middleware)(self.factory.get('/api/users/'))
+        self.assertEqual(response.query_log.count, 2)
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(logs.records[0].sql_summary['duplicates'], [])
+
+
+class QueryBudgetTestCase(RealworldTestCase):
+    """
+    Fails a test when a request runs more SQL queries than the budget declared
+    for its endpoint in ``query_budgets`` (keys are ``'METHOD url-name'``).
+    Relies on the ``response.query_log`` left by QueryInstrumentationMiddleware.
+    """
+    query_budgets = {}
+
+    def setUp(self):
+        super().setUp()
+        self.budgets_checked = set()
+
+    def assertWithinQueryBudget(self, response):
+        key = f'{response.request["REQUEST_METHOD"]} {response.resolver_match.view_name}'
+        self.assertIn(key, self.query_budgets, f'No query budget declared for {key}')
+        self.assertLess(response.status_code, 400, f'{key} answered {response.status_code}')
+        log, budget = response.query_log, self.query_budgets[key]
+        if log.count > budget:
+            shapes = '\n'.join(f'{count} x {shape}' for shape, count in log.shapes.most_common())
+            self.fail(f'{key} ran {log.count} queries, over its budget of {budget}:\n{shapes}')
+        self.budgets_checked.add(key)
+        return response
+
+
+def realworld_view_endpoints(patterns=realworld_urls.urlpatterns):
+    """``'METHOD url-name'`` of every endpoint served by ``realworld.views``"""
+    endpoints = set()
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            endpoints |= realworld_view_endpoints(pattern.url_patterns)
+            continue
+        view_class = getattr(pattern.callback, 'cls', None)
+        if view_class is None or view_class.__module__ != 'realworld.views':
+            continue
+        actions = getattr(pattern.callback, 'actions', None)
+        methods = [m for m in ('get', 'post', 'put', 'patch', 'delete')
+                   if (m in actions if actions else hasattr(view_class, m))]
+        endpoints |= {f'{method.upper()} {pattern.name}' for method in methods}
+    return endpoints
+
+
+class QueryBudgetTests(QueryBudgetTestCase):
+    """Every endpoint of realworld.views stays within its query budget"""
+
+    query_budgets = {
+        'POST user-register': 4,
+        'POST user-login': 2,
+        'GET current-user': 0,
+        'PUT current-user': 2,
+        'GET profile': 3,
+        'POST profile-follow': 6,
+        'DELETE profile-follow': 4,
+        'GET tags': 1,
+        'GET metrics': 0,
+        'GET article-list': 4,
+        'POST article-list': 18,
+        'GET article-feed': 7,
+        'GET article-search': 4,
+        'GET article-detail': 4,
+        'PUT article-detail': 18,
+        'PATCH article-detail': 9,
+        'DELETE article-detail': 12,
+        'POST article-favorite': 8,
+        'DELETE article-favorite': 7,
+        'DELETE article-unfavorite': 7,
+        'GET article-comments': 3,
+        'POST article-comments': 4,
+        'DELETE article-comment-detail': 4,
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.author = make_user('author', is_staff=True)
+        self.readers = [make_user(f'reader{i}') for i in range(5)]
+        for reader in self.readers:
+            reader.following.add(self.author)
+        writer = self.readers[0]
+        self.author.following.add(writer)
+        # Enough rows that per-row queries would blow the budgets
+        with self.captureOnCommitCallbacks(execute=True):
+            self.articles = [
+                make_article(writer if i % 2 else self.author, title=f'Article {i}', tags=['django', f'tag{i}'])
+                for i in range(10)
+            ]
+        for article in self.articles:
+            article.favorited_by.add(*self.readers)
+            for reader in self.readers:
+                Comment.objects.create(article=article, author=reader, body='Nice')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token_for(self.author)}')
+
+    def test_every_view_has_a_budget(self):
+        self.assertEqual(realworld_view_endpoints(), set(self.query_budgets))
+
+    @override_settings(REALWORLD_DEFER_LAST_LOGIN=False)
+    def test_endpoints_stay_within_budget(self):
+        check, client = self.assertWithinQueryBudget, self.client
+        slug = self.articles[0].slug
+        article_url, comments_url = f'/api/articles/{slug}/', f'/api/articles/{slug}/comments/'
+        user = {'username': 'newbie', 'email': 'newbie@example.com', 'password': 'password123'}
+        article = {'title': 'Budgeted', 'description': 'd', 'body': 'b', 'tagList': ['django', 'new']}
+
+        check(client.post('/api/users/', {'user': user}, format='json'))
+        check(client.post('/api/users/login/', {'user': user}, format='json'))
+        check(client.get('/api/user/'))
+        check(client.put('/api/user/', {'user': {'bio': 'Counting queries'}}, format='json'))
+        check(client.get('/api/profiles/reader0/'))
+        check(client.post('/api/profiles/reader1/follow/'))
+        check(client.delete('/api/profiles/reader1/follow/'))
+        check(client.get('/api/tags/'))
+        check(client.get('/api/metrics/'))
+        check(client.get('/api/articles/'))
+        check(client.post('/api/articles/', {'article': article}, format='json'))
+        check(client.get('/api/articles/feed/'))
+        check(client.get('/api/articles/search/?q=article'))
+        check(client.get(article_url))
+        check(client.put(article_url, {'article': {**article, 'body': 'Updated'}}, format='json'))
+        check(client.patch(article_url, {'article': {'description': 'Patched'}}, format='json'))
+        check(client.post(f'{article_url}favorite/'))
+        check(client.delete(f'{article_url}favorite/'))
+        check(client.delete(f'{article_url}unfavorite/'))
+        check(client.get(comments_url))
+        comment = check(client.post(comments_url, {'comment': {'body': 'Mine'}}, format='json'))
+        check(client.delete(f'{comments_url}{comment.data["comment"]["id"]}/'))
+        check(client.delete(article_url))
+
+        self.assertEqual(self.budgets_checked, set(self.query_budgets))
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.urls import path, include
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
@@ -11,12 +13,55 @@ from .views import (
     ArticleViewSet,
     CommentViewSet,
     TagListView,
+    MetricsView,
+)
+from .async_views import (
+    hybrid,
+    AsyncArticleListView,
+    AsyncFeedView,
+    AsyncArticleDetailView,
+    AsyncCommentListView,
+    AsyncTagListView,
+    AsyncProfileView,
 )
 
 # Create router for viewsets
 router = DefaultRouter()
 router.register(r'articles', ArticleViewSet, basename='article')
 
+comment_list_view = CommentViewSet.as_view({
+    'get': 'list',
+    'post': 'create'
+})
+
+# Async read endpoints (REALWORLD_ASYNC_READS); GET/HEAD go to the async view,
+# writes and ?stream=true to the synchronous one
+async_urlpatterns = [
+    path('articles/', hybrid(
+        AsyncArticleListView.as_view(),
+        ArticleViewSet.as_view({'get': 'list', 'post': 'create'}),
+    ), name='article-list'),
+    path('articles/feed/', hybrid(
+        AsyncFeedView.as_view(),
+        ArticleViewSet.as_view({'get': 'feed'}, permission_classes=[IsAuthenticated]),
+    ), name='article-feed'),
+    path('articles/search/', ArticleViewSet.as_view({'get': 'search'}), name='article-search'),
+    path('articles/<slug:slug>/', hybrid(
+        AsyncArticleDetailView.as_view(),
+        ArticleViewSet.as_view({
+            'get': 'retrieve',
+            'put': 'update',
+            'patch': 'partial_update',
+            'delete': 'destroy'
+        }),
+    ), name='article-detail'),
+    path('articles/<slug:article_slug>/comments/', hybrid(
+        AsyncCommentListView.as_view(), comment_list_view,
+    ), name='article-comments'),
+    path('profiles/<str:username>/', hybrid(AsyncProfileView.as_view(), ProfileView.as_view()), name='profile'),
+    path('tags/', hybrid(AsyncTagListView.as_view(), TagListView.as_view()), name='tags'),
+]
+
 # URL patterns
 urlpatterns = [
     # Authentication endpoints
@@ -32,11 +77,11 @@ urlpatterns = [
     # Tags endpoint
     path('tags/', TagListView.as_view(), name='tags'),
 
+    # Performance counters
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+
     # Article comments (nested routes)
-    path('articles/<slug:article_slug>/comments/', CommentViewSet.as_view({
-        'get': 'list',
-        'post': 'create'
-    }), name='article-comments'),
+    path('articles/<slug:article_slug>/comments/', comment_list_view, name='article-comments'),
     path('articles/<slug:article_slug>/comments/<int:pk>/', CommentViewSet.as_view({
         'delete': 'destroy'
     }), name='article-comment-detail'),
@@ -45,8 +90,11 @@ urlpatterns = [
     path('articles/<slug:slug>/favorite/', ArticleViewSet.as_view({
         'post': 'favorite',
         'delete': 'unfavorite'
-    }), name='article-favorite'),
+    }, permission_classes=[IsAuthenticated]), name='article-favorite'),
 
     # Router URLs (includes article CRUD and feed)
     path('', include(router.urls)),
 ]
+
+if getattr(settings, 'REALWORLD_ASYNC_READS', False):
+    urlpatterns = async_urlpatterns + urlpatterns
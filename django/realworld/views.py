@@ -1,11 +1,29 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-
+from django.utils.decorators import method_decorator
+
+from . import fast_serializers, hashing, metrics, tags
+from .caching import cache_response
+from .conditional import (
+    add_validators,
+    article_condition,
+    not_modified,
+    page_validators,
+    pagination_state,
+    profile_validators,
+)
 from .models import User, Article, Comment, Tag
 from .serializers import (
     UserRegistrationSerializer,
@@ -15,56 +33,119 @@ from .serializers import (
     ArticleSerializer,
     CommentSerializer,
     TagSerializer,
+    clear_following_ids,
+    get_following_ids,
 )
 from .permissions import IsAuthorOrReadOnly, IsCommentAuthorOrReadOnly
 from .filters import ArticleFilter
-
-
-class UserRegistrationView(APIView):
-    """User registration endpoint"""
+from .feed import Feed, feed_filter
+from .last_login import record_login
+from .pagination import KeysetPagination
+from .search import search_articles
+from .streaming import stream_list_response, is_requested as stream_requested
+
+
+class AsyncAPIView(APIView):
+    """
+    ``APIView`` whose handlers are coroutines.
+
+    DRF 3.14 only dispatches synchronous handlers, so this runs the usual
+    ``initial``/``handle_exception``/``finalize_response`` steps around an
+    awaited handler. Authentication, permission and throttle checks may query
+    the database and run through ``sync_to_async``.
+    """
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def _issue_user_response(request, user, status_code):
+    user_serializer = UserSerializer(user, context={'request': request, 'issue_token': True})
+    return Response({'user': user_serializer.data}, status=status_code)
+
+
+class UserRegistrationView(AsyncAPIView):
+    """User registration endpoint; the password is hashed on the hashing pool"""
     permission_classes = [AllowAny]
 
-    def post(self, request):
+    async def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data.get('user', {}))
-        if serializer.is_valid():
-            user = serializer.save()
-            user_serializer = UserSerializer(user, context={'request': request})
-            return Response({'user': user_serializer.data}, status=status.HTTP_201_CREATED)
-        return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        if not await sync_to_async(serializer.is_valid)():
+            return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        password_hash = await hashing.amake_password(serializer.validated_data['password'])
+        user = await sync_to_async(serializer.save)(password_hash=password_hash)
+        return await sync_to_async(_issue_user_response)(request, user, status.HTTP_201_CREATED)
 
 
-class UserLoginView(APIView):
-    """User login endpoint"""
+class UserLoginView(AsyncAPIView):
+    """User login endpoint; the password is verified on the hashing pool"""
     permission_classes = [AllowAny]
+    invalid_credentials = 'Invalid credentials'
 
-    def post(self, request):
+    async def post(self, request):
         serializer = UserLoginSerializer(data=request.data.get('user', {}))
-        if serializer.is_valid():
-            user = serializer.validated_data['user']
-            user_serializer = UserSerializer(user, context={'request': request})
-            return Response({'user': user_serializer.data}, status=status.HTTP_200_OK)
-        return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
-
-
-class CurrentUserView(APIView):
-    """Get and update current user"""
+        if not serializer.is_valid():
+            return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        # EmailBackend checks the password on the hashing pool
+        user = await aauthenticate(request, **serializer.validated_data)
+        if user is None:
+            return Response(
+                {'errors': {'non_field_errors': [self.invalid_credentials]}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            await sync_to_async(record_login)(user)
+        return await sync_to_async(_issue_user_response)(request, user, status.HTTP_200_OK)
+
+
+class CurrentUserView(AsyncAPIView):
+    """Get and update current user; new passwords are hashed on the hashing pool"""
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    async def get(self, request):
         serializer = UserSerializer(request.user, context={'request': request})
-        return Response({'user': serializer.data})
+        return Response({'user': await sync_to_async(lambda: serializer.data)()})
 
-    def put(self, request):
+    async def put(self, request):
         serializer = UserSerializer(
             request.user,
             data=request.data.get('user', {}),
             partial=True,
             context={'request': request}
         )
-        if serializer.is_valid():
-            serializer.save()
-            return Response({'user': serializer.data})
-        return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        if not await sync_to_async(self.validate_update)(request, serializer):
+            return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        password = serializer.validated_data.get('password')
+        password_hash = await hashing.amake_password(password) if password else None
+        await sync_to_async(serializer.save)(password_hash=password_hash)
+        return Response({'user': await sync_to_async(lambda: serializer.data)()})
+
+    @staticmethod
+    def validate_update(request, serializer):
+        # request.user may come from the authentication cache; write on top of
+        # the current row so a stale copy never overwrites newer columns
+        request.user.refresh_from_db()
+        return serializer.is_valid()
 
 
 class ProfileView(APIView):
@@ -73,8 +154,12 @@ class ProfileView(APIView):
 
     def get(self, request, username):
         profile = get_object_or_404(User, username=username)
+        validators = profile_validators(request, profile)
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
         serializer = ProfileSerializer(profile, context={'request': request})
-        return Response({'profile': serializer.data})
+        return add_validators(Response({'profile': serializer.data}), *validators)
 
 
 class FollowUserView(APIView):
@@ -84,25 +169,40 @@ class FollowUserView(APIView):
     def post(self, request, username):
         profile = get_object_or_404(User, username=username)
         request.user.following.add(profile)
+        clear_following_ids(request)
         serializer = ProfileSerializer(profile, context={'request': request})
         return Response({'profile': serializer.data})
 
     def delete(self, request, username):
         profile = get_object_or_404(User, username=username)
         request.user.following.remove(profile)
+        clear_following_ids(request)
         serializer = ProfileSerializer(profile, context={'request': request})
         return Response({'profile': serializer.data})
 
 
 class ArticleViewSet(viewsets.ModelViewSet):
     """ViewSet for articles"""
-    queryset = Article.objects.select_related('author').prefetch_related('tags', 'favorited_by')
+    queryset = Article.objects.select_related('author').prefetch_related('tags')
     serializer_class = ArticleSerializer
     lookup_field = 'slug'
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = ArticleFilter
 
+    @property
+    def paginator(self):
+        """Use keyset pagination when the client opts in with ``?cursor=``"""
+        if not hasattr(self, '_paginator'):
+            if KeysetPagination.is_requested(self.request):
+                self._paginator = KeysetPagination(envelope='articles')
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+    def get_queryset(self):
+        return super().get_queryset().with_favorites(self.request.user)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -116,20 +216,54 @@ class ArticleViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(serializer.data)
         return Response({'article': serializer.data}, status=status.HTTP_201_CREATED, headers=headers)
 
+    @method_decorator(article_condition)
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance)
         return Response({'article': serializer.data})
 
+    @cache_response('articles')
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({'articles': serializer.data, 'articlesCount': queryset.count()})
+        if stream_requested(request):
+            return self.stream_articles(queryset)
+        return self.list_response(queryset)
+
+    def list_response(self, queryset):
+        """
+        Paginated read-only article list built by the fast serialization path;
+        conditional requests are answered once the page is fetched
+        """
+        return self.rows_response(fast_serializers.article_rows(queryset))
+
+    def rows_response(self, rows):
+        """``list_response`` for ``article_rows`` rows or a ``Feed``"""
+        page = self.paginate_queryset(rows)
+        paginated = page is not None
+        if not paginated:
+            page = list(rows)
+        validators = page_validators(self.request, page, *pagination_state(self.paginator if paginated else None))
+        response = not_modified(self.request, *validators)
+        if response is not None:
+            return response
+        data = fast_serializers.serialize_articles(page, self.request)
+        if paginated:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response({'articles': data, 'articlesCount': len(data)})
+        return add_validators(response, *validators)
+
+    def stream_articles(self, queryset):
+        """Unpaginated ``?stream=true`` response, rendered incrementally"""
+        return stream_list_response(
+            queryset,
+            self.get_serializer_class(),
+            self.get_serializer_context(),
+            envelope='articles',
+            count_key='articlesCount',
+        )
 
+    @method_decorator(article_condition)
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -143,6 +277,7 @@ class ArticleViewSet(viewsets.ModelViewSet):
         self.perform_update(serializer)
         return Response({'article': serializer.data})
 
+    @method_decorator(article_condition)
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         self.perform_destroy(instance)
@@ -151,20 +286,27 @@ class ArticleViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def feed(self, request):
         """Get articles from followed users"""
-        following_users = request.user.following.all()
-        queryset = Article.objects.filter(author__in=following_users).select_related('author').prefetch_related('tags', 'favorited_by')
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({'articles': serializer.data, 'articlesCount': queryset.count()})
+        if stream_requested(request):
+            return self.stream_articles(self.get_queryset().filter(feed_filter(request.user)))
+        rows = fast_serializers.article_rows(self.get_queryset())
+        return self.rows_response(Feed(request.user, get_following_ids(request), rows))
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Full-text search over title, description and body, best match first"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'errors': {'q': ['This field is required.']}}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = search_articles(self.filter_queryset(self.get_queryset()), query)
+        return self.list_response(queryset)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def favorite(self, request, slug=None):
         """Favorite an article"""
         article = self.get_object()
         request.user.favorite_articles.add(article)
+        # Re-read so favorites_count and the favorited flag reflect the change
+        article = self.get_queryset().get(pk=article.pk)
         serializer = self.get_serializer(article)
         return Response({'article': serializer.data})
 
@@ -173,6 +315,7 @@ class ArticleViewSet(viewsets.ModelViewSet):
         """Unfavorite an article"""
         article = self.get_object()
         request.user.favorite_articles.remove(article)
+        article = self.get_queryset().get(pk=article.pk)
         serializer = self.get_serializer(article)
         return Response({'article': serializer.data})
 
@@ -182,14 +325,27 @@ class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsCommentAuthorOrReadOnly]
 
+    def get_article(self):
+        """Resolve ``(id, comments_count)`` of the URL's article once per request"""
+        if not hasattr(self, '_article'):
+            article = (
+                Article.objects
+                .filter(slug=self.kwargs.get('article_slug'))
+                .values_list('id', 'comments_count')
+                .first()
+            )
+            if article is None:
+                raise Http404('No Article matches the given query.')
+            self._article = article
+        return self._article
+
     def get_queryset(self):
-        article_slug = self.kwargs.get('article_slug')
-        return Comment.objects.filter(article__slug=article_slug).select_related('author', 'article')
+        article_id, _ = self.get_article()
+        return Comment.objects.filter(article_id=article_id).select_related('author')
 
     def perform_create(self, serializer):
-        article_slug = self.kwargs.get('article_slug')
-        article = get_object_or_404(Article, slug=article_slug)
-        serializer.save(author=self.request.user, article=article)
+        article_id, _ = self.get_article()
+        serializer.save(author=self.request.user, article_id=article_id)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data.get('comment', {}))
@@ -199,9 +355,29 @@ class CommentViewSet(viewsets.ModelViewSet):
         return Response({'comment': serializer.data}, status=status.HTTP_201_CREATED, headers=headers)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({'comments': serializer.data})
+        """Comments newest first, keyset-paginated on the (article, -created_at) index"""
+        if stream_requested(request):
+            return stream_list_response(
+                self.get_queryset(),
+                self.get_serializer_class(),
+                self.get_serializer_context(),
+                envelope='comments',
+            )
+        paginator = KeysetPagination(
+            envelope='comments',
+            page_size=getattr(settings, 'REALWORLD_COMMENTS_PAGE_SIZE', 100),
+        )
+        rows = fast_serializers.comment_rows(self.get_queryset())
+        page = paginator.paginate_queryset(rows, request, view=self)
+        count = self.get_article()[1] if request.query_params.get('count') in ('1', 'true') else None
+        validators = page_validators(request, page, *pagination_state(paginator), count)
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+        response = paginator.get_paginated_response(fast_serializers.serialize_comments(page, request))
+        if count is not None:
+            response.data['commentsCount'] = count
+        return add_validators(response, *validators)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -210,13 +386,26 @@ class CommentViewSet(viewsets.ModelViewSet):
 
 
 class TagListView(generics.ListAPIView):
-    """List all tags"""
+    """
+    List all tags, the ``?top=N`` most used ones, or those starting with
+    ``?prefix=`` (see ``realworld.tags``)
+    """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AllowAny]
 
+    @cache_response('tags')
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        tags = [tag['name'] for tag in serializer.data]
-        return Response({'tags': tags})
+        names = tags.list_tags(request.query_params)
+        if names is None:
+            serializer = self.get_serializer(self.get_queryset(), many=True)
+            names = [tag['name'] for tag in serializer.data]
+        return Response({'tags': names})
+
+
+class MetricsView(APIView):
+    """In-process performance counters (staff only)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'metrics': metrics.snapshot()})